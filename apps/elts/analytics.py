@@ -0,0 +1,479 @@
+"""Analyses of how heavily items are used.
+
+The functions in this module answer questions about many lends at once, such as
+"what fraction of last semester was each laptop lent out?" Lends are loaded into
+NumPy arrays with one query, and all further work is done on those arrays. This
+keeps the cost per lend low enough to analyse millions of lends.
+
+Times are represented as integer seconds since the Unix epoch. A lend has three
+intervals:
+
+``lent``
+    From ``out`` to ``back``. If the item has not come back, the interval ends
+    now.
+``reserved``
+    From the start of ``due_out`` to the end of ``due_back``, in the current
+    time zone. If ``due_back`` is not set, the interval never ends.
+``demand``
+    The smallest interval covering both of the above, during which the item
+    could not have been lent to anyone else. Unlike a reservation, it does not
+    last forever if ``due_back`` is not set. Instead, it ends when the item
+    comes back, now if the item is still out, or at the end of ``due_out``.
+
+See: http://docs.scipy.org/doc/numpy/reference/
+
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import Q
+from django.utils import timezone
+from elts.models import Category, Item, Lend, Tag
+import numpy as np
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+# Module 'numpy' has no 'int64' member (no-member)
+
+# The kinds of interval that a lend has. See the module docstring.
+KINDS = ('lent', 'reserved', 'demand')
+
+# Stands in for the end of an interval which never ends.
+FOREVER = np.iinfo(np.int64).max // 2
+
+def union_coverage(groups, starts, ends, lower, upper, size):
+    """Return how much of ``[lower, upper)`` each group's intervals cover.
+
+    ``groups``, ``starts`` and ``ends`` are integer arrays of equal length.
+    Interval ``i`` belongs to group ``groups[i]`` and runs from ``starts[i]`` to
+    ``ends[i]``. Groups are numbered from zero to ``size - 1``.
+
+    Intervals are clipped to ``[lower, upper)``. Where intervals in a group
+    overlap, the overlap is only counted once. An array of ``size`` floats is
+    returned.
+
+    >>> union_coverage(
+    ...     np.array([0, 0, 1, 1]),
+    ...     np.array([0, 5, 2, 30]),
+    ...     np.array([10, 15, 4, 40]),
+    ...     0, 20, 3
+    ... ).tolist()
+    [15.0, 2.0, 0.0]
+
+    """
+    starts = np.clip(starts, lower, upper) - lower
+    ends = np.clip(ends, lower, upper) - lower
+    keep = ends > starts
+    groups, starts, ends = groups[keep], starts[keep], ends[keep]
+    if len(groups) == 0:
+        return np.zeros(size)
+
+    # Sort by group, then by start. Then move each group into a range of its
+    # own, so that one running maximum can find, for every interval, the
+    # furthest point reached by earlier intervals in the same group.
+    order = np.lexsort((starts, groups))
+    groups = groups[order]
+    offsets = groups.astype(np.int64) * (upper - lower + 1)
+    starts = starts[order] + offsets
+    ends = ends[order] + offsets
+    reach = np.maximum.accumulate(ends)
+    reached = np.concatenate(([0], reach[:-1]))
+
+    # Each interval adds whatever part of it lies beyond that point.
+    added = np.maximum(ends - np.maximum(starts, reached), 0)
+    return np.bincount(groups, weights = added, minlength = size)
+
+def peak_concurrency(groups, starts, ends, size):
+    """Find how many of each group's intervals overlap, over time.
+
+    The arguments are as for ``union_coverage``, except that intervals are not
+    clipped. An interval includes its start but not its end.
+
+    Two things are returned. The first is an array of ``size`` integers: the
+    largest number of intervals in each group which overlap at any one time.
+    The second is a timeline: three arrays holding a group, a time, and how many
+    of that group's intervals overlap from that time on. The timeline is sorted
+    by group and then time, and it has an entry for every time at which one of
+    the group's intervals starts or ends.
+
+    >>> peaks, (groups, times, counts) = peak_concurrency(
+    ...     np.array([0, 0, 0, 1]),
+    ...     np.array([0, 5, 10, 2]),
+    ...     np.array([10, 15, 20, 4]),
+    ...     3
+    ... )
+    >>> peaks.tolist()
+    [2, 1, 0]
+    >>> groups.tolist()
+    [0, 0, 0, 0, 0, 1, 1]
+    >>> times.tolist()
+    [0, 5, 10, 15, 20, 2, 4]
+    >>> counts.tolist()
+    [1, 2, 2, 1, 0, 1, 0]
+
+    """
+    keep = ends > starts
+    groups, starts, ends = groups[keep], starts[keep], ends[keep]
+    peaks = np.zeros(size, dtype = np.int64)
+    if len(groups) == 0:
+        return peaks, (groups, starts, starts)
+
+    # Each interval adds one at its start and removes one at its end. Every
+    # group's additions and removals cancel out, so a single running total
+    # over events sorted by group is correct for every group.
+    event_groups = np.concatenate((groups, groups))
+    times = np.concatenate((starts, ends))
+    deltas = np.concatenate((
+        np.ones(len(starts), dtype = np.int64),
+        -np.ones(len(ends), dtype = np.int64)
+    ))
+    order = np.lexsort((times, event_groups))
+    event_groups, times = event_groups[order], times[order]
+    counts = np.cumsum(deltas[order])
+
+    # Where several events share a group and time, only the total after the
+    # last of them is real.
+    last = np.ones(len(times), dtype = bool)
+    last[:-1] = (
+        (event_groups[1:] != event_groups[:-1]) | (times[1:] != times[:-1])
+    )
+    event_groups, times, counts = event_groups[last], times[last], counts[last]
+
+    firsts = np.flatnonzero(np.concatenate((
+        [True],
+        event_groups[1:] != event_groups[:-1]
+    )))
+    peaks[event_groups[firsts]] = np.maximum.reduceat(counts, firsts)
+    return peaks, (event_groups, times, counts)
+
+def intervals(kind, lower = None, upper = None):
+    """Load the ``kind`` intervals of lends which overlap ``[lower, upper)``.
+
+    ``kind`` is one of ``KINDS``. ``lower`` and ``upper`` are times, as
+    described in the module docstring. If either is ``None``, the window is
+    unbounded in that direction. Some of the intervals returned may not overlap
+    the window, so callers should clip them.
+
+    Three arrays are returned: the ID of each lend's item, and the start and
+    end of each interval.
+
+    """
+    lends = Lend.objects.all()
+    if kind == 'lent':
+        lends = lends.filter(out__isnull = False)
+        if lower is not None:
+            lends = lends.filter(
+                Q(back__isnull = True) | Q(back__gt = to_datetime(lower))
+            )
+        if upper is not None:
+            lends = lends.filter(out__lt = to_datetime(upper))
+        item_ids, outs, backs = columns(
+            lends.values_list('item_id', 'out', 'back'),
+            3
+        )
+        starts = datetimes_to_times(outs, 0)
+        ends = datetimes_to_times(backs, _now())
+    elif kind == 'reserved':
+        lends = lends.filter(due_out__isnull = False)
+        if lower is not None:
+            lends = lends.filter(
+                Q(due_back__isnull = True) |
+                Q(due_back__gte = _local_date(lower))
+            )
+        if upper is not None:
+            lends = lends.filter(due_out__lte = _local_date(upper))
+        item_ids, due_outs, due_backs = columns(
+            lends.values_list('item_id', 'due_out', 'due_back'),
+            3
+        )
+        starts = dates_to_times(due_outs, 0, 0)
+        ends = dates_to_times(due_backs, 1, FOREVER)
+    else:
+        if lower is not None:
+            lends = lends.filter(
+                Q(back__isnull = True) |
+                Q(back__gt = to_datetime(lower)) |
+                Q(due_back__gte = _local_date(lower))
+            )
+        if upper is not None:
+            lends = lends.filter(
+                Q(out__lt = to_datetime(upper)) |
+                Q(due_out__lte = _local_date(upper))
+            )
+        item_ids, due_outs, due_backs, outs, backs = columns(
+            lends.values_list('item_id', 'due_out', 'due_back', 'out', 'back'),
+            5
+        )
+        starts = np.minimum(
+            dates_to_times(due_outs, 0, FOREVER),
+            datetimes_to_times(outs, FOREVER)
+        )
+        ends = np.maximum.reduce([
+            dates_to_times(due_outs, 1, -FOREVER),
+            dates_to_times(due_backs, 1, -FOREVER),
+            datetimes_to_times(backs, -FOREVER),
+            np.where(
+                np.array(
+                    [out is not None and back is None
+                        for out, back in zip(outs, backs)],
+                    dtype = bool
+                ),
+                _now(),
+                -FOREVER
+            ),
+        ])
+    return np.array(item_ids, dtype = np.int64), starts, ends
+
+def utilization(kind, lower, upper):
+    """Compute what fraction of ``[lower, upper)`` items were in use.
+
+    ``kind`` is one of ``KINDS``. ``lower`` and ``upper`` are times, as
+    described in the module docstring.
+
+    A dict with the keys ``items``, ``tags`` and ``categories`` is returned.
+    Each value is a list of ``(object, seconds_used, seconds_available)``
+    tuples, where ``object`` is an ``Item``, ``Tag`` or ``Category``. The usage
+    of a tag or category is the total usage of the items in it.
+
+    """
+    span = upper - lower
+    items = list(Item.objects.order_by('id'))
+    item_ids = np.array([item.id for item in items], dtype = np.int64)
+    lend_item_ids, starts, ends = intervals(kind, lower, upper)
+    used = union_coverage(
+        np.searchsorted(item_ids, lend_item_ids),
+        starts,
+        ends,
+        lower,
+        upper,
+        len(items)
+    )
+
+    category_pairs = Item.objects.filter(
+        tags__category__isnull = False
+    ).values_list('tags__category', 'id').distinct()
+    return {
+        'items': [
+            (item, used[i], span) for i, item in enumerate(items)
+        ],
+        'tags': _group_usage(
+            Tag.objects.order_by('name'),
+            tag_pairs(),
+            item_ids,
+            used,
+            span
+        ),
+        'categories': _group_usage(
+            Category.objects.order_by('user', 'name'),
+            category_pairs,
+            item_ids,
+            used,
+            span
+        ),
+    }
+
+def capacity(lower = None, upper = None):
+    """Compute how many items with each tag were in demand at once.
+
+    ``lower`` and ``upper`` are times, as described in the module docstring. If
+    either is ``None``, the window is unbounded in that direction. Demand is
+    described by the ``demand`` intervals of lends, clipped to the window.
+
+    A list with one dict per tag is returned, sorted by tag name. Each dict has
+    these keys:
+
+    ``tag``
+        A ``Tag``.
+    ``items``
+        How many items have the tag.
+    ``peak``
+        The largest number of items with the tag that were in demand at once.
+        This is the smallest number of items which would have satisfied every
+        lend.
+    ``peak_at``
+        When demand first reached ``peak``, as a time, or ``None``.
+    ``shortfall``
+        How many more items would have been needed to reach ``peak``.
+    ``timeline``
+        A list of ``(time, demand)`` tuples. Demand is ``demand`` from ``time``
+        until the next entry.
+
+    """
+    tags = list(Tag.objects.order_by('id'))
+    tag_ids = np.array([tag.id for tag in tags], dtype = np.int64)
+    pair_tag_ids, pair_item_ids = columns(tag_pairs(), 2)
+    pair_tags = np.searchsorted(tag_ids, np.array(pair_tag_ids, np.int64))
+    pair_item_ids = np.array(pair_item_ids, dtype = np.int64)
+
+    # An interval counts towards each tag of its item.
+    item_ids, starts, ends = intervals('demand', lower, upper)
+    if lower is not None:
+        starts = np.maximum(starts, lower)
+    if upper is not None:
+        ends = np.minimum(ends, upper)
+    lends, groups = join(item_ids, pair_item_ids, pair_tags)
+    peaks, (groups, times, counts) = peak_concurrency(
+        groups,
+        starts[lends],
+        ends[lends],
+        len(tags)
+    )
+
+    items = np.bincount(pair_tags, minlength = len(tags))
+    firsts = np.searchsorted(groups, np.arange(len(tags)), 'left')
+    lasts = np.searchsorted(groups, np.arange(len(tags)), 'right')
+    report = []
+    for i, tag in enumerate(tags):
+        timeline = list(zip(
+            times[firsts[i]:lasts[i]].tolist(),
+            counts[firsts[i]:lasts[i]].tolist()
+        ))
+        report.append({
+            'tag': tag,
+            'items': int(items[i]),
+            'peak': int(peaks[i]),
+            'peak_at': next(
+                (time_ for time_, count in timeline if count == peaks[i]),
+                None
+            ) if peaks[i] else None,
+            'shortfall': max(int(peaks[i] - items[i]), 0),
+            'timeline': timeline,
+        })
+    report.sort(key = lambda row: row['tag'].name)
+    return report
+
+def to_time(date_):
+    """Return the start of ``date_`` in the current time zone as a time.
+
+    ``date_`` is a ``datetime.date`` object.
+
+    """
+    return _seconds(timezone.make_aware(
+        datetime.combine(date_, time()),
+        timezone.get_current_timezone()
+    ))
+
+def to_datetime(time_):
+    """Return ``time_`` as an aware ``datetime.datetime`` object.
+
+    >>> to_datetime(86400)
+    datetime.datetime(1970, 1, 2, 0, 0, tzinfo=<UTC>)
+
+    """
+    return datetime(1970, 1, 1, tzinfo = timezone.utc) + timedelta(
+        seconds = int(time_)
+    )
+
+def tag_pairs():
+    """Return ``(tag_id, item_id)`` tuples, one for each tag of each item."""
+    return Item.tags.through.objects.values_list('tag_id', 'item_id')
+
+def join(keys, pair_keys, pair_values):
+    """Pair each of ``keys`` with the values that ``pairs`` give it.
+
+    ``keys``, ``pair_keys`` and ``pair_values`` are integer arrays. Each key in
+    ``keys`` is matched with every ``i`` for which ``pair_keys[i]`` is the key.
+    Two arrays are returned: indices into ``keys``, and the ``pair_values``
+    matched with them.
+
+    >>> indices, values = join(
+    ...     np.array([5, 7, 5]),
+    ...     np.array([6, 5, 5]),
+    ...     np.array([1, 2, 3])
+    ... )
+    >>> indices.tolist(), values.tolist()
+    ([0, 0, 2, 2], [2, 3, 2, 3])
+
+    """
+    order = np.argsort(pair_keys, kind = 'mergesort')
+    pair_keys, pair_values = pair_keys[order], pair_values[order]
+    firsts = np.searchsorted(pair_keys, keys, 'left')
+    counts = np.searchsorted(pair_keys, keys, 'right') - firsts
+    indices = np.repeat(np.arange(len(keys)), counts)
+
+    # The position of each match among the matches for its key.
+    offsets = np.arange(len(indices)) - np.repeat(
+        np.cumsum(counts) - counts,
+        counts
+    )
+    return indices, pair_values[np.repeat(firsts, counts) + offsets]
+
+def columns(rows, width):
+    """Transpose ``rows`` into ``width`` lists.
+
+    >>> columns([(1, 'a'), (2, 'b')], 2)
+    [(1, 2), ('a', 'b')]
+    >>> columns([], 2)
+    [(), ()]
+
+    """
+    transposed = list(zip(*rows))
+    return transposed if transposed else [()] * width
+
+def datetimes_to_times(datetimes, default):
+    """Convert aware ``datetimes`` to an array of times.
+
+    ``None`` is converted to ``default``.
+
+    """
+    return np.array(
+        [default if d is None else _seconds(d) for d in datetimes],
+        dtype = np.int64
+    )
+
+def dates_to_times(dates, days, default):
+    """Convert ``dates`` to an array of times, ``days`` days later.
+
+    ``None`` is converted to ``default``. Lends share a small number of dates,
+    so each distinct date is only converted once.
+
+    """
+    distinct = sorted(set(d for d in dates if d is not None))
+    times = np.array(
+        [to_time(d + timedelta(days = days)) for d in distinct] + [default],
+        dtype = np.int64
+    )
+    index = dict((d, i) for i, d in enumerate(distinct))
+    return times[np.array(
+        [index.get(d, len(distinct)) for d in dates],
+        dtype = np.int64
+    )]
+
+def _group_usage(groups, pairs, item_ids, used, span):
+    """Total the usage of the items in each of ``groups``.
+
+    ``pairs`` is an iterable of ``(group_id, item_id)`` tuples, and ``used`` is
+    the usage of each of ``item_ids``. See ``utilization``. ``groups`` may be in
+    any order, and the totals are returned in that order.
+
+    """
+    groups = list(groups)
+    group_ids = np.array([group.id for group in groups], dtype = np.int64)
+    pair_group_ids, pair_item_ids = columns(pairs, 2)
+    pair_group_ids = np.array(pair_group_ids, dtype = np.int64)
+    pair_item_ids = np.array(pair_item_ids, dtype = np.int64)
+    # ``searchsorted`` needs sorted IDs. Find each pair's group among them, then
+    # map it back to the group's place in ``groups``.
+    order = np.argsort(group_ids)
+    group_indices = order[np.searchsorted(group_ids[order], pair_group_ids)]
+    group_used = np.bincount(
+        group_indices,
+        weights = used[np.searchsorted(item_ids, pair_item_ids)],
+        minlength = len(groups)
+    )
+    group_sizes = np.bincount(group_indices, minlength = len(groups))
+    return [
+        (group, group_used[i], group_sizes[i] * span)
+        for i, group in enumerate(groups)
+    ]
+
+def _seconds(datetime_):
+    """Return aware ``datetime_`` as seconds since the Unix epoch."""
+    delta = datetime_ - datetime(1970, 1, 1, tzinfo = timezone.utc)
+    return delta.days * 86400 + delta.seconds
+
+def _local_date(time_):
+    """Return the date in the current time zone at ``time_``."""
+    return timezone.localtime(to_datetime(time_)).date()
+
+def _now():
+    """Return the current time."""
+    return _seconds(timezone.now())
@@ -0,0 +1,123 @@
+"""Version numbers for cached data.
+
+Data that is expensive to compute, such as the category summaries shown on every
+page, is kept in Django's cache. Rather than tracking down and deleting each
+cache entry when the data changes, a version number is made part of each cache
+key. When the data changes, the version is bumped, and the old entries become
+unreachable. They are evicted by the cache in due course.
+
+A version is named after whatever it tracks. For example, ``sidebar:15`` tracks
+the category summaries shown to user 15.
+
+A version may itself be evicted from the cache. A version is therefore started
+at the current time in milliseconds, rather than at zero, so that a version
+which is evicted and started again does not reuse an old value.
+
+The time at which each version was last bumped is also kept, so that it can be
+sent to clients as a ``Last-Modified`` header. If that time has been evicted,
+the current time is used instead, which is never too early.
+
+Data is usually changed inside a transaction, and so its version is bumped
+before the change is committed. Meanwhile, another request may read the old
+data and cache it under the new version, where it would look current. So a
+version bumped inside a transaction is bumped again by ``bump_pending``, which
+is called once the transaction has committed: when ``writes.items_locked``
+returns, when the write queue commits a batch, when a job has been run, and at
+the end of each request. See ``middleware.VersionMiddleware``.
+
+"""
+from django.core.cache import cache
+from django.db import connection
+import threading
+import time
+
+_state = threading.local() # pylint: disable=C0103
+
+def get_version(name):
+    """Return the current version of ``name``.
+
+    >>> get_version('doctest') == get_version('doctest')
+    True
+
+    """
+    version = cache.get(_key(name))
+    if version is None:
+        cache.add(_key(name), _initial_version(), None)
+        version = cache.get(_key(name))
+    return version
+
+def bump_version(name):
+    """Change the version of ``name``.
+
+    >>> version = get_version('doctest')
+    >>> bump_version('doctest')
+    >>> get_version('doctest') == version
+    False
+
+    """
+    _bump(name)
+    if connection.in_atomic_block:
+        _pending().add(name)
+
+def bump_pending():
+    """Bump again each version that this thread bumped inside a transaction.
+
+    Call this once the transaction has committed or rolled back.
+
+    """
+    names = _pending()
+    while names:
+        _bump(names.pop())
+
+def get_modified(name):
+    """Return when the version of ``name`` was last bumped.
+
+    The time is given in whole seconds since the epoch.
+
+    >>> bump_version('doctest')
+    >>> get_modified('doctest') <= time.time()
+    True
+
+    """
+    modified = cache.get(_modified_key(name))
+    if modified is None:
+        cache.add(_modified_key(name), int(time.time()), None)
+        modified = cache.get(_modified_key(name))
+    return modified
+
+def _key(name):
+    """Return the cache key for the version of ``name``.
+
+    >>> _key('sidebar:15')
+    'elts:version:sidebar:15'
+
+    """
+    return 'elts:version:{}'.format(name)
+
+def _modified_key(name):
+    """Return the cache key for when the version of ``name`` was last bumped.
+
+    >>> _modified_key('sidebar:15')
+    'elts:modified:sidebar:15'
+
+    """
+    return 'elts:modified:{}'.format(name)
+
+def _bump(name):
+    """Change the version of ``name``, and record when it changed."""
+    try:
+        cache.incr(_key(name))
+    except ValueError:
+        # The version has not been started or has been evicted.
+        cache.set(_key(name), _initial_version(), None)
+    cache.set(_modified_key(name), int(time.time()), None)
+
+def _pending():
+    """Return the names of the versions to be bumped by ``bump_pending``."""
+    if not hasattr(_state, 'pending'):
+        _state.pending = set()
+    return _state.pending
+
+def _initial_version():
+    """Return a version number for a version that has no value yet."""
+    return int(time.time() * 1000)
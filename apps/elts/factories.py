@@ -458,6 +458,40 @@ def category_tags():
 
 #-------------------------------------------------------------------------------
 
+class KitFactory(DjangoModelFactory):
+    """Instantiate an ``elts.models.Kit`` object.
+
+    >>> kit = KitFactory.create()
+    >>> kit.full_clean()
+    >>> kit.items.count()
+    2
+    >>> KitFactory.create(items = []).items.count()
+    0
+
+    """
+    # pylint: disable=R0903
+    # pylint: disable=W0232
+    FACTORY_FOR = models.Kit
+    name = Sequence(lambda n: u'kit {}'.format(n))
+
+    @post_generation
+    def items(self, create, extracted, **kwargs):
+        """Assign a value to the ``Kit.items`` model attribute.
+
+        If an iterable is passed to the constructor, its values are put in the
+        kit. Otherwise, two new items are.
+
+        """
+        if not create:
+            # build() was called. ``self`` has not been saved.
+            return
+        if extracted is None:
+            extracted = [ItemFactory.create() for _ in range(2)]
+        for item in extracted:
+            self.items.add(item)
+
+#-------------------------------------------------------------------------------
+
 class ItemNoteFactory(DjangoModelFactory):
     """Instantiate an ``elts.models.ItemNote`` object.
 
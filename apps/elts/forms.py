@@ -4,10 +4,26 @@ Unless otherwise noted, all forms defined herein can be used to either create or
 update an object.
 
 """
-from datetime import timedelta
-from django.db.models import Q
-from django.forms import CharField, Form, ModelForm, widgets, ValidationError
-from elts import models
+from calendar import day_name
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.db import transaction
+from django.db.models import F, Q
+from django.forms import (
+    CharField,
+    DateField,
+    Form,
+    IntegerField,
+    ModelChoiceField,
+    ModelForm,
+    MultipleChoiceField,
+    widgets,
+    ValidationError,
+)
+from django.utils.text import capfirst
+from elts import kits, models, quotas, recurrence, scheduling, statistics
+from itertools import groupby
 
 # pylint: disable=R0903
 # "Too few public methods (0/2)"
@@ -17,7 +33,69 @@ from elts import models
 # "Class has no __init__ method"
 # It is both common and OK for a model to have no __init__ method.
 
-class ItemForm(ModelForm):
+class VersionedForm(ModelForm):
+    """A form which will not overwrite changes that its user has not seen.
+
+    The form carries the ``version`` of the object it was made from in a hidden
+    field. See ``models.Versioned``. When the object is updated, that version
+    is checked in the ``WHERE`` clause of an ``UPDATE`` which also increments
+    it. If somebody else has saved the object in the meantime, nothing is
+    saved, ``save`` returns ``None``, and ``stale`` is set. The form then
+    carries the latest version, so that submitting it again overwrites the
+    other changes on purpose.
+
+    Nothing is locked, so readers and writers never wait for each other. If
+    the hidden field is left out, the object is saved without any check.
+
+    """
+    version = IntegerField(
+        min_value = 0,
+        required = False,
+        widget = widgets.HiddenInput,
+    )
+
+    def __init__(self, *args, **kwargs):
+        """Remember the version of the object the form is made from."""
+        super(VersionedForm, self).__init__(*args, **kwargs)
+        self.stale = False
+        if self.instance.pk is not None:
+            self.initial.setdefault('version', self.instance.version)
+
+    def save(self, commit = True):
+        """Save the object, unless someone else has changed it.
+
+        When updating an object, ``commit`` must be true.
+
+        """
+        version = self.cleaned_data.get('version')
+        if self.instance.pk is None or version is None:
+            return super(VersionedForm, self).save(commit)
+        model = type(self.instance)
+        with transaction.atomic():
+            if not model.objects.filter(
+                pk = self.instance.pk,
+                version = version,
+            ).update(version = F('version') + 1):
+                self._mark_stale(model)
+                return None
+            self.instance.version = version + 1
+            return super(VersionedForm, self).save(commit)
+
+    def _mark_stale(self, model):
+        """Tell the user that someone else has changed the object."""
+        self.stale = True
+        latest = list(model.objects.filter(
+            pk = self.instance.pk
+        ).values_list('version', flat = True))
+        self.data = self.data.copy()
+        self.data[self.add_prefix('version')] = latest[0] if latest else ''
+        self._errors.setdefault(NON_FIELD_ERRORS, self.error_class()).append(
+            'Someone else changed this {} while you were editing it. Check '
+            'the values below, then submit them again to replace their '
+            'changes.'.format(model._meta.verbose_name)
+        )
+
+class ItemForm(VersionedForm):
     """A form for an Item."""
 
     class Meta(object):
@@ -26,7 +104,7 @@ class ItemForm(ModelForm):
         fields = ['name', 'description', 'tags', 'is_lendable']
         widgets = {'description': widgets.Textarea()}
 
-class TagForm(ModelForm):
+class TagForm(VersionedForm):
     """A form for a Tag."""
 
     class Meta(object):
@@ -35,7 +113,7 @@ class TagForm(ModelForm):
         fields = ['name', 'description']
         widgets = {'description': widgets.Textarea()}
 
-class CategoryForm(ModelForm):
+class CategoryForm(VersionedForm):
     """A form for a Catgory."""
 
     class Meta(object):
@@ -74,6 +152,15 @@ class CategoryForm(ModelForm):
         model = models.Category
         fields = ['name', 'tags']
 
+class KitForm(ModelForm):
+    """A form for a Kit."""
+
+    class Meta(object):
+        """Form attributes that are not fields."""
+        model = models.Kit
+        fields = ['name', 'description', 'items']
+        widgets = {'description': widgets.Textarea()}
+
 # Start `NoteForm` definitions.
 
 class ItemNoteForm(ModelForm):
@@ -114,8 +201,23 @@ class LoginForm(Form):
         """Form attributes that are not fields."""
         fields = ['username', 'password']
 
-class LendForm(ModelForm):
+class LendUserField(ModelChoiceField):
+    """A field for choosing who an item is lent to.
+
+    Each user is shown along with their on-time score, so that whoever is
+    lending out an item can see how punctual the borrower has been.
+
+    """
+    def label_from_instance(self, obj):
+        """Return a label for user ``obj``."""
+        return u'{} ({})'.format(obj, statistics.describe_score(obj))
+
+class LendForm(VersionedForm):
     """A form for a Lend."""
+    user_id = LendUserField(
+        queryset = User.objects.select_related('lateness'),
+        label = capfirst(models.Lend._meta.get_field('user_id').verbose_name),
+    )
 
     class Meta(object):
         """Form attributes that are not fields."""
@@ -196,6 +298,8 @@ class LendForm(ModelForm):
             due_back
         ).exclude(id__exact = self.instance.id)
         if conflicting_lends:
+            # Let the user wait for the item. See ``WaitlistEntryForm``.
+            self.reservation_conflicts = conflicting_lends
             raise ValidationError(_already_reserved_message(
                 due_out,
                 due_back,
@@ -215,9 +319,363 @@ class LendForm(ModelForm):
                 conflicting_lends
             ))
 
+        # A user may only have so many items out at once. If this lend already
+        # had its item out to the same user, it has been counted already.
+        user_id = cleaned_data.get('user_id')
+        if out and (not back) and user_id and not (
+            self.instance.out and (not self.instance.back)
+            and self.instance.user_id_id == user_id.id
+        ):
+            quota = quotas.full(user_id.id)
+            if quota is not None:
+                raise ValidationError(quotas.full_message(user_id, quota))
+
         # Always return the full collection of cleaned data.
         return cleaned_data
 
+class RecurringLendForm(Form):
+    """A form for reserving an item on the same days of every week or so.
+
+    The form describes a rule, and each day that the rule falls on is an
+    occurrence. See ``elts.recurrence``. Validation fails if any occurrence
+    clashes with an existing reservation, and each such occurrence is reported.
+    Once the form is valid, ``save`` reserves the item for every occurrence.
+
+    """
+    # More occurrences than this are most likely a mistake.
+    MAX_OCCURRENCES = 200
+    WEEKDAY_CHOICES = [(str(day), day_name[day]) for day in range(7)]
+
+    item_id = ModelChoiceField(
+        queryset = models.Item.objects.all(),
+        label = capfirst(models.Lend._meta.get_field('item_id').verbose_name),
+    )
+    user_id = LendUserField(
+        queryset = User.objects.select_related('lateness'),
+        label = capfirst(models.Lend._meta.get_field('user_id').verbose_name),
+    )
+    due_out = DateField(
+        label = 'First due out',
+        widget = widgets.DateInput(attrs = {'type': 'date'}),
+    )
+    days = IntegerField(
+        min_value = 1,
+        initial = 1,
+        help_text = 'How many days each reservation lasts.',
+    )
+    weekdays = MultipleChoiceField(
+        choices = WEEKDAY_CHOICES,
+        required = False,
+        widget = widgets.CheckboxSelectMultiple,
+        help_text = 'Defaults to the day of the week of "First due out".',
+    )
+    interval = IntegerField(
+        min_value = 1,
+        initial = 1,
+        label = 'Every how many weeks',
+    )
+    count = IntegerField(
+        min_value = 1,
+        required = False,
+        label = 'How many times',
+    )
+    until = DateField(
+        required = False,
+        label = 'Until',
+        widget = widgets.DateInput(attrs = {'type': 'date'}),
+    )
+
+    def clean(self):
+        """Expand the rule, and check the occurrences for clashes.
+
+        The occurrences are kept as ``self.occurrences``, a tuple of arrays of
+        ``due_out`` and ``due_back`` date ordinals.
+
+        """
+        cleaned_data = super(RecurringLendForm, self).clean()
+        item_id = cleaned_data.get('item_id')
+        due_out = cleaned_data.get('due_out')
+        days = cleaned_data.get('days')
+        interval = cleaned_data.get('interval')
+        count = cleaned_data.get('count')
+        until = cleaned_data.get('until')
+        if None in (item_id, due_out, days, interval):
+            # A required field is missing or invalid, and has its own error.
+            return cleaned_data
+
+        if (count is None) == (until is None):
+            raise ValidationError(
+                'Exactly one of "How many times" and "Until" must be set.'
+            )
+        if until is not None and until < due_out:
+            raise ValidationError(_a_before_b_message('First due out', 'Until'))
+        starts = recurrence.expand(
+            due_out,
+            [int(day) for day in cleaned_data.get('weekdays', [])],
+            interval,
+            count,
+            until,
+            self.MAX_OCCURRENCES,
+        )
+        if not len(starts):
+            raise ValidationError('The item would never be reserved.')
+        if len(starts) > self.MAX_OCCURRENCES:
+            raise ValidationError(
+                'The item would be reserved more than {} times.'.format(
+                    self.MAX_OCCURRENCES
+                )
+            )
+        ends = starts + (days - 1)
+        if recurrence.overlapping(starts, ends):
+            raise ValidationError(
+                'Each reservation must end before the next one is due out.'
+            )
+
+        messages = [
+            _already_reserved_message(
+                date.fromordinal(int(start)),
+                date.fromordinal(int(end)),
+                clashes
+            )
+            for start, end, clashes in zip(
+                starts,
+                ends,
+                recurrence.conflicts(item_id, starts, ends)
+            )
+            if clashes
+        ]
+        if messages:
+            raise ValidationError(messages)
+        self.occurrences = (starts, ends)
+        return cleaned_data
+
+    def save(self):
+        """Reserve the item for every occurrence.
+
+        Return the new ``Lend`` objects. The form must be valid.
+
+        """
+        return recurrence.create(
+            self.cleaned_data['item_id'],
+            self.cleaned_data['user_id'],
+            *self.occurrences
+        )
+
+class AllocatedLendForm(Form):
+    """A form for reserving any item with a tag, or in a category.
+
+    Rather than naming an item, the user names a tag or one of their
+    categories, and an item is chosen for them. See ``elts.scheduling``. Once
+    the form is valid, the chosen item is ``self.item``, and ``save`` reserves
+    it.
+
+    """
+    tag = ModelChoiceField(queryset = models.Tag.objects.all(), required = False)
+    category = ModelChoiceField(
+        queryset = models.Category.objects.none(),
+        required = False,
+    )
+    user_id = LendUserField(
+        queryset = User.objects.select_related('lateness'),
+        label = capfirst(models.Lend._meta.get_field('user_id').verbose_name),
+    )
+    due_out = DateField(
+        label = capfirst(models.Lend._meta.get_field('due_out').verbose_name),
+        widget = widgets.DateInput(attrs = {'type': 'date'}),
+    )
+    due_back = DateField(
+        label = capfirst(models.Lend._meta.get_field('due_back').verbose_name),
+        required = False,
+        widget = widgets.DateInput(attrs = {'type': 'date'}),
+    )
+
+    def __init__(self, user, *args, **kwargs):
+        """Offer ``user``'s categories."""
+        super(AllocatedLendForm, self).__init__(*args, **kwargs)
+        self.fields['category'].queryset = models.Category.objects.filter(
+            user = user
+        )
+        self.fields['category'].label_from_instance = (
+            lambda category: category.name
+        )
+        self.item = None
+
+    def candidate_ids(self):
+        """Return the IDs of the items that the form may choose from.
+
+        This is judged from the raw data, so that the items can be locked
+        before the form is validated. See ``writes.items_locked``.
+
+        """
+        chosen = {}
+        for name in ('tag', 'category'):
+            try:
+                chosen[name] = self.fields[name].clean(self[name].value())
+            except ValidationError:
+                chosen[name] = None
+        if chosen['tag'] is not None:
+            return scheduling.candidates([chosen['tag']])
+        if chosen['category'] is not None:
+            return scheduling.candidates(chosen['category'].tags.all())
+        return []
+
+    def clean(self):
+        """Choose an item to reserve."""
+        cleaned_data = super(AllocatedLendForm, self).clean()
+        tag = cleaned_data.get('tag')
+        category = cleaned_data.get('category')
+        due_out = cleaned_data.get('due_out')
+        due_back = cleaned_data.get('due_back')
+        if due_out is None:
+            return cleaned_data
+
+        if (tag is None) == (category is None):
+            raise ValidationError(
+                'Exactly one of "Tag" and "Category" must be set.'
+            )
+        if due_back is not None and due_out > due_back:
+            raise ValidationError(_a_before_b_message(
+                models.Lend._meta.get_field('due_out').verbose_name,
+                models.Lend._meta.get_field('due_back').verbose_name,
+            ))
+        tags = [tag] if tag is not None else category.tags.all()
+        self.item = scheduling.allocate(tags, due_out, due_back)
+        if self.item is None:
+            raise ValidationError(
+                'No item is free to be reserved from {} to {}.'.format(
+                    due_out,
+                    _infinity_if_none(due_back)
+                )
+            )
+        return cleaned_data
+
+    def save(self):
+        """Reserve the chosen item, and return the new ``Lend``.
+
+        The form must be valid.
+
+        """
+        return models.Lend.objects.create(
+            item_id = self.item,
+            user_id = self.cleaned_data['user_id'],
+            due_out = self.cleaned_data['due_out'],
+            due_back = self.cleaned_data['due_back'],
+        )
+
+class WaitlistEntryForm(ModelForm):
+    """A form for waiting for an item to become free.
+
+    Once the entry is saved, it should be handed to ``waiting.promote``, as
+    the item may already be free. See ``elts.waiting``.
+
+    """
+    user_id = LendUserField(
+        queryset = User.objects.select_related('lateness'),
+        label = capfirst(models.Lend._meta.get_field('user_id').verbose_name),
+    )
+
+    class Meta(object):
+        """Form attributes that are not fields."""
+        model = models.WaitlistEntry
+        fields = ['item_id', 'user_id', 'due_out', 'due_back']
+        widgets = {
+            'due_out':  widgets.DateInput(attrs = {'type': 'date'}),
+            'due_back': widgets.DateInput(attrs = {'type': 'date'}),
+        }
+
+    def clean(self):
+        """Check that ``due_out`` comes before ``due_back``."""
+        cleaned_data = super(WaitlistEntryForm, self).clean()
+        due_out = cleaned_data.get('due_out')
+        due_back = cleaned_data.get('due_back')
+        if (due_out and due_back) and (due_out > due_back):
+            raise ValidationError(_a_before_b_message(
+                models.WaitlistEntry._meta.get_field('due_out').verbose_name,
+                models.WaitlistEntry._meta.get_field('due_back').verbose_name,
+            ))
+        return cleaned_data
+
+class KitLendForm(ModelForm):
+    """A form for reserving every item in a kit.
+
+    Validation fails if any item in the kit clashes with an existing
+    reservation, and each clash is reported. Once the form is valid, ``save``
+    reserves every item. See ``elts.kits``.
+
+    """
+    user_id = LendUserField(
+        queryset = User.objects.select_related('lateness'),
+        label = capfirst(models.Lend._meta.get_field('user_id').verbose_name),
+    )
+
+    class Meta(object):
+        """Form attributes that are not fields."""
+        model = models.KitLend
+        fields = ['kit_id', 'user_id', 'due_out', 'due_back']
+        widgets = {
+            'due_out':  widgets.DateInput(attrs = {'type': 'date'}),
+            'due_back': widgets.DateInput(attrs = {'type': 'date'}),
+        }
+
+    def item_ids(self):
+        """Return the IDs of the items in the chosen kit.
+
+        This is judged from the raw data, so that the items can be locked
+        before the form is validated. See ``writes.items_locked``.
+
+        """
+        try:
+            kit = self.fields['kit_id'].clean(self['kit_id'].value())
+        except ValidationError:
+            return []
+        return [] if kit is None else kits.item_ids(kit)
+
+    def clean(self):
+        """Check that every item in the kit is free."""
+        cleaned_data = super(KitLendForm, self).clean()
+        kit = cleaned_data.get('kit_id')
+        due_out = cleaned_data.get('due_out')
+        due_back = cleaned_data.get('due_back')
+        if kit is None or due_out is None:
+            # A required field is missing or invalid, and has its own error.
+            return cleaned_data
+
+        if due_back and due_out > due_back:
+            raise ValidationError(_a_before_b_message(
+                models.KitLend._meta.get_field('due_out').verbose_name,
+                models.KitLend._meta.get_field('due_back').verbose_name,
+            ))
+        item_ids = kits.item_ids(kit)
+        if not item_ids:
+            raise ValidationError('The kit has no items.')
+        messages = [
+            u'{}: {}'.format(item, _already_reserved_message(
+                due_out,
+                due_back,
+                list(clashes)
+            ))
+            for item, clashes in groupby(
+                kits.conflicts(item_ids, due_out, due_back),
+                lambda lend: lend.item_id
+            )
+        ]
+        if messages:
+            raise ValidationError(messages)
+        return cleaned_data
+
+    def save(self, commit = True):
+        """Reserve every item in the kit, and return the new ``KitLend``.
+
+        The form must be valid, and ``commit`` must be true.
+
+        """
+        return kits.reserve(
+            self.cleaned_data['kit_id'],
+            self.cleaned_data['user_id'],
+            self.cleaned_data['due_out'],
+            self.cleaned_data['due_back'],
+        )
+
 def _infinity_if_none(obj):
     """Return 'infinity' if ``obj`` is None, else ``obj``.
 
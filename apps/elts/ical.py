@@ -0,0 +1,272 @@
+"""Lends as iCalendar feeds, for use in calendar clients.
+
+A feed is a VCALENDAR document with one VEVENT per lend. See RFC 5545:
+https://tools.ietf.org/html/rfc5545
+
+If an item has gone out, its event runs from ``out`` to ``back``, or to the end
+of ``due_back`` if the item has not come back. Otherwise, the lend is only a
+reservation, and its event covers the days from ``due_out`` to ``due_back``.
+
+A feed only covers a window of days around today, and it is produced a line at a
+time from a single query, so that it can be streamed to the client. Calendar
+clients poll feeds, so views should answer conditional requests from
+``caching.get_version(signals.LENDS_VERSION)`` before calling ``feed``.
+
+Calendar clients cannot log in. Instead, a feed URL may carry a token, made by
+``make_token``, which stands in for a user, but only when reading the one feed
+it was made for. Feeds are named as by ``feed_name``. The user's ``FeedKey`` is
+signed into each token, so ``revoke_tokens`` revokes all of the user's tokens
+at once.
+
+The following settings are understood:
+
+``ELTS_FEED_PAST_DAYS``
+    How many days before today a feed covers. Defaults to 90.
+``ELTS_FEED_FUTURE_DAYS``
+    How many days after today a feed covers. Defaults to 365.
+
+"""
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from elts.models import FeedKey, Lend
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+
+# Salts the signatures of tokens, so that they cannot be used as signatures for
+# anything else.
+_TOKEN_SALT = 'elts.ical'
+
+def window(today):
+    """Return the first and last days that a feed covers, as of ``today``."""
+    return (
+        today - timedelta(days = getattr(settings, 'ELTS_FEED_PAST_DAYS', 90)),
+        today + timedelta(
+            days = getattr(settings, 'ELTS_FEED_FUTURE_DAYS', 365)
+        ),
+    )
+
+def lends(today, **filters):
+    """Return the lends that a feed covers, as of ``today``.
+
+    ``filters`` narrow the lends, as for ``QuerySet.filter``. A lend is covered
+    if any of its dates or times falls within ``window(today)``, or if its item
+    is out. Each of these conditions can be answered from an index.
+
+    """
+    lower, upper = window(today)
+    lower_time, upper_time = (
+        timezone.make_aware(
+            datetime.combine(day, time()),
+            timezone.get_current_timezone()
+        )
+        for day in (lower, upper + timedelta(days = 1))
+    )
+    return Lend.objects.filter(
+        Q(due_out__range = (lower, upper))
+        | Q(due_back__range = (lower, upper))
+        | Q(out__gte = lower_time, out__lt = upper_time)
+        | Q(back__gte = lower_time, back__lt = upper_time)
+        | Q(out__isnull = False, back__isnull = True),
+        **filters
+    ).select_related('item_id', 'user_id').order_by('id')
+
+def feed(name, lends_, stamp, show_user = False):
+    """Yield the lines of a feed named ``name`` listing ``lends_``.
+
+    ``stamp`` is an aware datetime, the time at which the lends were last
+    changed. If ``show_user`` is true, each event names the borrower. Each line
+    is a UTF-8 encoded string ending in CRLF.
+
+    """
+    for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//ELTS//Lends//EN',
+        'CALSCALE:GREGORIAN',
+        u'X-WR-CALNAME:{}'.format(escape(name)),
+    ):
+        yield fold(line)
+    for lend in lends_.iterator():
+        for line in event(lend, stamp, show_user):
+            yield fold(line)
+    yield fold('END:VCALENDAR')
+
+def event(lend, stamp, show_user = False):
+    """Return the unfolded lines of a VEVENT describing ``lend``.
+
+    >>> from elts.models import Item
+    >>> from datetime import date
+    >>> lend = Lend(
+    ...     id = 7,
+    ...     item_id = Item(name = 'Projector, 2nd floor'),
+    ...     due_out = date(2014, 3, 10),
+    ...     due_back = date(2014, 3, 12),
+    ... )
+    >>> stamp = datetime(2014, 3, 1, tzinfo = timezone.utc)
+    >>> for line in event(lend, stamp):
+    ...     print(line)
+    BEGIN:VEVENT
+    UID:lend-7@elts
+    DTSTAMP:20140301T000000Z
+    SUMMARY:Reserved: Projector\\, 2nd floor
+    DTSTART;VALUE=DATE:20140310
+    DTEND;VALUE=DATE:20140313
+    END:VEVENT
+
+    """
+    if lend.out is None:
+        status = u'Reserved'
+    elif lend.back is None:
+        status = u'Lent'
+    else:
+        status = u'Returned'
+    summary = u'{}: {}'.format(status, lend.item_id)
+    if show_user:
+        summary = u'{} ({})'.format(summary, lend.user_id)
+
+    lines = [
+        'BEGIN:VEVENT',
+        'UID:lend-{}@elts'.format(lend.id),
+        'DTSTAMP:{}'.format(_format_datetime(stamp)),
+        u'SUMMARY:{}'.format(escape(summary)),
+    ]
+    if lend.out is not None:
+        lines.append('DTSTART:{}'.format(_format_datetime(lend.out)))
+        if lend.back is not None:
+            lines.append('DTEND:{}'.format(_format_datetime(lend.back)))
+        elif lend.due_back is not None:
+            end = timezone.make_aware(
+                datetime.combine(lend.due_back + timedelta(days = 1), time()),
+                timezone.get_current_timezone()
+            )
+            if end > lend.out:
+                lines.append('DTEND:{}'.format(_format_datetime(end)))
+    else:
+        first = lend.due_out or lend.due_back
+        if first is None:
+            return []
+        last = max(lend.due_back or first, first)
+        lines.append('DTSTART;VALUE=DATE:{}'.format(first.strftime('%Y%m%d')))
+        lines.append('DTEND;VALUE=DATE:{}'.format(
+            (last + timedelta(days = 1)).strftime('%Y%m%d')
+        ))
+    lines.append('END:VEVENT')
+    return lines
+
+def escape(text):
+    """Escape ``text`` for use as a TEXT value.
+
+    >>> print(escape(u'a, b; c\\\\d\\ne'))
+    a\\, b\\; c\\\\d\\ne
+
+    """
+    return (
+        text.replace(u'\\', u'\\\\')
+        .replace(u';', u'\\;')
+        .replace(u',', u'\\,')
+        .replace(u'\n', u'\\n')
+    )
+
+def fold(line):
+    """Encode ``line`` as UTF-8, fold it, and end it with CRLF.
+
+    Lines longer than 75 octets are split, and each continuation starts with a
+    space. A multi-byte character is never split.
+
+    >>> fold(u'SUMMARY:' + u'x' * 67).count('\\r\\n ')
+    0
+    >>> fold(u'SUMMARY:' + u'x' * 80).count('\\r\\n ')
+    1
+    >>> len(fold(u'X:' + u'\\xe9' * 40).split('\\r\\n')[0])
+    74
+
+    """
+    encoded = line.encode('utf-8')
+    parts = []
+    limit = 75
+    while len(encoded) > limit:
+        cut = limit
+        # Continuation bytes of a UTF-8 character look like 0b10xxxxxx.
+        while ord(encoded[cut:cut + 1]) & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut])
+        encoded = encoded[cut:]
+        # Continuations start with a space, which counts towards their length.
+        limit = 74
+    parts.append(encoded)
+    return b'\r\n '.join(parts) + b'\r\n'
+
+def feed_name(kind, id_):
+    """Return the name of the feed of ``kind`` ``id_``.
+
+    ``kind`` is ``'user'`` or ``'tag'``.
+
+    >>> feed_name('tag', 3)
+    'tag-3'
+
+    """
+    return '{}-{}'.format(kind, id_)
+
+def make_token(user, feed):
+    """Return a token that grants access to feed ``feed`` as ``user``.
+
+    A token stays valid until ``revoke_tokens`` is called for ``user``, or
+    until the ``SECRET_KEY`` setting is changed.
+
+    """
+    return signing.Signer(salt = _TOKEN_SALT).sign(
+        '{}:{}:{}'.format(feed, user.id, _nonce(user.id))
+    )
+
+def check_token(token, feed):
+    """Return the active user that ``token`` was made for.
+
+    Return ``None`` if ``token`` is not valid, if it was made for a feed other
+    than ``feed``, or if it has been revoked.
+
+    >>> check_token('tag-3:15::forged', 'tag-3') is None
+    True
+
+    """
+    try:
+        value = signing.Signer(salt = _TOKEN_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    try:
+        token_feed, user_id, nonce = value.split(':')
+    except ValueError:
+        return None
+    if token_feed != feed or nonce != _nonce(user_id):
+        return None
+    try:
+        return User.objects.get(id = user_id, is_active = True)
+    except User.DoesNotExist:
+        return None
+
+def revoke_tokens(user):
+    """Revoke every token made for ``user`` so far."""
+    key = FeedKey.objects.get_or_create(user = user)[0]
+    key.nonce = get_random_string(FeedKey.MAX_LEN_NONCE)
+    key.save()
+
+def _nonce(user_id):
+    """Return the nonce signed into the tokens of user ``user_id``."""
+    nonces = FeedKey.objects.filter(
+        user = user_id
+    ).values_list('nonce', flat = True)
+    return nonces[0] if nonces else ''
+
+def _format_datetime(value):
+    """Return ``value``, an aware datetime, as a UTC DATE-TIME.
+
+    >>> _format_datetime(datetime(2014, 3, 1, 12, 30, tzinfo = timezone.utc))
+    '20140301T123000Z'
+
+    """
+    return timezone.localtime(value, timezone.utc).strftime('%Y%m%dT%H%M%SZ')
@@ -0,0 +1,205 @@
+"""Answer retried requests without handling them twice.
+
+A client on a flaky network may send a ``POST`` request, lose the response, and
+send the request again. Each copy would create a lend, item or note. To prevent
+that, a client may give each request a key of its choosing, either in an
+``Idempotency-Key`` header or in an ``idempotency_key`` form field. The forms
+which ELTS shows carry such a field, holding a fresh key each time a form is
+shown. See ``templatetags.form_tools``.
+
+A view decorated with ``idempotent`` remembers its response to each request
+bearing a key. If a request arrives with a key that has been seen before, the
+remembered response is sent, and the view is not called. Nothing is validated
+or written a second time. A key is only matched by requests from the same user
+to the same URL, so users never see each other's responses.
+
+A key is claimed before the view is called, by inserting a row which only one
+request can insert. If a request arrives while another with the same key is
+still being handled, it is answered with 409 Conflict, and the client may try
+again later. If the view raises an exception or answers with a server error,
+the key is released, so that the request can be retried for real.
+
+A process may die while handling a request, leaving its key claimed but never
+answered. So a claim is only a lease: once it is older than
+``ELTS_IDEMPOTENCY_LEASE`` seconds without a response, the next request with
+that key claims the key afresh. A request which outlives its lease cannot
+record its response, as its claim is gone. The lease should be longer than any
+request may take, for example longer than the app server's request timeout.
+
+Keys are stored as ``IdempotencyKey`` objects, along with the status code,
+``Location`` header, content type and body of each response. A response which
+redirects, as most successful ones do, is stored without its body. Expired keys
+are ignored, and the ``purge_idempotency_keys`` task deletes them. See
+``elts.tasks``.
+
+The following settings are understood:
+
+``ELTS_IDEMPOTENCY_KEY_TTL``
+    How many seconds a key is remembered for. Defaults to 86400, or one day.
+``ELTS_IDEMPOTENCY_LEASE``
+    How many seconds a key may stay claimed without a response. Defaults to 60.
+
+"""
+from datetime import timedelta
+from django import http
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from elts import writes
+from elts.models import IdempotencyKey
+from functools import wraps
+import hashlib
+import uuid
+
+# pylint: disable=E1101
+# Class 'IdempotencyKey' has no 'objects' member (no-member)
+
+# Where a key is looked for: a header, as it appears in ``request.META``, and a
+# form field.
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+FIELD = 'idempotency_key'
+
+def idempotent(view):
+    """Decorate ``view`` so that it handles each keyed request only once.
+
+    Requests other than ``POST`` requests, and requests without a key, are
+    passed straight to ``view``. ``view`` must require a login.
+
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        """Call ``view``, or replay its response to an earlier request."""
+        key = _get_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+        claim, earlier = _claim(_digest(request.user.pk, request.path, key))
+        if earlier is not None:
+            return _replay(earlier)
+
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                # The body of a ``TemplateResponse`` is not made until now.
+                response.render()
+        except Exception:
+            _release(claim)
+            raise
+        if response.status_code >= 500:
+            _release(claim)
+        else:
+            _record(claim, response)
+        return response
+    return wrapper
+
+def new_key():
+    """Return a fresh key, for a form to be submitted with.
+
+    >>> len(new_key())
+    32
+    >>> new_key() == new_key()
+    False
+
+    """
+    return uuid.uuid4().hex
+
+def purge():
+    """Delete the keys which have expired."""
+    IdempotencyKey.objects.filter(created__lt = _oldest()).delete()
+
+def _get_key(request):
+    """Return the key sent with ``request``, or ``None``."""
+    if request.method != 'POST':
+        return None
+    return request.META.get(HEADER) or request.POST.get(FIELD) or None
+
+def _digest(user_id, path, key):
+    """Identify ``key``, as sent by user ``user_id`` to ``path``.
+
+    >>> len(_digest(1, '/lend/', 'abc'))
+    40
+    >>> _digest(1, '/lend/', 'abc') == _digest(2, '/lend/', 'abc')
+    False
+    >>> _digest(1, '/lend/', 'abc') == _digest(1, '/item/', 'abc')
+    False
+
+    """
+    return hashlib.sha1(
+        b'\n'.join(force_bytes(part) for part in (user_id, path, key))
+    ).hexdigest()
+
+def _oldest():
+    """Return when the oldest key which has not expired was created."""
+    return timezone.now() - timedelta(
+        seconds = getattr(settings, 'ELTS_IDEMPOTENCY_KEY_TTL', 86400)
+    )
+
+def _lease_start():
+    """Return when the oldest claim whose lease has not run out was made."""
+    return timezone.now() - timedelta(
+        seconds = getattr(settings, 'ELTS_IDEMPOTENCY_LEASE', 60)
+    )
+
+@writes.serialized
+def _claim(digest):
+    """Claim the key identified by ``digest``.
+
+    Return a ``(claim, earlier)`` tuple. If the key was claimed, ``claim`` is
+    the new ``IdempotencyKey`` and ``earlier`` is ``None``. Otherwise,
+    ``claim`` is ``None`` and ``earlier`` is the ``IdempotencyKey`` of the
+    earlier request which claimed it.
+
+    """
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(
+                Q(created__lt = _oldest())
+                | Q(status__isnull = True, created__lt = _lease_start()),
+                digest = digest,
+            ).delete()
+            return IdempotencyKey.objects.create(digest = digest), None
+    except IntegrityError:
+        # If the earlier request has just released the key, it is treated as
+        # still being handled, and the client will try again.
+        earlier = IdempotencyKey.objects.filter(digest = digest).first()
+        return None, earlier or IdempotencyKey(digest = digest)
+
+@writes.serialized
+def _record(claim, response):
+    """Remember ``response`` as the response to the key claimed by ``claim``.
+
+    Nothing is remembered if the lease of ``claim`` has run out and another
+    request has claimed the key since.
+
+    """
+    location = response.get('Location', '')
+    IdempotencyKey.objects.filter(id = claim.id).update(
+        status = response.status_code,
+        location = location,
+        content_type = response.get('Content-Type', ''),
+        content = b'' if location else response.content,
+    )
+
+@writes.serialized
+def _release(claim):
+    """Forget the key claimed by ``claim``, so its request can be retried."""
+    IdempotencyKey.objects.filter(id = claim.id).delete()
+
+def _replay(earlier):
+    """Return the response remembered by the ``IdempotencyKey`` ``earlier``."""
+    if earlier.status is None:
+        return http.HttpResponse(
+            'A request with this idempotency key is still being handled.',
+            content_type = 'text/plain',
+            status = 409,
+        )
+    response = http.HttpResponse(
+        bytes(earlier.content),
+        content_type = earlier.content_type,
+        status = earlier.status,
+    )
+    if earlier.location:
+        response['Location'] = earlier.location
+    response['Idempotent-Replayed'] = 'true'
+    return response
@@ -0,0 +1,266 @@
+"""A queue of jobs which are run outside of any request.
+
+Some work is too slow to do while a user waits, or is not prompted by any
+request at all. Such work is written as a task: a function registered with the
+``task`` decorator, usually in ``elts.tasks``. A call to a task is saved in the
+database as a ``Job``, either by ``enqueue`` for a single call or by
+``schedule`` for a call that recurs. Worker processes, started with
+``manage.py run_jobs``, run jobs as they come due.
+
+A worker claims a job with a single ``UPDATE`` that changes the job from waiting
+to running and that only matches a waiting job. Only one worker can win that
+race, so a job is never run twice at once, however many workers there are. The
+bookkeeping is done through ``elts.writes``, so workers share the write queue
+with the app server when it is enabled. A task has at most one recurring job,
+as ``Job.recurring`` is unique, so workers which start together cannot
+schedule it twice.
+
+A task is normally run in a transaction. If it raises an exception, its changes
+are rolled back, and the job is tried again later. Each retry waits twice as long as
+the one before. Once a job has been tried ``Job.max_attempts`` times, it is
+marked as failed, and its traceback is kept. A recurring job is never marked as
+failed. Instead, it waits for its next run.
+
+The following settings are understood:
+
+``ELTS_JOB_POLL``
+    How many seconds an idle worker waits before looking for jobs again.
+    Defaults to 5.
+``ELTS_JOB_RETRY_DELAY``
+    How many seconds a job waits before it is tried for the second time.
+    Defaults to 60.
+``ELTS_JOB_TIMEOUT``
+    How many seconds a job may run for. A job which has been running for
+    longer is assumed to belong to a worker that died. This counts as a failed
+    attempt, so a job which keeps killing its worker is eventually marked as
+    failed. If the first worker does finish after all, what it records is
+    thrown away. Defaults to 3600.
+
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from elts import caching, writes
+from elts.models import Job
+import json
+import os
+import socket
+import time
+import traceback
+
+# pylint: disable=E1101
+# Class 'Job' has no 'objects' member (no-member)
+
+# Maps the name of each task to the function that it calls, and to whether
+# that function is run in a transaction.
+_TASKS = {}
+
+def task(function = None, atomic = True):
+    """Register ``function`` as a task, named after the function.
+
+    A task is normally run in a transaction. A task with effects outside of the
+    database, such as sending email, may be registered with ``atomic = False``,
+    so that whatever it records about those effects is kept even if it later
+    fails.
+
+    >>> @task
+    ... def doctest_task():
+    ...     pass
+    >>> get_task('doctest_task') == (doctest_task, True)
+    True
+    >>> @task(atomic = False)
+    ... def doctest_task():
+    ...     pass
+    >>> get_task('doctest_task') == (doctest_task, False)
+    True
+
+    """
+    if function is None:
+        return lambda function: task(function, atomic)
+    _TASKS[function.__name__] = (function, atomic)
+    return function
+
+def get_task(name):
+    """Return the function registered as task ``name``, and whether it is run
+    in a transaction.
+
+    Raise a ``LookupError`` if there is no such task.
+
+    """
+    try:
+        return _TASKS[name]
+    except KeyError:
+        raise LookupError('There is no task named "{}".'.format(name))
+
+def enqueue(name, run_at = None, interval = None, **arguments):
+    """Create a job which calls task ``name`` with keyword ``arguments``.
+
+    The job is run at ``run_at``, an aware datetime, or as soon as possible if
+    ``run_at`` is ``None``. If ``interval`` is given, the job recurs every
+    ``interval`` seconds. The new ``Job`` is returned.
+
+    """
+    return Job.objects.create(
+        task = name,
+        arguments = json.dumps(arguments),
+        run_at = timezone.now() if run_at is None else run_at,
+        interval = interval,
+    )
+
+def schedule(name, interval):
+    """Make sure that task ``name`` is run every ``interval`` seconds.
+
+    If the task already has a recurring job, its interval is changed. Otherwise,
+    a recurring job is created and run as soon as possible.
+
+    """
+    if Job.objects.filter(recurring = name).update(interval = interval):
+        return
+    try:
+        with transaction.atomic():
+            Job.objects.create(
+                task = name,
+                recurring = name,
+                run_at = timezone.now(),
+                interval = interval,
+            )
+    except IntegrityError:
+        # Another worker has just created the job.
+        Job.objects.filter(recurring = name).update(interval = interval)
+
+def work(once = False):
+    """Run jobs as they come due.
+
+    If ``once`` is true, return as soon as no jobs are due. Otherwise, run
+    forever.
+
+    """
+    worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+    poll = getattr(settings, 'ELTS_JOB_POLL', 5)
+    while True:
+        job = claim(worker)
+        if job is not None:
+            run(job)
+        elif once:
+            return
+        else:
+            time.sleep(poll)
+
+@writes.serialized
+def claim(worker):
+    """Claim a job that is due, on behalf of ``worker``.
+
+    Return the claimed ``Job``, or ``None`` if no job is due.
+
+    """
+    now = timezone.now()
+    timeout = getattr(settings, 'ELTS_JOB_TIMEOUT', 3600)
+    for job in Job.objects.filter(
+        status = Job.RUNNING,
+        started__lt = now - timedelta(seconds = timeout),
+    ):
+        _record(job, now, u'{} did not finish within {} seconds.'.format(
+            job.worker,
+            timeout
+        ))
+
+    # Another worker may claim a job between the SELECT and the UPDATE, so
+    # consider a few jobs rather than just the first.
+    for job in Job.objects.filter(
+        status = Job.WAITING,
+        run_at__lte = now,
+    ).order_by('run_at')[:10]:
+        if Job.objects.filter(id = job.id, status = Job.WAITING).update(
+            status = Job.RUNNING,
+            worker = worker,
+            started = now,
+        ):
+            job.status = Job.RUNNING
+            job.worker = worker
+            job.started = now
+            return job
+    return None
+
+def run(job):
+    """Run ``job``, which has been claimed, and record the outcome."""
+    try:
+        function, atomic = get_task(job.task)
+        if atomic:
+            try:
+                with transaction.atomic():
+                    function(**json.loads(job.arguments))
+            finally:
+                caching.bump_pending()
+        else:
+            function(**json.loads(job.arguments))
+    except Exception: # pylint: disable=W0703
+        # A task may raise anything. The traceback is kept for whoever fixes it.
+        _finish(job, traceback.format_exc())
+    else:
+        _finish(job, None)
+
+@writes.serialized
+def _finish(job, error):
+    """Record that ``job`` has run, raising ``error`` if it is not ``None``.
+
+    ``error`` is a traceback. Nothing is recorded if the job has been taken
+    away from its worker for running too long. See ``claim``.
+
+    """
+    _record(job, timezone.now(), error)
+
+def _record(job, now, error):
+    """Record that ``job`` has stopped running at ``now``.
+
+    ``error`` describes why the job failed, or is ``None`` if it succeeded.
+    ``job`` is only updated if it is still running on the same worker. Whether
+    it was is returned.
+
+    """
+    worker = job.worker
+    job.worker = ''
+    job.finished = now
+    if error is None:
+        job.attempts = 0
+        job.error = ''
+        if job.interval is None:
+            job.status = Job.DONE
+        else:
+            job.status = Job.WAITING
+            job.run_at = max(
+                job.run_at + timedelta(seconds = job.interval),
+                now
+            )
+    else:
+        job.attempts += 1
+        job.error = error
+        job.status = Job.WAITING
+        if job.attempts < job.max_attempts:
+            job.run_at = now + timedelta(seconds = _retry_delay(job.attempts))
+        elif job.interval is not None:
+            job.attempts = 0
+            job.run_at = now + timedelta(seconds = job.interval)
+        else:
+            job.status = Job.FAILED
+    return bool(Job.objects.filter(
+        id = job.id,
+        status = Job.RUNNING,
+        worker = worker,
+    ).update(
+        status = job.status,
+        worker = job.worker,
+        finished = job.finished,
+        attempts = job.attempts,
+        error = job.error,
+        run_at = job.run_at,
+    ))
+
+def _retry_delay(attempts):
+    """Return how long to wait after a job has failed ``attempts`` times.
+
+    >>> [_retry_delay(attempts) for attempts in (1, 2, 3)]
+    [60, 120, 240]
+
+    """
+    return getattr(settings, 'ELTS_JOB_RETRY_DELAY', 60) * 2 ** (attempts - 1)
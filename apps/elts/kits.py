@@ -0,0 +1,79 @@
+"""Reserve every item in a kit at once.
+
+A kit, such as a camera with two lenses and a tripod, groups items which are
+lent together. See ``models.Kit``. Reserving a kit reserves every one of its
+items for the same user and days, or none of them.
+
+Reservations are compared as ``forms.LendForm`` compares them: a reservation
+covers the days from ``due_out`` to ``due_back``, and lasts forever if
+``due_back`` is not set. The existing reservations of all of a kit's items are
+checked with a single query. The new reservations are saved as a ``KitLend``
+and a single ``bulk_create`` of one ``Lend`` per item, in one transaction.
+``bulk_create`` does not send signals, so ``signals.lends_changed`` is called
+to do what the signal receivers would have done.
+
+Checking that the items are free and then reserving them are two steps, so
+callers should do both while the items are locked. See
+``writes.items_locked``.
+
+"""
+from django.db import transaction
+from django.db.models import Q
+from elts import signals
+from elts.models import KitLend, Lend
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+
+def item_ids(kit):
+    """Return the IDs of the items in ``kit``, sorted."""
+    return sorted(kit.items.values_list('id', flat = True))
+
+def conflicts(item_ids_, due_out, due_back = None):
+    """Find the reservations of items ``item_ids_`` which clash with new ones.
+
+    ``due_out`` and ``due_back`` are ``datetime.date`` objects, giving the days
+    of the new reservations. If ``due_back`` is ``None``, they last forever.
+    A list of the clashing ``Lend`` objects is returned, sorted by item and
+    then by ``due_out``.
+
+    """
+    lends = Lend.objects.filter(
+        Q(due_back__isnull = True) | Q(due_back__gte = due_out),
+        item_id__in = item_ids_,
+    )
+    if due_back is not None:
+        lends = lends.filter(due_out__lte = due_back)
+    return list(lends.select_related('item_id').order_by(
+        'item_id',
+        'due_out',
+        'id'
+    ))
+
+def reserve(kit, user, due_out, due_back = None):
+    """Reserve every item in ``kit`` for ``user``.
+
+    ``due_out`` and ``due_back`` are as for ``conflicts``, which should have
+    found nothing. The new ``KitLend`` is returned.
+
+    """
+    item_ids_ = item_ids(kit)
+    with transaction.atomic():
+        kit_lend = KitLend.objects.create(
+            kit_id = kit,
+            user_id = user,
+            due_out = due_out,
+            due_back = due_back,
+        )
+        Lend.objects.bulk_create([
+            Lend(
+                item_id_id = item_id,
+                user_id = user,
+                due_out = due_out,
+                due_back = due_back,
+                kit_lend_id = kit_lend,
+            )
+            for item_id in item_ids_
+        ])
+    signals.lends_changed(item_ids_, [user.id])
+    return kit_lend
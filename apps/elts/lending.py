@@ -0,0 +1,179 @@
+"""Check items out and in at the desk.
+
+Handing an item over, or taking it back, only changes ``out`` or ``back`` of a
+single lend. Saving a whole ``forms.LendForm`` for that re-validates every
+field and looks for clashing reservations as well as clashing lends. The
+functions here do just what a barcode scanner at the desk needs:
+
+``check_out``
+    Find the item's reservation which is due out today, check that nobody else
+    has the item and that the borrower is within their quota, and set ``out``
+    to now.
+``check_in``
+    Find the lend which has the item out, and set ``back`` to now.
+``check_in_many``
+    Do the same for many items or lends at once, such as at closing time.
+
+Each needs a few queries on indexed columns and one ``UPDATE``. The
+``UPDATE`` only matches the lend if it is still in the state it was found in,
+and it also bumps the lend's version, so that forms made from the old lend are
+seen to be stale. See ``forms.VersionedForm``. ``QuerySet.update`` sends no
+signals, so ``signals.lends_changed`` is called to do what the signal
+receivers would have done.
+
+"""
+from django.db.models import F, Q
+from django.utils import timezone
+from elts import quotas, signals, writes
+from elts.models import Lend
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+
+class Unavailable(Exception):
+    """An item cannot be checked out, though it is reserved for today."""
+
+def check_out(item, now, user_id = None):
+    """Hand over ``item``, as it was reserved for today.
+
+    ``now`` is an aware ``datetime.datetime``. The earliest reservation of
+    ``item`` which is due out by today, is not yet due back, and has not been
+    checked out, is checked out. If ``user_id`` is given, only the reservations
+    of the user with that ID are considered. The updated ``Lend`` is returned.
+
+    ``LookupError`` is raised if there is no such reservation. ``Unavailable``
+    is raised if another lend has the item out, or if the borrower already has
+    as many items out as they may. See ``elts.quotas``.
+
+    """
+    today = timezone.localtime(now).date()
+    reservations = Lend.objects.filter(
+        Q(due_back__isnull = True) | Q(due_back__gte = today),
+        item_id = item,
+        out__isnull = True,
+        due_out__lte = today,
+    )
+    if user_id is not None:
+        reservations = reservations.filter(user_id = user_id)
+    # The borrower's quota is checked while they are locked, but the borrower
+    # is not known until the reservation is found. So each borrower it might
+    # be is locked, and the reservation is found again.
+    user_ids = set(reservations.values_list('user_id', flat = True))
+    with writes.items_locked([item.id], user_ids):
+        lend = reservations.order_by('due_out', 'id').first()
+        if lend is None:
+            raise LookupError(
+                u'{} has no reservation to check out today.'.format(item)
+            )
+        if lend.user_id_id not in user_ids:
+            raise LookupError(
+                u'The reservations of {} have just been changed.'.format(item)
+            )
+        holder = Lend.objects.filter(
+            Q(back__isnull = True) | Q(back__gte = now),
+            item_id = item,
+            out__lte = now,
+        ).select_related('user_id').first()
+        if holder is not None:
+            raise Unavailable(u'{} is already out to {}.'.format(
+                item,
+                holder.user_id
+            ))
+        quota = quotas.full(lend.user_id_id)
+        if quota is not None:
+            raise Unavailable(quotas.full_message(lend.user_id, quota))
+        _set(lend, 'out', now, out__isnull = True)
+        # The borrower's count must be updated before they are unlocked.
+        signals.lends_changed([item.id], [lend.user_id_id])
+    return lend
+
+def check_in(item, now):
+    """Take back ``item``.
+
+    ``now`` is an aware ``datetime.datetime``. The lend which has ``item`` out
+    is checked in, and the updated ``Lend`` is returned. ``LookupError`` is
+    raised if no lend has the item out.
+
+    """
+    lends = Lend.objects.filter(
+        item_id = item,
+        out__lte = now,
+        back__isnull = True,
+    )
+    # As in ``check_out``, the borrower is recounted while they are locked, so
+    # each borrower the lend might belong to is locked, and it is found again.
+    user_ids = set(lends.values_list('user_id', flat = True))
+    with writes.items_locked([item.id], user_ids):
+        lend = lends.order_by('out', 'id').first()
+        if lend is None:
+            raise LookupError(u'{} is not checked out.'.format(item))
+        if lend.user_id_id not in user_ids:
+            raise LookupError(
+                u'The lends of {} have just been changed.'.format(item)
+            )
+        _set(lend, 'back', now, back__isnull = True)
+        signals.lends_changed([item.id], [lend.user_id_id])
+    return lend
+
+def check_in_many(now, item_ids = (), lend_ids = ()):
+    """Take back the items ``item_ids``, and the items lent by ``lend_ids``.
+
+    ``now`` is an aware ``datetime.datetime``. Every lend which has one of
+    ``item_ids`` out, and every lend in ``lend_ids`` which is out, is checked
+    in with a single ``UPDATE``.
+
+    A dict is returned. It maps the ID of each item in ``item_ids``, and of
+    each item that was checked in, to a list of the IDs of the lends which
+    were checked in for it. The list is empty if the item was not out.
+
+    """
+    item_ids = set(item_ids)
+    lend_ids = set(lend_ids)
+    if not (item_ids or lend_ids):
+        return {}
+    lends = Lend.objects.filter(
+        Q(item_id__in = item_ids) | Q(id__in = lend_ids),
+        out__lte = now,
+        back__isnull = True,
+    )
+    # The lends are found again once their items and borrowers are locked, in
+    # case they have been checked in since. A lend which has gone out since to
+    # someone who is not locked is left alone, as if it had not been out.
+    found = list(lends.values_list('item_id', 'user_id'))
+    locked = item_ids | set(row[0] for row in found)
+    user_ids = set(row[1] for row in found)
+    with writes.items_locked(locked, user_ids):
+        rows = list(lends.filter(
+            item_id__in = locked,
+            user_id__in = user_ids,
+        ).values_list('id', 'item_id', 'user_id'))
+        Lend.objects.filter(id__in = [row[0] for row in rows]).update(
+            back = now,
+            version = F('version') + 1,
+        )
+        # The borrowers' counts must be updated before they are unlocked.
+        if rows:
+            signals.lends_changed(
+                set(row[1] for row in rows),
+                set(row[2] for row in rows)
+            )
+    results = dict((item_id, []) for item_id in item_ids)
+    for lend_id, item_id, _ in sorted(rows):
+        results.setdefault(item_id, []).append(lend_id)
+    return results
+
+def _set(lend, field, value, **state):
+    """Set ``field`` of ``lend`` to ``value`` if ``lend`` matches ``state``.
+
+    ``state`` holds lookups which ``lend`` must still match in the database.
+    ``LookupError`` is raised if it does not. ``lend`` is updated to match the
+    database.
+
+    """
+    if not Lend.objects.filter(id = lend.id, **state).update(**{
+        field: value,
+        'version': F('version') + 1,
+    }):
+        raise LookupError('Lend {} has just been changed.'.format(lend.id))
+    setattr(lend, field, value)
+    lend.version += 1
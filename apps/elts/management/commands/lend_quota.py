@@ -0,0 +1,81 @@
+"""Provide the ``lend_quota`` command.
+
+Let user ``alice`` have at most 3 items out at once, and each member of group
+``students`` at most 2::
+
+    $ apps/manage.py lend_quota --user alice 3
+    $ apps/manage.py lend_quota --group students 2
+
+Remove ``alice``'s own quota, so that her groups' quotas apply again::
+
+    $ apps/manage.py lend_quota --user alice --clear
+
+Show every quota::
+
+    $ apps/manage.py lend_quota
+
+See ``elts.quotas`` for details.
+
+"""
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from elts.models import LendQuota
+from optparse import make_option
+
+# pylint: disable=E1101
+# Class 'LendQuota' has no 'objects' member (no-member)
+
+class Command(BaseCommand):
+    """Set, clear or show the quotas of users and groups."""
+    args = '[limit]'
+    help = 'Set how many items a user, or each member of a group, may have ' \
+        'out at once.'
+    option_list = BaseCommand.option_list + (
+        make_option('--user', help = 'The user whose quota is set.'),
+        make_option('--group', help = 'The group whose quota is set.'),
+        make_option(
+            '--clear',
+            action = 'store_true',
+            default = False,
+            help = 'Remove the quota instead of setting it.',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        """Set or clear a quota, or show every quota."""
+        if options['user'] is None and options['group'] is None:
+            if args or options['clear']:
+                raise CommandError('Give --user or --group.')
+            for quota in LendQuota.objects.select_related('user', 'group'):
+                self.stdout.write(unicode(quota))
+            return
+        if options['user'] is not None and options['group'] is not None:
+            raise CommandError('Give only one of --user and --group.')
+        try:
+            if options['user'] is not None:
+                owner = {'user': User.objects.get(username = options['user'])}
+            else:
+                owner = {'group': Group.objects.get(name = options['group'])}
+        except (User.DoesNotExist, Group.DoesNotExist):
+            raise CommandError('No such user or group.')
+
+        if options['clear']:
+            if args:
+                raise CommandError('Give no limit with --clear.')
+            LendQuota.objects.filter(**owner).delete()
+            return
+        if len(args) != 1:
+            raise CommandError('Give exactly one limit.')
+        try:
+            limit = int(args[0])
+        except ValueError:
+            limit = -1
+        if limit < 0:
+            raise CommandError('The limit must be a whole number.')
+        quota, created = LendQuota.objects.get_or_create(
+            defaults = {'limit': limit},
+            **owner
+        )
+        if not created:
+            quota.limit = limit
+            quota.save()
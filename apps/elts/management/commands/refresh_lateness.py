@@ -0,0 +1,19 @@
+"""Provide the ``refresh_lateness`` command.
+
+Summaries are normally kept up to date as lends are saved. Run this command
+after upgrading, or after changing lends without saving them one by one (for
+example, with ``QuerySet.update()``)::
+
+    $ apps/manage.py refresh_lateness
+
+"""
+from django.core.management.base import NoArgsCommand
+from elts import statistics
+
+class Command(NoArgsCommand):
+    """Recompute every user's ``LatenessSummary``."""
+    help = "Recompute every user's summary of how punctual they have been."
+
+    def handle_noargs(self, **options):
+        """Recompute the summaries."""
+        statistics.refresh_summaries()
@@ -0,0 +1,19 @@
+"""Provide the ``refresh_lend_counts`` command.
+
+Counts are normally kept up to date as lends are saved. Run this command after
+upgrading, or after changing lends without saving them one by one (for
+example, with ``QuerySet.update()``)::
+
+    $ apps/manage.py refresh_lend_counts
+
+"""
+from django.core.management.base import NoArgsCommand
+from elts import quotas
+
+class Command(NoArgsCommand):
+    """Recompute every user's ``ActiveLendCount``."""
+    help = 'Recompute how many items each user has out.'
+
+    def handle_noargs(self, **options):
+        """Recompute the counts."""
+        quotas.refresh_counts()
@@ -0,0 +1,65 @@
+"""Provide the ``repack`` command.
+
+Show how the future reservations of the items with tag 3 would be moved between
+those items, without moving them::
+
+    $ apps/manage.py repack 3
+
+Move them, and record what was moved::
+
+    $ apps/manage.py repack 3 --apply
+
+See ``elts.repacking`` for details.
+
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from elts import repacking
+from elts.models import Tag
+from optparse import make_option
+
+# pylint: disable=E1101
+# Class 'Tag' has no 'objects' member (no-member)
+
+class Command(BaseCommand):
+    """Repack the future reservations of the items with some tags."""
+    args = '<tag_id tag_id ...>'
+    help = 'Move future reservations between the items with each tag.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--apply',
+            action = 'store_true',
+            default = False,
+            help = 'Move the reservations. By default, only show the moves.',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        """Repack the reservations of each tag in turn."""
+        if not args:
+            raise CommandError('Give the ID of at least one tag.')
+        for tag_id in args:
+            try:
+                tag = Tag.objects.get(id = int(tag_id))
+            except (Tag.DoesNotExist, ValueError):
+                raise CommandError('No tag has ID {}.'.format(tag_id))
+            changes, before, after = repacking.repack(
+                tag,
+                date.today(),
+                apply = options['apply']
+            )
+            for lend, item_id in changes:
+                self.stdout.write('Lend {}: item {} to item {}'.format(
+                    lend.id,
+                    lend.item_id_id,
+                    item_id
+                ))
+            self.stdout.write(
+                'Tag {}: {} {} reservations. Score: {} to {}.'.format(
+                    tag.id,
+                    'Moved' if options['apply'] else 'Would move',
+                    len(changes),
+                    before,
+                    after
+                )
+            )
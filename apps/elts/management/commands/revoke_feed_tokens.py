@@ -0,0 +1,34 @@
+"""Provide the ``revoke_feed_tokens`` command.
+
+Revoke every calendar feed token made for user ``alice`` so far::
+
+    $ apps/manage.py revoke_feed_tokens alice
+
+Feed URLs shown to ``alice`` from then on carry new tokens. See ``elts.ical``
+for details.
+
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from elts import ical
+
+# pylint: disable=E1101
+# Class 'User' has no 'objects' member (no-member)
+
+class Command(BaseCommand):
+    """Revoke the calendar feed tokens of some users."""
+    args = '<username> [username ...]'
+    help = 'Revoke every calendar feed token made for the given users.'
+
+    def handle(self, *args, **options):
+        """Revoke the tokens of each user named in ``args``."""
+        if not args:
+            raise CommandError('Give at least one username.')
+        users = list(User.objects.filter(username__in = args))
+        missing = set(args) - set(user.username for user in users)
+        if missing:
+            raise CommandError(
+                'No such user: {}'.format(', '.join(sorted(missing)))
+            )
+        for user in users:
+            ical.revoke_tokens(user)
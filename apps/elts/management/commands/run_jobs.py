@@ -0,0 +1,59 @@
+"""Provide the ``run_jobs`` command.
+
+Start four worker processes, which run jobs until they are stopped::
+
+    $ apps/manage.py run_jobs --processes 4
+
+Run every job that is due, then exit. This is handy from cron::
+
+    $ apps/manage.py run_jobs --once
+
+See ``elts.jobs`` for details.
+
+"""
+from django.core.management.base import BaseCommand
+from django.db import connections
+from elts import jobs, tasks
+from optparse import make_option
+import multiprocessing
+
+class Command(BaseCommand):
+    """Run jobs in one or more worker processes."""
+    help = 'Run background jobs as they come due.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--processes',
+            type = 'int',
+            default = 1,
+            help = 'How many worker processes to run. Defaults to 1.',
+        ),
+        make_option(
+            '--once',
+            action = 'store_true',
+            default = False,
+            help = 'Exit once no jobs are due.',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        """Schedule recurring tasks, then run workers."""
+        tasks.schedule_recurring()
+        if options['processes'] <= 1:
+            jobs.work(once = options['once'])
+            return
+
+        # Each worker must open its own database connections, rather than
+        # sharing this process's.
+        for connection in connections.all():
+            connection.close()
+        workers = [
+            multiprocessing.Process(
+                target = jobs.work,
+                kwargs = {'once': options['once']}
+            )
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
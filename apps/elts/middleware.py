@@ -0,0 +1,70 @@
+"""Middleware used by ELTS.
+
+Middleware is listed in the ``MIDDLEWARE_CLASSES`` setting. See:
+https://docs.djangoproject.com/en/1.6/topics/http/middleware/
+
+"""
+from django.conf import settings
+from elts import caching, routers
+
+# A client holding this cookie has recently written to the database.
+PRIMARY_COOKIE = 'elts_primary'
+
+class ReplicaMiddleware(object):
+    """Decide whether each request may read from a read replica.
+
+    ``GET`` and ``HEAD`` requests may read from a replica. All other requests
+    read from the ``default`` database. This includes ``POST`` requests which
+    fake a ``PUT`` or ``DELETE`` request. See ``elts.urls``.
+
+    A replica may not yet contain the data written by a request, and the pages
+    that users are redirected to after a write usually show that data. After
+    a write, the client is given a short-lived cookie, and requests bearing that
+    cookie read from ``default``. The ``ELTS_PRIMARY_PIN_SECONDS`` setting
+    controls how long the cookie lasts, and it must be at least as long as the
+    lag of the slowest replica. For a snapshot refreshed by cron, that is the
+    interval between snapshots plus the time one takes. It defaults to 10
+    seconds, which only suits replicas that are kept up to date continuously.
+
+    This middleware must be listed before any middleware that reads from the
+    database, such as ``SessionMiddleware``.
+
+    """
+    # pylint: disable=R0201
+    # Method could be a function (no-self-use)
+    # Django dictates that middleware methods be methods.
+
+    def process_request(self, request):
+        """Allow or forbid replica reads for the rest of ``request``."""
+        routers.use_replicas(
+            request.method in ('GET', 'HEAD') and
+            PRIMARY_COOKIE not in request.COOKIES
+        )
+
+    def process_response(self, request, response):
+        """Pin the client to ``default`` if ``request`` could have written."""
+        if request.method not in ('GET', 'HEAD'):
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                '1',
+                max_age = getattr(settings, 'ELTS_PRIMARY_PIN_SECONDS', 10),
+                httponly = True,
+            )
+        routers.use_replicas(False)
+        return response
+
+class VersionMiddleware(object):
+    """Bump the cache versions that a request bumped inside a transaction.
+
+    By the time a response is returned, the request's transactions have
+    committed. See ``elts.caching``.
+
+    """
+    # pylint: disable=R0201
+    # Method could be a function (no-self-use)
+    # Django dictates that middleware methods be methods.
+
+    def process_response(self, request, response):
+        """Bump the versions left pending by ``request``."""
+        caching.bump_pending()
+        return response
@@ -8,7 +8,8 @@ column named ``id``. Django will not generate ``id`` if you pass ``primary_key =
 True`` to some other column.
 
 """
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
 from django.db import models
 
 # pylint: disable=R0903
@@ -19,7 +20,22 @@ from django.db import models
 # "Class has no __init__ method"
 # It is both common and OK for a model to have no __init__ method.
 
-class Item(models.Model):
+class Versioned(models.Model):
+    """A model whose rows carry a version number.
+
+    ``version`` is incremented whenever a row is changed through a form, or in
+    bulk with ``QuerySet.update``. A form only saves a row if its version has
+    not changed since the form was filled in, so that nobody's changes are
+    silently overwritten. See ``elts.forms.VersionedForm``.
+
+    """
+    version = models.PositiveIntegerField(default = 0)
+
+    class Meta(object):
+        """Model attributes that are not fields."""
+        abstract = True
+
+class Item(Versioned):
     """An item.
 
     If an item is unavailable for lending (e.g. a laptop's screen is broken),
@@ -41,7 +57,7 @@ class Item(models.Model):
         """Used by Python and Django when coercing a model instance to a str."""
         return self.name
 
-class Lend(models.Model):
+class Lend(Versioned):
     """Tracks the lending of an ``Item`` to a ``User``.
 
     This model tracks the following pieces of information:
@@ -58,13 +74,25 @@ class Lend(models.Model):
     dates and booleans. For more info, see:
     https://docs.djangoproject.com/en/1.6/ref/models/fields/#field-options
 
+    The date and time columns are indexed, as most queries about lends look for
+    lends in some range of dates.
+
+    If the lend is one of several made by reserving a ``Kit``, ``kit_lend_id``
+    is the ``KitLend`` which made it.
+
     """
     item_id = models.ForeignKey('Item')
     user_id = models.ForeignKey(User)
-    due_out = models.DateField(blank = True, null = True)
-    due_back = models.DateField(blank = True, null = True)
-    out = models.DateTimeField(blank = True, null = True)
-    back = models.DateTimeField(blank = True, null = True)
+    due_out = models.DateField(blank = True, null = True, db_index = True)
+    due_back = models.DateField(blank = True, null = True, db_index = True)
+    out = models.DateTimeField(blank = True, null = True, db_index = True)
+    back = models.DateTimeField(blank = True, null = True, db_index = True)
+    kit_lend_id = models.ForeignKey(
+        'KitLend',
+        blank = True,
+        null = True,
+        related_name = 'lends',
+    )
 
     def http_dict(self):
         """Encode ``self``'s attributes in a dict.
@@ -92,9 +120,10 @@ class Lend(models.Model):
         if self.back:
             data['back'] = '{} {}'.format(self.back.date(), self.back.time())
 
+        data['version'] = self.version
         return data
 
-class Tag(models.Model):
+class Tag(Versioned):
     """A descriptive label for an ``Item``.
 
     Tags are related to Items via a many-to-many relationship. Here, the
@@ -116,7 +145,7 @@ class Tag(models.Model):
         """Used by Python and Django when coercing a model instance to a str."""
         return self.name
 
-class Category(models.Model):
+class Category(Versioned):
     """A collection of ``Tag``s belonging to a user.
 
     A user can search for items based on their tags. If the search is saved,
@@ -129,6 +158,299 @@ class Category(models.Model):
     name = models.CharField(max_length = MAX_LEN_NAME)
     tags = models.ManyToManyField('Tag', blank = True)
 
+class Kit(models.Model):
+    """A group of ``Item``s which are lent together.
+
+    For example, a camera kit might hold a camera, two lenses and a tripod.
+    Reserving a kit reserves every item in it. See ``KitLend``.
+
+    """
+    MAX_LEN_NAME = 50
+    MAX_LEN_DESCRIPTION = 2000
+
+    # ``unique = True`` implies ``db_index``
+    name = models.CharField(max_length = MAX_LEN_NAME, unique = True)
+    description = models.TextField(
+        max_length = MAX_LEN_DESCRIPTION,
+        blank = True
+    )
+    items = models.ManyToManyField('Item', related_name = 'kits')
+
+    def __unicode__(self):
+        """Used by Python and Django when coercing a model instance to a str."""
+        return self.name
+
+class KitLend(models.Model):
+    """A reservation of every item in a ``Kit`` for a ``User``.
+
+    Each item is reserved by its own ``Lend``, whose ``kit_lend_id`` points
+    here, so that checking for clashes, checking out and checking in work just
+    as they do for any other lend. Deleting a kit lend deletes those lends. A
+    kit which has been reserved cannot be deleted, so that the history of its
+    lends is kept. See ``elts.kits``.
+
+    """
+    kit_id = models.ForeignKey('Kit', on_delete = models.PROTECT)
+    user_id = models.ForeignKey(User)
+    due_out = models.DateField(db_index = True)
+    due_back = models.DateField(blank = True, null = True, db_index = True)
+    created = models.DateTimeField(auto_now_add = True)
+
+    def __unicode__(self):
+        """Used by Python and Django when coercing a model instance to a str."""
+        return u'{} for {}'.format(self.kit_id, self.user_id)
+
+class LatenessSummary(models.Model):
+    """How punctually a ``User`` has picked up and returned items.
+
+    A pickup is late if an item goes out after the day it is due out, and a
+    return is late if an item comes back after the day it is due back. Delays
+    are stored in seconds. A negative delay means that an item was early.
+
+    This table is derived entirely from ``Lend``. A user's row is recomputed
+    whenever one of their lends is saved or deleted, so that it can be shown
+    without going through the user's history. See ``elts.statistics``.
+
+    """
+    user = models.OneToOneField(User, related_name = 'lateness')
+    pickups = models.PositiveIntegerField(default = 0)
+    late_pickups = models.PositiveIntegerField(default = 0)
+    median_pickup_delay = models.IntegerField(blank = True, null = True)
+    returns = models.PositiveIntegerField(default = 0)
+    late_returns = models.PositiveIntegerField(default = 0)
+    median_return_delay = models.IntegerField(blank = True, null = True)
+
+    def on_time_score(self):
+        """Return the percentage of pickups and returns that were on time.
+
+        If the user has never picked up or returned an item, return ``None``.
+
+        >>> LatenessSummary(pickups = 3, late_pickups = 1).on_time_score()
+        66.66666666666667
+        >>> LatenessSummary().on_time_score() is None
+        True
+
+        """
+        total = self.pickups + self.returns
+        if not total:
+            return None
+        late = self.late_pickups + self.late_returns
+        return 100.0 * (total - late) / total
+
+class ActiveLendCount(models.Model):
+    """How many items a ``User`` has out right now.
+
+    A lend has its item out if ``out`` is set and ``back`` is not. Like
+    ``LatenessSummary``, this table is derived entirely from ``Lend``, and a
+    user's row is recomputed whenever one of their lends changes, so that a
+    user's ``LendQuota`` can be checked without counting their lends. See
+    ``elts.quotas``.
+
+    """
+    user = models.OneToOneField(User, related_name = 'active_lend_count')
+    count = models.PositiveIntegerField(default = 0)
+
+class LendQuota(models.Model):
+    """The most items a ``User``, or each member of a ``Group``, may have out
+    at once.
+
+    Exactly one of ``user`` and ``group`` is set. A user's own quota overrides
+    the quotas of their groups, and the largest quota of a user's groups
+    applies otherwise. See ``elts.quotas``.
+
+    """
+    user = models.OneToOneField(
+        User,
+        blank = True,
+        null = True,
+        related_name = 'lend_quota',
+    )
+    group = models.OneToOneField(
+        Group,
+        blank = True,
+        null = True,
+        related_name = 'lend_quota',
+    )
+    limit = models.PositiveIntegerField()
+
+    def clean(self):
+        """Check that exactly one of ``user`` and ``group`` is set."""
+        if (self.user_id is None) == (self.group_id is None):
+            raise ValidationError(
+                'Exactly one of "user" and "group" must be set.'
+            )
+
+    def __unicode__(self):
+        """Used by Python and Django when coercing a model instance to a str."""
+        return u'{} for {}'.format(self.limit, self.user or self.group)
+
+class FeedKey(models.Model):
+    """A value signed into each of a ``User``'s calendar feed tokens.
+
+    Changing ``nonce`` revokes every token made for the user. A user without a
+    row has an empty nonce. See ``elts.ical``.
+
+    """
+    MAX_LEN_NONCE = 32
+
+    user = models.OneToOneField(User, related_name = 'feed_key')
+    nonce = models.CharField(max_length = MAX_LEN_NONCE)
+
+class Job(models.Model):
+    """A call to a task, to be made outside of any request.
+
+    ``task`` names a function registered with ``elts.jobs.task``, and
+    ``arguments`` holds the keyword arguments it is called with, encoded as
+    JSON. A job is run by a worker once ``run_at`` has passed. If ``interval``
+    is set, the job is recurring, and it is run again ``interval`` seconds
+    after each run. The recurring job made by ``elts.jobs.schedule`` also has
+    ``recurring`` set to the name of its task, which is unique, so that each
+    task has at most one such job. See ``elts.jobs``.
+
+    """
+    MAX_LEN_TASK = 100
+    MAX_LEN_STATUS = 10
+    MAX_LEN_WORKER = 100
+    WAITING = 'waiting'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (WAITING, 'waiting'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    )
+
+    task = models.CharField(max_length = MAX_LEN_TASK, db_index = True)
+    arguments = models.TextField(default = '{}')
+    status = models.CharField(
+        max_length = MAX_LEN_STATUS,
+        choices = STATUS_CHOICES,
+        default = WAITING,
+    )
+    run_at = models.DateTimeField()
+    interval = models.PositiveIntegerField(blank = True, null = True)
+    recurring = models.CharField(
+        max_length = MAX_LEN_TASK,
+        blank = True,
+        null = True,
+        unique = True,
+    )
+    attempts = models.PositiveIntegerField(default = 0)
+    max_attempts = models.PositiveIntegerField(default = 5)
+    worker = models.CharField(max_length = MAX_LEN_WORKER, blank = True)
+    started = models.DateTimeField(blank = True, null = True)
+    finished = models.DateTimeField(blank = True, null = True)
+    error = models.TextField(blank = True)
+
+    def __unicode__(self):
+        """Used by Python and Django when coercing a model instance to a str."""
+        return u'{} ({})'.format(self.task, self.status)
+
+    class Meta(object):
+        """Model attributes that are not fields."""
+        # Workers look for waiting jobs whose time has come.
+        index_together = [['status', 'run_at']]
+
+class Notification(models.Model):
+    """A notification that has been sent about a ``Lend``.
+
+    A borrower is told about a lend at most once per kind of notification and
+    value of ``due_back``. If a lend's ``due_back`` is changed, the borrower may
+    be told about it again. See ``elts.notifications``.
+
+    """
+    MAX_LEN_KIND = 10
+    OVERDUE = 'overdue'
+    DUE_SOON = 'due-soon'
+    KIND_CHOICES = (
+        (OVERDUE, 'overdue'),
+        (DUE_SOON, 'due soon'),
+    )
+
+    lend_id = models.ForeignKey('Lend')
+    kind = models.CharField(max_length = MAX_LEN_KIND, choices = KIND_CHOICES)
+    due_back = models.DateField()
+    sent = models.DateTimeField(auto_now_add = True)
+
+    class Meta(object):
+        """Model attributes that are not fields."""
+        unique_together = [['lend_id', 'kind', 'due_back']]
+
+class WaitlistEntry(models.Model):
+    """A request to reserve an ``Item`` as soon as it becomes free.
+
+    If an item is already reserved when a user asks for it, the request can
+    wait here instead. Whenever a reservation of the item is deleted or
+    shortened, the entries it may have made room for are looked at in the
+    order they were created, and each that now fits becomes a ``Lend``. See
+    ``elts.waiting``.
+
+    """
+    item_id = models.ForeignKey('Item')
+    user_id = models.ForeignKey(User)
+    due_out = models.DateField()
+    due_back = models.DateField(blank = True, null = True)
+    created = models.DateTimeField(auto_now_add = True)
+
+    def __unicode__(self):
+        """Used by Python and Django when coercing a model instance to a str."""
+        return u'{} for {}'.format(self.item_id, self.user_id)
+
+    class Meta(object):
+        """Model attributes that are not fields."""
+        # Entries are looked up by item and day.
+        index_together = [['item_id', 'due_out']]
+
+class Repack(models.Model):
+    """A run of the ``repack`` command which moved reservations.
+
+    The future reservations of the lendable items with ``tag`` were moved
+    between those items. Each move is recorded as a ``RepackChange``.
+    ``score_before`` and ``score_after`` measure how contiguous the free time
+    of those items was before and after. See ``elts.repacking``.
+
+    """
+    tag = models.ForeignKey('Tag')
+    created = models.DateTimeField(auto_now_add = True)
+    score_before = models.BigIntegerField()
+    score_after = models.BigIntegerField()
+
+    def __unicode__(self):
+        """Used by Python and Django when coercing a model instance to a str."""
+        return u'{} ({})'.format(self.tag, self.created)
+
+class RepackChange(models.Model):
+    """A reservation which a ``Repack`` moved from one item to another."""
+    repack = models.ForeignKey('Repack', related_name = 'changes')
+    lend_id = models.ForeignKey('Lend')
+    from_item_id = models.ForeignKey('Item', related_name = '+')
+    to_item_id = models.ForeignKey('Item', related_name = '+')
+
+class IdempotencyKey(models.Model):
+    """A key which a client sent with a request, and the response it got.
+
+    ``digest`` identifies the key, the user who sent it, and the URL it was
+    sent to. ``created`` is when the key was claimed, and ``status`` is
+    ``None`` while the request is being handled. A response which redirects is
+    stored without its body. See ``elts.idempotency``.
+
+    """
+    MAX_LEN_DIGEST = 40
+    MAX_LEN_LOCATION = 255
+    MAX_LEN_CONTENT_TYPE = 100
+
+    digest = models.CharField(max_length = MAX_LEN_DIGEST, unique = True)
+    created = models.DateTimeField(auto_now_add = True, db_index = True)
+    status = models.PositiveSmallIntegerField(blank = True, null = True)
+    location = models.CharField(max_length = MAX_LEN_LOCATION, blank = True)
+    content_type = models.CharField(
+        max_length = MAX_LEN_CONTENT_TYPE,
+        blank = True,
+    )
+    content = models.BinaryField(blank = True)
+
 # Begin ``Note`` model definitions =============================================
 
 class Note(models.Model):
@@ -187,3 +509,6 @@ class LendNote(Note):
     """A note about an ``Lend``."""
     lend_id = models.ForeignKey('Lend')
     is_complaint = models.BooleanField(default = False)
+
+# Connect signal receivers. This must be done after the models are defined.
+from elts import signals # pylint: disable=W0611
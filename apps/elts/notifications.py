@@ -0,0 +1,132 @@
+"""Tell borrowers about items that are overdue or due back soon.
+
+``send`` finds lends whose items are out and whose ``due_back`` is past or
+near, with a single query over the ``due_back`` index. Each borrower gets one
+email, a digest listing all of their lends. The emails are sent over one
+connection to the mail server, a batch at a time.
+
+Each lend that a borrower is told about is recorded as a ``Notification``, once
+the email about it has been sent. ``send`` skips lends that have already been
+recorded, so running it again does not send the same email twice. It is run
+periodically as a job. See ``elts.tasks``.
+
+Email is sent with Django's email settings. See:
+https://docs.djangoproject.com/en/1.6/topics/email/
+
+The following settings are also understood:
+
+``ELTS_DUE_SOON_DAYS``
+    A lend is due soon if it is due back within this many days. Defaults to 2.
+``ELTS_NOTIFICATION_BATCH``
+    How many emails are sent before the notifications in them are recorded.
+    Defaults to 50.
+
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core import mail
+from django.template.loader import render_to_string
+from elts.models import Lend, Notification
+from itertools import groupby
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+
+def pending(today):
+    """Find the notifications that should be sent on ``today``.
+
+    ``today`` is a ``datetime.date`` object. A list of ``(user, lends)`` tuples
+    is returned, one per borrower. ``lends`` is a list of ``(lend, kind)``
+    tuples, where ``kind`` is one of ``Notification.KIND_CHOICES``. Lends are
+    sorted by ``due_back``.
+
+    """
+    horizon = today + timedelta(
+        days = getattr(settings, 'ELTS_DUE_SOON_DAYS', 2)
+    )
+    lends = Lend.objects.filter(
+        due_back__lte = horizon,
+        out__isnull = False,
+        back__isnull = True,
+    ).select_related('item_id', 'user_id').order_by('user_id', 'due_back')
+    sent = set(Notification.objects.filter(
+        lend_id__due_back__lte = horizon,
+        lend_id__out__isnull = False,
+        lend_id__back__isnull = True,
+    ).values_list('lend_id', 'kind', 'due_back'))
+
+    digests = []
+    for user, user_lends in groupby(lends, lambda lend: lend.user_id):
+        unsent = []
+        for lend in user_lends:
+            kind = (
+                Notification.OVERDUE if lend.due_back < today
+                else Notification.DUE_SOON
+            )
+            if (lend.id, kind, lend.due_back) not in sent:
+                unsent.append((lend, kind))
+        if unsent:
+            digests.append((user, unsent))
+    return digests
+
+def send(today):
+    """Send the notifications that should be sent on ``today``.
+
+    Borrowers without an email address are skipped, and will be told once they
+    have one. Return how many emails were sent.
+
+    """
+    digests = [
+        (user, lends) for user, lends in pending(today) if user.email
+    ]
+    if not digests:
+        return 0
+    batch_size = getattr(settings, 'ELTS_NOTIFICATION_BATCH', 50)
+    connection = mail.get_connection()
+    connection.open()
+    try:
+        for start in range(0, len(digests), batch_size):
+            batch = digests[start:start + batch_size]
+            connection.send_messages([
+                _message(user, lends, today, connection)
+                for user, lends in batch
+            ])
+            Notification.objects.bulk_create([
+                Notification(
+                    lend_id = lend,
+                    kind = kind,
+                    due_back = lend.due_back
+                )
+                for _, lends in batch
+                for lend, kind in lends
+            ])
+    finally:
+        connection.close()
+    return len(digests)
+
+def _message(user, lends, today, connection):
+    """Return an email telling ``user`` about ``lends``.
+
+    ``lends`` is a list of ``(lend, kind)`` tuples, as returned by ``pending``.
+
+    """
+    overdue = [lend for lend, kind in lends if kind == Notification.OVERDUE]
+    due_soon = [lend for lend, kind in lends if kind == Notification.DUE_SOON]
+    if overdue:
+        subject = 'Items are overdue'
+    else:
+        subject = 'Items are due back soon'
+    return mail.EmailMessage(
+        subject = subject,
+        body = render_to_string(
+            'elts/notification-digest.txt',
+            {
+                'user': user,
+                'today': today,
+                'overdue': overdue,
+                'due_soon': due_soon,
+            }
+        ),
+        to = [user.email],
+        connection = connection,
+    )
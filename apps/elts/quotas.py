@@ -0,0 +1,105 @@
+"""Limit how many items each user may have out at once.
+
+A user's quota is the ``LendQuota`` of that user if there is one. Otherwise,
+it is the largest ``LendQuota`` of the user's groups, or failing that, the
+``ELTS_LEND_QUOTA`` setting. If none of these is set, which is the default, the
+user may have any number of items out.
+
+Counting a user's open lends whenever a lend is validated would add another
+query over the user's history to ``forms.LendForm``. Instead, each user's
+``ActiveLendCount`` is recomputed from their lends whenever one of them
+changes, so that it cannot drift from the lends. A lend saved through a form
+is recounted in the transaction which saves it. See ``signals.lends_changed``.
+Checking a quota then takes one lookup of the user's quotas and one of their
+count, however many lends they have.
+
+Two items could be checked out to the same user at the same moment, and both
+be let through by a count which includes neither. So whatever checks a quota
+and saves the lend does both while the borrower is locked by
+``writes.items_locked``, and recounts the borrower before they are unlocked.
+
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, Q
+from elts.models import ActiveLendCount, Lend, LendQuota
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+
+def limit(user_id):
+    """Return how many items user ``user_id`` may have out at once.
+
+    ``None`` is returned if there is no limit.
+
+    """
+    group_limit = None
+    for quota_user_id, quota_limit in LendQuota.objects.filter(
+        Q(user = user_id) | Q(group__user = user_id)
+    ).values_list('user_id', 'limit'):
+        if quota_user_id is not None:
+            return quota_limit
+        if group_limit is None or quota_limit > group_limit:
+            group_limit = quota_limit
+    if group_limit is not None:
+        return group_limit
+    return getattr(settings, 'ELTS_LEND_QUOTA', None)
+
+def active(user_id):
+    """Return how many items user ``user_id`` has out, as last counted."""
+    counts = ActiveLendCount.objects.filter(
+        user = user_id
+    ).values_list('count', flat = True)
+    return counts[0] if counts else 0
+
+def full(user_id):
+    """Tell whether user ``user_id`` may not take out another item.
+
+    If so, the user's quota is returned. Otherwise, ``None`` is returned.
+
+    """
+    quota = limit(user_id)
+    if quota is not None and active(user_id) >= quota:
+        return quota
+    return None
+
+def full_message(user, quota):
+    """Return a string stating that ``user`` has ``quota`` items out.
+
+    >>> full_message('alice', 2)
+    u'alice already has 2 items out, which is as many as they may have.'
+    >>> full_message('bob', 1)
+    u'bob already has 1 item out, which is as many as they may have.'
+
+    """
+    return u'{} already has {} {} out, which is as many as they may ' \
+        u'have.'.format(user, quota, 'item' if quota == 1 else 'items')
+
+def refresh_counts(user_ids = None):
+    """Recompute the ``ActiveLendCount`` of each of ``user_ids``.
+
+    If ``user_ids`` is ``None``, recompute every user's count. However many
+    users are given, their lends are counted with one query.
+
+    """
+    if user_ids is None:
+        user_ids = User.objects.values_list('id', flat = True)
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    counts = dict(Lend.objects.filter(
+        user_id__in = user_ids,
+        out__isnull = False,
+        back__isnull = True,
+    ).order_by().values_list('user_id').annotate(Count('id')))
+    for user_id in user_ids:
+        count = counts.get(user_id, 0)
+        # A user whose lends are all being deleted, perhaps because the user is
+        # being deleted, should not be given a new row.
+        if (
+            not ActiveLendCount.objects.filter(
+                user = user_id
+            ).update(count = count)
+            and count
+        ):
+            ActiveLendCount.objects.create(user_id = user_id, count = count)
@@ -0,0 +1,163 @@
+"""Reservations which recur every week or every few weeks.
+
+A weekly class might reserve the same projector every Tuesday of a semester. A
+rule, much like an iCalendar RRULE with ``FREQ=WEEKLY``, describes when such a
+reservation recurs: the first day it is due out, the days of the week it falls
+on, how many weeks apart the occurrences are, and either how many occurrences
+there are or the last day one may fall on. See ``expand``.
+
+The occurrences are handled as NumPy arrays of date ordinals. See
+``datetime.date.toordinal``. They are checked against an item's existing
+reservations with a single query and one comparison between arrays. Then they
+are saved with a single ``bulk_create``. ``bulk_create`` does not send signals,
+so ``signals.lends_changed`` is called to do what the signal receivers would
+have done.
+
+See: http://docs.scipy.org/doc/numpy/reference/
+
+"""
+from datetime import date
+from django.db import transaction
+from django.db.models import Q
+from elts import signals
+from elts.models import Lend
+import numpy as np
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+# Module 'numpy' has no 'int64' member (no-member)
+
+# Stands in for the ``due_back`` of a reservation which never ends.
+_FOREVER = date.max.toordinal()
+
+def expand(first, weekdays = None, interval = 1, count = None, until = None,
+           limit = None):
+    """Return the days on which a weekly reservation is due out.
+
+    ``first`` is the first day the reservation may be due out. ``weekdays``
+    lists the days of the week it is due out, where Monday is 0 and Sunday is
+    6. It defaults to the day of the week of ``first``. The reservation recurs
+    every ``interval`` weeks, counting from the week of ``first``. Weeks start
+    on Monday.
+
+    Exactly one of ``count`` and ``until`` must be given. ``count`` is how many
+    times the reservation is due out, and ``until`` is the last day it may be
+    due out. If ``limit`` is given, at most ``limit + 1`` days are returned, so
+    that a caller can tell that there are more than ``limit``.
+
+    A sorted array of date ordinals is returned.
+
+    >>> tuesdays = expand(date(2014, 1, 14), count = 3)
+    >>> [date.fromordinal(int(day)).isoformat() for day in tuesdays]
+    ['2014-01-14', '2014-01-21', '2014-01-28']
+    >>> days = expand(date(2014, 1, 16), [1, 3], 2, until = date(2014, 2, 11))
+    >>> [date.fromordinal(int(day)).isoformat() for day in days]
+    ['2014-01-16', '2014-01-28', '2014-01-30', '2014-02-11']
+
+    """
+    if (count is None) == (until is None):
+        raise ValueError('Exactly one of count and until must be given.')
+    if weekdays:
+        offsets = np.unique(np.asarray(weekdays, dtype = np.int64))
+    else:
+        offsets = np.array([first.weekday()], dtype = np.int64)
+    first_day = first.toordinal()
+    monday = first_day - first.weekday()
+
+    if count is not None:
+        # The first week may hold fewer occurrences than the others.
+        weeks = -(-count // len(offsets)) + 1
+    else:
+        weeks = max((until.toordinal() - monday) // (7 * interval) + 1, 0)
+    if limit is not None:
+        weeks = min(weeks, limit + 2)
+
+    days = (
+        (monday + 7 * interval * np.arange(weeks, dtype = np.int64))[:, None]
+        + offsets[None, :]
+    ).ravel()
+    days = days[days >= first_day]
+    if until is not None:
+        days = days[days <= until.toordinal()]
+    else:
+        days = days[:count]
+    if limit is not None:
+        days = days[:limit + 1]
+    return days
+
+def overlapping(starts, ends):
+    """Tell whether any occurrence begins before the one before it ends.
+
+    ``starts`` and ``ends`` are sorted arrays of date ordinals, and each
+    occurrence includes both its start and end days.
+
+    >>> overlapping(np.array([1, 8]), np.array([2, 9]))
+    False
+    >>> overlapping(np.array([1, 8]), np.array([8, 15]))
+    True
+
+    """
+    return bool(np.any(starts[1:] <= ends[:-1]))
+
+def conflicts(item, starts, ends):
+    """Find the existing reservations of ``item`` that clash with occurrences.
+
+    ``starts`` and ``ends`` are arrays of date ordinals, giving the ``due_out``
+    and ``due_back`` of each occurrence. A reservation clashes with an
+    occurrence if their days overlap, just as ``forms.LendForm`` checks. A
+    reservation without ``due_back`` lasts forever.
+
+    The existing reservations are found with a single query, and are compared
+    with every occurrence at once. A list with one entry per occurrence is
+    returned. Each entry is a list of the ``Lend`` objects it clashes with.
+
+    """
+    if not len(starts):
+        return []
+    existing = list(Lend.objects.filter(
+        Q(due_back__isnull = True)
+        | Q(due_back__gte = date.fromordinal(int(starts.min()))),
+        item_id = item,
+        due_out__lte = date.fromordinal(int(ends.max())),
+    ).order_by('due_out', 'id'))
+    existing_starts = np.array(
+        [lend.due_out.toordinal() for lend in existing],
+        dtype = np.int64
+    )
+    existing_ends = np.array(
+        [
+            _FOREVER if lend.due_back is None else lend.due_back.toordinal()
+            for lend in existing
+        ],
+        dtype = np.int64
+    )
+    clashes = (
+        (starts[:, None] <= existing_ends[None, :])
+        & (ends[:, None] >= existing_starts[None, :])
+    )
+    return [
+        [existing[index] for index in np.flatnonzero(row)]
+        for row in clashes
+    ]
+
+def create(item, user, starts, ends):
+    """Reserve ``item`` for ``user`` once per occurrence.
+
+    ``starts`` and ``ends`` are arrays of date ordinals, giving the ``due_out``
+    and ``due_back`` of each occurrence. The new ``Lend`` objects are saved in
+    bulk, in one transaction, and returned.
+
+    """
+    lends = [
+        Lend(
+            item_id = item,
+            user_id = user,
+            due_out = date.fromordinal(int(start)),
+            due_back = date.fromordinal(int(end)),
+        )
+        for start, end in zip(starts, ends)
+    ]
+    with transaction.atomic():
+        Lend.objects.bulk_create(lends)
+    signals.lends_changed([item.id], [user.id])
+    return lends
@@ -0,0 +1,229 @@
+"""Move future reservations between interchangeable items.
+
+Reservations are made one at a time, as borrowers ask for them. Over time, the
+reservations of a group of interchangeable items, such as the items with tag
+"laptop", end up scattered across those items. Each item is then free for a
+few days here and there, and nobody can reserve any of them for a long stretch,
+even though together they are mostly free.
+
+``repack`` moves the reservations which have not started yet, that is, those
+whose ``due_out`` is today or later and whose ``out`` is not set, between the
+lendable items with a tag. The other reservations of those items stay where
+they are. The reservations are treated as the colouring of an interval graph:
+each one is given to an item in order of ``due_out``, and each goes to the
+item which fits it best, as ``scheduling.best_fit`` decides. This packs
+reservations tightly onto as few items as it can, leaving long runs of free
+days on the others. If a reservation fits no item, or if the new assignment is
+not more contiguous than the old one (see ``free_score``), nothing is moved.
+
+The reservations are loaded with a single query. When the changes are applied,
+they are planned and made in one transaction, and recorded as a ``Repack``.
+Afterwards, anyone waiting for the days a reservation left is promoted, as if
+the reservation had been saved. See ``elts.waiting``.
+
+The following setting is understood:
+
+``ELTS_REPACK_HORIZON``
+    How many days after today are looked at when measuring how contiguous the
+    free time of the items is. Defaults to 180.
+
+"""
+from datetime import date
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from elts import scheduling, signals, waiting, writes
+from elts.models import Item, Lend, Repack, RepackChange
+import numpy as np
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+# Module 'numpy' has no 'int64' member (no-member)
+
+# Stands in for the ``due_back`` of a reservation which never ends.
+_FOREVER = date.max.toordinal()
+
+@writes.serialized
+def repack(tag, today, apply = False):
+    """Repack the future reservations of the items with ``tag``.
+
+    ``today`` is a ``datetime.date``. If ``apply`` is false, nothing is
+    changed. Otherwise, the reservations are moved and a ``Repack`` is
+    recorded, all in one transaction. Either way, ``(changes, before, after)``
+    is returned, as ``plan`` returns it.
+
+    """
+    with transaction.atomic():
+        changes, before, after = plan(tag, today, lock = apply)
+        if not (apply and changes):
+            return changes, before, after
+
+        report = Repack.objects.create(
+            tag = tag,
+            score_before = before,
+            score_after = after,
+        )
+        RepackChange.objects.bulk_create([
+            RepackChange(
+                repack = report,
+                lend_id = lend,
+                from_item_id_id = lend.item_id_id,
+                to_item_id_id = item_id,
+            )
+            for lend, item_id in changes
+        ])
+        moves = {}
+        for lend, item_id in changes:
+            moves.setdefault(item_id, []).append(lend.id)
+        items = Item.objects.in_bulk(list(moves))
+        for item_id, lend_ids in moves.items():
+            Lend.objects.filter(id__in = lend_ids).update(
+                item_id = items[item_id],
+                version = F('version') + 1,
+            )
+
+    # ``update`` sends no signals.
+    signals.lends_changed(
+        set(lend.item_id_id for lend, _ in changes) | set(moves),
+        set(lend.user_id_id for lend, _ in changes)
+    )
+    for lend, _ in changes:
+        waiting.promote(lend.item_id_id, lend.due_out, lend.due_back)
+    return changes, before, after
+
+def plan(tag, today, lock = False):
+    """Work out how to repack the future reservations of items with ``tag``.
+
+    ``today`` is a ``datetime.date``. If ``lock`` is true, the reservations
+    are locked until the end of the current transaction.
+
+    Return a ``(changes, before, after)`` tuple. ``changes`` is a list of
+    ``(lend, item_id)`` pairs, each saying that ``lend`` should be moved to the
+    item with ID ``item_id``. ``before`` and ``after`` are the ``free_score``
+    of the items before and after the changes. If no better assignment is
+    found, ``changes`` is empty and ``after`` equals ``before``.
+
+    """
+    horizon = getattr(settings, 'ELTS_REPACK_HORIZON', 180)
+    first = today.toordinal()
+    last = first + horizon
+    item_ids = np.array(scheduling.candidates([tag]), dtype = np.int64)
+
+    lends = Lend.objects.filter(
+        Q(due_back__isnull = True)
+        | Q(due_back__gte = today)
+        | Q(out__isnull = False, back__isnull = True),
+        due_out__isnull = False,
+        item_id__in = item_ids.tolist(),
+    )
+    if lock:
+        lends = lends.select_for_update()
+    lends = list(lends)
+    index = np.searchsorted(
+        item_ids,
+        np.array([lend.item_id_id for lend in lends], dtype = np.int64)
+    )
+    starts = np.array(
+        [lend.due_out.toordinal() for lend in lends],
+        dtype = np.int64
+    )
+    ends = np.array([_end(lend, first) for lend in lends], dtype = np.int64)
+    movable = np.array(
+        [lend.out is None and lend.due_out >= today for lend in lends],
+        dtype = bool
+    )
+
+    before = free_score(len(item_ids), index, starts, ends, first, last)
+    new_index = _assign(len(item_ids), index, starts, ends, movable, horizon)
+    if new_index is None:
+        return [], before, before
+    after = free_score(len(item_ids), new_index, starts, ends, first, last)
+    if after <= before:
+        return [], before, before
+    return [
+        (lends[lend], int(item_ids[new_index[lend]]))
+        for lend in np.flatnonzero(new_index != index)
+    ], before, after
+
+def free_score(size, index, starts, ends, first, last):
+    """Measure how contiguous the free time of ``size`` items is.
+
+    The items have reservations given by the arrays ``index``, ``starts`` and
+    ``ends``, as for ``scheduling.best_fit``. Only the days from ``first`` to
+    ``last`` are looked at. Each run of free days of an item adds the square of
+    its length to the score, so one long run scores more than several short
+    runs which add up to the same number of days.
+
+    >>> index = np.array([0, 1])
+    >>> starts = np.array([3, 1])
+    >>> ends = np.array([3, 1])
+    >>> free_score(2, index, starts, ends, 1, 5)
+    24
+    >>> free_score(2, index[:0], starts[:0], ends[:0], 1, 5)
+    50
+
+    """
+    days = last - first + 1
+    low = np.clip(starts, first, last + 1) - first
+    high = np.clip(ends, first - 1, last) - first + 1
+    seen = low < high
+    changes = np.zeros((size, days + 1), dtype = np.int64)
+    np.add.at(changes, (index[seen], low[seen]), 1)
+    np.add.at(changes, (index[seen], high[seen]), -1)
+
+    # Surround each item's days with busy days, so that every run of free days
+    # has a first and last day.
+    busy = np.ones((size, days + 2), dtype = np.int8)
+    busy[:, 1:-1] = np.cumsum(changes[:, :-1], axis = 1) > 0
+    steps = np.diff(busy, axis = 1)
+    lengths = np.nonzero(steps == 1)[1] - np.nonzero(steps == -1)[1]
+    return int((lengths ** 2).sum())
+
+def _assign(size, index, starts, ends, movable, horizon):
+    """Give each movable reservation to the item which fits it best.
+
+    The reservations are given by the arrays ``index``, ``starts`` and
+    ``ends``, as for ``scheduling.best_fit``, and ``movable`` says which of
+    them may be moved. Return a copy of ``index`` in which the movable
+    reservations have been reassigned, or ``None`` if some reservation fits no
+    item.
+
+    >>> index = np.array([0, 1])
+    >>> starts = np.array([1, 6])
+    >>> ends = np.array([4, 7])
+    >>> _assign(2, index, starts, ends, np.array([False, True]), 10)
+    array([0, 0])
+
+    """
+    new_index = index.copy()
+    placed = ~movable
+    order = np.flatnonzero(movable)
+    order = order[np.lexsort((ends[order], starts[order]))]
+    for lend in order:
+        best = scheduling.best_fit(
+            size,
+            new_index[placed],
+            starts[placed],
+            ends[placed],
+            starts[lend],
+            ends[lend],
+            horizon,
+            prefer = int(index[lend])
+        )
+        if best is None:
+            return None
+        new_index[lend] = best
+        placed[lend] = True
+    return new_index
+
+def _end(lend, today):
+    """Return the last day ``lend`` holds its item, as an ordinal.
+
+    An item which is still out is held until at least ``today``, which is also
+    an ordinal, even if it was due back earlier.
+
+    """
+    end = _FOREVER if lend.due_back is None else lend.due_back.toordinal()
+    if lend.out is not None and lend.back is None:
+        end = max(end, today)
+    return end
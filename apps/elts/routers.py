@@ -0,0 +1,93 @@
+"""Database routers for ELTS.
+
+Django consults the routers named in the ``DATABASE_ROUTERS`` setting whenever
+it must choose a database for a query. See:
+https://docs.djangoproject.com/en/1.6/topics/db/multi-db/#automatic-database-routing
+
+``ReplicaRouter`` sends reads to read replicas and writes to the ``default``
+database. Read replicas are named in the ``ELTS_READ_REPLICAS`` setting, which
+is a list of database aliases. A read replica can be anything that Django can
+read from, such as a periodically refreshed snapshot of a SQLite database file
+or a MySQL slave.
+
+A replica may lag behind the ``default`` database. Reads are therefore only sent
+to a replica if the current thread has been marked as replica-safe by calling
+``use_replicas(True)``. ``elts.middleware.ReplicaMiddleware`` does this for
+requests which are unlikely to care about lag.
+
+Sessions and users are always read from ``default``, whatever the thread
+allows. A replica refreshed every few minutes would otherwise forget a user who
+has just logged in as soon as their session falls out of the cache.
+
+"""
+from django.conf import settings
+import random
+import threading
+
+# The apps whose models are always read from ``default``.
+PRIMARY_APPS = ('auth', 'sessions')
+
+_state = threading.local() # pylint: disable=C0103
+
+def use_replicas(flag):
+    """Tell whether reads made by the current thread may go to a replica.
+
+    ``flag`` is a boolean.
+
+    >>> use_replicas(True)
+    >>> replicas_allowed()
+    True
+    >>> use_replicas(False)
+    >>> replicas_allowed()
+    False
+
+    """
+    _state.replicas_allowed = flag
+
+def replicas_allowed():
+    """Tell whether reads made by the current thread may go to a replica.
+
+    Reads go to the ``default`` database unless ``use_replicas(True)`` has been
+    called in the current thread.
+
+    """
+    return getattr(_state, 'replicas_allowed', False)
+
+class ReplicaRouter(object):
+    """Send reads to read replicas and everything else to ``default``."""
+    # pylint: disable=W0613
+    # Unused argument 'hints' (unused-argument)
+    # Django dictates the signatures of these methods.
+
+    def db_for_read(self, model, **hints):
+        """Pick a random read replica, if the current thread allows it.
+
+        Models of ``PRIMARY_APPS`` are always read from ``default``.
+
+        """
+        replicas = getattr(settings, 'ELTS_READ_REPLICAS', ())
+        app_label = model._meta.app_label # pylint: disable=W0212
+        if replicas and replicas_allowed() and app_label not in PRIMARY_APPS:
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        """Send all writes to ``default``."""
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between objects read from any of our databases.
+
+        Replicas hold copies of ``default``, so an object read from a replica
+        may be freely related to an object read from ``default``.
+
+        """
+        return True
+
+    def allow_syncdb(self, db, model):
+        """Only create tables in ``default``.
+
+        Replicas receive their tables along with their data.
+
+        """
+        return db == 'default'
@@ -0,0 +1,134 @@
+"""Choose which of several interchangeable items to reserve.
+
+Borrowers often do not care which of a set of identical items they get, such
+as any laptop with tag "laptop". ``allocate`` chooses one for them. Among the
+lendable items which are free for the whole reservation, it picks the best fit:
+the item whose free time around the reservation is shortest. Short gaps which
+nobody else could use are filled first, and long stretches of free time are
+kept whole for long reservations. This leaves fewer requests that no single
+item can satisfy.
+
+The reservations of every candidate item near the requested days are loaded
+with a single query, and the decision is made with NumPy. Reservations are
+compared as ``forms.LendForm`` compares them: a reservation covers the days
+from ``due_out`` to ``due_back``, and lasts forever if ``due_back`` is not set.
+
+The following setting is understood:
+
+``ELTS_ALLOCATION_HORIZON``
+    How many days before and after a reservation are looked at when measuring
+    how well it fits an item. Longer gaps count as this long. Defaults to 90.
+
+See: http://docs.scipy.org/doc/numpy/reference/
+
+"""
+from datetime import date
+from django.conf import settings
+from django.db.models import Q
+from elts.models import Item, Lend
+import numpy as np
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+# Module 'numpy' has no 'int64' member (no-member)
+
+# Stands in for the ``due_back`` of a reservation which never ends.
+_FOREVER = date.max.toordinal()
+
+def candidates(tags):
+    """Return the IDs of lendable items with any of ``tags``, sorted."""
+    return sorted(set(Item.objects.filter(
+        tags__in = tags,
+        is_lendable = True,
+    ).values_list('id', flat = True)))
+
+def allocate(tags, due_out, due_back = None):
+    """Choose a lendable item with any of ``tags`` to reserve.
+
+    ``due_out`` and ``due_back`` are ``datetime.date`` objects. If
+    ``due_back`` is ``None``, the reservation lasts forever. Return the
+    ``Item`` which fits the reservation best, or ``None`` if no such item is
+    free.
+
+    """
+    item_ids = np.array(candidates(tags), dtype = np.int64)
+    if not len(item_ids):
+        return None
+    horizon = getattr(settings, 'ELTS_ALLOCATION_HORIZON', 90)
+    start = due_out.toordinal()
+    end = _FOREVER if due_back is None else due_back.toordinal()
+
+    lends = Lend.objects.filter(
+        due_out__isnull = False,
+        item_id__in = item_ids.tolist(),
+    )
+    lends = lends.filter(
+        Q(due_back__isnull = True)
+        | Q(due_back__gte = date.fromordinal(start - horizon))
+    )
+    if due_back is not None:
+        lends = lends.filter(
+            due_out__lte = date.fromordinal(min(end + horizon, _FOREVER))
+        )
+    rows = list(lends.values_list('item_id', 'due_out', 'due_back'))
+    index = np.searchsorted(
+        item_ids,
+        np.array([row[0] for row in rows], dtype = np.int64)
+    )
+    starts = np.array([row[1].toordinal() for row in rows], dtype = np.int64)
+    ends = np.array(
+        [_FOREVER if row[2] is None else row[2].toordinal() for row in rows],
+        dtype = np.int64
+    )
+    best = best_fit(len(item_ids), index, starts, ends, start, end, horizon)
+    if best is None:
+        return None
+    return Item.objects.get(id = int(item_ids[best]))
+
+def best_fit(size, index, starts, ends, start, end, horizon, prefer = None):
+    """Return which of ``size`` items fits the reservation best.
+
+    Each item has reservations given by the arrays ``index``, which says whose
+    reservation each one is, and ``starts`` and ``ends``, which give the first
+    and last days of each. Days are ordinals. The new reservation runs from
+    ``start`` to ``end``.
+
+    An item is free if none of its reservations overlap the new one. The free
+    item with the least free time around the new reservation is chosen. Ties
+    go to ``prefer``, if given, and otherwise to the lowest index. Free time
+    further than ``horizon`` days away is not counted. Return ``None`` if no
+    item is free.
+
+    >>> index = np.array([0, 1, 2, 2])
+    >>> starts = np.array([10, 1, 1, 30])
+    >>> ends = np.array([12, 4, 8, 40])
+    >>> best_fit(3, index, starts, ends, 11, 11, 20)
+    2
+    >>> best_fit(3, index, starts, ends, 20, 20, 5)
+    0
+    >>> best_fit(3, index, starts, ends, 20, 20, 5, prefer = 2)
+    2
+    >>> best_fit(1, index[:1], starts[:1], ends[:1], 11, 11, 20) is None
+    True
+
+    """
+    overlapping = (starts <= end) & (ends >= start)
+    busy = np.bincount(index[overlapping], minlength = size) > 0
+
+    # The last day before the new reservation on which each item is taken, and
+    # the first day after it.
+    before = np.full(size, start - horizon - 1, dtype = np.int64)
+    after = np.full(size, end + horizon + 1, dtype = np.int64)
+    earlier = ends < start
+    np.maximum.at(before, index[earlier], ends[earlier])
+    later = starts > end
+    np.minimum.at(after, index[later], starts[later])
+
+    slack = (start - before - 1) + (after - end - 1)
+    slack[busy] = np.iinfo(np.int64).max
+    best = int(np.argmin(slack))
+    if busy[best]:
+        return None
+    if prefer is not None and slack[prefer] == slack[best]:
+        return prefer
+    return best
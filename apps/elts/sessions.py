@@ -0,0 +1,48 @@
+"""A session engine for ELTS.
+
+This engine is selected with the ``SESSION_ENGINE`` setting. See:
+https://docs.djangoproject.com/en/1.6/topics/http/sessions/#configuring-the-session-engine
+
+Sessions are read from the ``default`` cache, and they are written both to that
+cache and to the database. A session is only read from the database if it is
+missing from the cache, so a logged in user costs no database queries for
+their session in the steady state.
+
+As with every Django session engine, a session is not loaded until it is first
+accessed. Django saves an accessed session at the end of a request if the
+session was marked as modified. This engine goes one step further: a session is
+only saved if its contents really have changed since it was loaded. Storing a
+value which the session already holds does not cause a write.
+
+The cache must be shared by every app server process. If it is not, a process
+may keep serving a session that has since been changed or deleted by another
+process. ``LocMemCache`` is only suitable for a single-process deployment, such
+as the development server.
+
+"""
+from django.contrib.sessions.backends import cached_db
+
+class SessionStore(cached_db.SessionStore):
+    """Implement a cache-backed session engine which skips no-op writes."""
+    def __init__(self, session_key = None):
+        super(SessionStore, self).__init__(session_key)
+        # The encoded session data as it was when loaded or last saved.
+        self._saved_data = None
+
+    def load(self):
+        """Load the session from the cache or the database."""
+        data = super(SessionStore, self).load()
+        self._saved_data = self.encode(data)
+        return data
+
+    def save(self, must_create = False):
+        """Save the session, unless it is unchanged since it was loaded.
+
+        A session that must be created is always saved.
+
+        """
+        data = self.encode(self._get_session(no_load = must_create))
+        if (not must_create) and data == self._saved_data:
+            return
+        super(SessionStore, self).save(must_create)
+        self._saved_data = data
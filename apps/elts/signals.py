@@ -0,0 +1,193 @@
+"""Signal receivers which keep derived data consistent with the database.
+
+This module is imported at the bottom of ``elts.models``, so the receivers are
+connected as soon as the models are loaded. Do not import it from elsewhere
+before ``elts.models`` has been loaded.
+
+For details on signals, see:
+https://docs.djangoproject.com/en/1.6/topics/signals/
+
+"""
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from elts import caching, quotas, statistics, waiting
+from elts.models import Category, Item, Lend, Tag, WaitlistEntry
+
+# The name of the version of everything derived from lends, including the names
+# and tags of the items lent. See ``elts.caching``.
+LENDS_VERSION = 'lends'
+
+# pylint: disable=W0613
+# Unused argument 'sender' (unused-argument)
+# Django dictates the signature of a receiver.
+#
+# pylint: disable=E1101
+# Class 'Category' has no 'objects' member (no-member)
+#
+# pylint: disable=W0212
+# Access to a protected member _loaded_user_id of a client class
+# The attribute is only ever set and read by this module.
+
+def sidebar_version_name(user_id):
+    """Return the name of the version of user ``user_id``'s sidebar.
+
+    The sidebar summarizes a user's categories. See ``elts/base.html``.
+
+    >>> sidebar_version_name(15)
+    'sidebar:15'
+
+    """
+    return 'sidebar:{}'.format(user_id)
+
+def bump_sidebars(user_ids):
+    """Invalidate the cached sidebars of the users in ``user_ids``."""
+    for user_id in set(user_ids):
+        caching.bump_version(sidebar_version_name(user_id))
+
+def _users_with_tags(tag_ids):
+    """Return the IDs of users with a category using any of ``tag_ids``."""
+    return Category.objects.filter(
+        tags__in = tag_ids
+    ).values_list('user_id', flat = True).distinct()
+
+def _users_with_item(item):
+    """Return the IDs of users with a category containing ``item``."""
+    return _users_with_items([item])
+
+def _users_with_items(items):
+    """Return the IDs of users with a category containing any of ``items``."""
+    return Category.objects.filter(
+        tags__item__in = items
+    ).values_list('user_id', flat = True).distinct()
+
+def lends_changed(item_ids, user_ids):
+    """Update whatever is derived from lends of ``item_ids`` to ``user_ids``.
+
+    The receivers below do this for each lend that is saved or deleted. Code
+    which changes lends in bulk, without sending signals, must call this
+    instead. For example, ``QuerySet.update`` and ``bulk_create`` send no
+    signals.
+
+    """
+    user_ids = set(user_id for user_id in user_ids if user_id is not None)
+    caching.bump_version(LENDS_VERSION)
+    bump_sidebars(_users_with_items(item_ids))
+    statistics.refresh_summaries(user_ids)
+    quotas.refresh_counts(user_ids)
+
+@receiver(post_save, sender = Category)
+@receiver(post_delete, sender = Category)
+def category_changed(sender, instance, **kwargs):
+    """A category has been saved or deleted."""
+    bump_sidebars([instance.user_id])
+
+@receiver(m2m_changed, sender = Category.tags.through)
+def category_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """The tags of one or more categories have changed.
+
+    If ``reverse`` is false, ``instance`` is a category. Otherwise, it is a tag,
+    and ``pk_set`` holds the IDs of categories.
+
+    """
+    if not reverse:
+        if action.startswith('post_'):
+            bump_sidebars([instance.user_id])
+    elif action == 'pre_clear':
+        bump_sidebars(_users_with_tags([instance.id]))
+    elif action in ('post_add', 'post_remove'):
+        bump_sidebars(Category.objects.filter(
+            id__in = pk_set
+        ).values_list('user_id', flat = True))
+
+@receiver(pre_delete, sender = Tag)
+def tag_deleted(sender, instance, **kwargs):
+    """A tag is about to be deleted, removing it from categories."""
+    bump_sidebars(_users_with_tags([instance.id]))
+
+@receiver(m2m_changed, sender = Item.tags.through)
+def item_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """The tags of one or more items have changed.
+
+    This changes which items belong to which categories. If ``reverse`` is
+    false, ``instance`` is an item and ``pk_set`` holds the IDs of tags.
+    Otherwise, ``instance`` is a tag.
+
+    """
+    if action in ('pre_clear', 'post_add', 'post_remove'):
+        caching.bump_version(LENDS_VERSION)
+        if reverse:
+            bump_sidebars(_users_with_tags([instance.id]))
+        elif action == 'pre_clear':
+            bump_sidebars(_users_with_item(instance))
+        else:
+            bump_sidebars(_users_with_tags(pk_set))
+
+@receiver(post_save, sender = Item)
+def item_saved(sender, instance, **kwargs):
+    """An item has been saved, perhaps under a new name."""
+    caching.bump_version(LENDS_VERSION)
+
+@receiver(pre_delete, sender = Item)
+def item_deleted(sender, instance, **kwargs):
+    """An item is about to be deleted.
+
+    Nobody may wait for it any longer. Otherwise, deleting its reservations
+    would reserve it again for whoever was waiting.
+
+    """
+    bump_sidebars(_users_with_item(instance))
+    WaitlistEntry.objects.filter(item_id = instance).delete()
+
+@receiver(pre_delete, sender = User)
+def user_deleted(sender, instance, **kwargs):
+    """A user is about to be deleted. They may not wait for items any longer.
+    """
+    WaitlistEntry.objects.filter(user_id = instance).delete()
+
+@receiver(post_init, sender = Lend)
+def lend_loaded(sender, instance, **kwargs):
+    """A lend has been loaded or created.
+
+    Remember its user, in case the lend is later given to someone else, and
+    its reservation, in case it is later shortened.
+
+    """
+    instance._loaded_user_id = instance.user_id_id
+    instance._loaded_reservation = _reservation(instance)
+
+@receiver(post_save, sender = Lend)
+@receiver(post_delete, sender = Lend)
+def lend_changed(sender, instance, **kwargs):
+    """A lend has been saved or deleted."""
+    lends_changed(
+        [instance.item_id_id],
+        [instance.user_id_id, instance._loaded_user_id]
+    )
+
+@receiver(post_save, sender = Lend)
+def lend_saved(sender, instance, created, **kwargs):
+    """A lend has been saved. Its reservation may have been shortened, making
+    room for someone on the waitlist."""
+    old = instance._loaded_reservation
+    instance._loaded_reservation = _reservation(instance)
+    if not created and waiting.freed(old, instance._loaded_reservation):
+        waiting.promote(*old)
+
+@receiver(post_delete, sender = Lend)
+def lend_deleted(sender, instance, **kwargs):
+    """A lend has been deleted, perhaps making room for someone on the
+    waitlist."""
+    item_id, due_out, due_back = instance._loaded_reservation
+    if due_out is not None:
+        waiting.promote(item_id, due_out, due_back)
+
+def _reservation(lend):
+    """Return the item and days ``lend`` reserves, as a tuple."""
+    return (lend.item_id_id, lend.due_out, lend.due_back)
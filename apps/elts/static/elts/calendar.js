@@ -0,0 +1,294 @@
+/*jslint browser: true, indent: 4, maxlen: 80 */
+
+/* Move the calendar between windows of days without reloading the page.
+ *
+ * The page carries the lends due out and due back in the window it shows. When
+ * the user moves to another window, only the days which have not been seen
+ * yet are fetched from `calendar/events/`, and the calendar is redrawn.
+ */
+
+var MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June', 'July',
+    'August', 'September', 'October', 'November', 'December'
+];
+
+/* Class names of the days of the week, indexed by `Date.getDay()`. */
+var DAY_CLASSES = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'];
+
+/* Return a string `number` padded with a leading zero to two characters. */
+function padTwo(number) {
+    'use strict';
+    return (number < 10 ? '0' : '') + number.toString();
+}
+
+/* Return a string in the format yyyy-mm-dd. */
+function formatDate(date) {
+    'use strict';
+    return [
+        date.getFullYear(),
+        padTwo(date.getMonth() + 1),
+        padTwo(date.getDate())
+    ].join('-');
+}
+
+/* Return the date described by `string`, in the format yyyy-mm-dd. */
+function parseDate(string) {
+    'use strict';
+    var parts = string.split('-');
+    return new Date(
+        parseInt(parts[0], 10),
+        parseInt(parts[1], 10) - 1,
+        parseInt(parts[2], 10)
+    );
+}
+
+/* Return the date `days` days after `date`. */
+function addDays(date, days) {
+    'use strict';
+    return new Date(date.getFullYear(), date.getMonth(), date.getDate() + days);
+}
+
+/* Return how many days `last` is after `first`. */
+function daysBetween(first, last) {
+    'use strict';
+    // Round, as a day may be 23 or 25 hours long.
+    return Math.round((last - first) / 86400000);
+}
+
+/* Return the first and last days shown by `view`, as `views.py` does. */
+function calendarWindow(view, start, end) {
+    'use strict';
+    var first;
+    if (view === 'month') {
+        first = new Date(start.getFullYear(), start.getMonth(), 1);
+        return [
+            first,
+            new Date(start.getFullYear(), start.getMonth() + 1, 0)
+        ];
+    }
+    if (view === 'week') {
+        // Weeks start on Monday.
+        first = addDays(start, -((start.getDay() + 6) % 7));
+        return [first, addDays(first, 6)];
+    }
+    return [start, end < start ? start : end];
+}
+
+/* Return the window `delta` windows before or after `first`-`last`. */
+function shiftWindow(view, first, last, delta) {
+    'use strict';
+    var length;
+    if (view === 'month') {
+        return calendarWindow(
+            view,
+            new Date(first.getFullYear(), first.getMonth() + delta, 1),
+            null
+        );
+    }
+    length = daysBetween(first, last) + 1;
+    return [addDays(first, length * delta), addDays(last, length * delta)];
+}
+
+/* Remember `events`, which cover the days from `first` to `last`. */
+function addEvents(state, first, last, events) {
+    'use strict';
+    var day;
+    for (day = first; day <= last; day = addDays(day, 1)) {
+        state.events[formatDate(day)] = [];
+    }
+    events.forEach(function (event) {
+        state.events[event.date].push(event);
+    });
+}
+
+/* Return the first and last days from `first` to `last` not yet seen.
+ *
+ * Return `null` if every day has been seen. */
+function missingDays(state, first, last) {
+    'use strict';
+    var day, missingFirst = null, missingLast = null;
+    for (day = first; day <= last; day = addDays(day, 1)) {
+        if (!state.events.hasOwnProperty(formatDate(day))) {
+            if (missingFirst === null) {
+                missingFirst = day;
+            }
+            missingLast = day;
+        }
+    }
+    return missingFirst === null ? null : [missingFirst, missingLast];
+}
+
+/* Return the URL of the calendar page showing `first`-`last`. */
+function pageUrl(state, first, last) {
+    'use strict';
+    return '?view=' + state.view + '&start=' + formatDate(first) +
+        '&end=' + formatDate(last);
+}
+
+/* Return a list item linking to the lend in `event`. */
+function eventItem(event) {
+    'use strict';
+    var item = document.createElement('li'),
+        link = document.createElement('a');
+    link.href = event.url;
+    link.textContent = event.item +
+        (event.kind === 'due_out' ? ' to ' : ' from ') + event.user;
+    item.appendChild(link);
+    return item;
+}
+
+/* Draw the days from `state.first` to `state.last`. */
+function render(state) {
+    'use strict';
+    var day, cell, number, list, events, previous, next;
+    state.body.innerHTML = '';
+    for (day = state.first; day <= state.last; day = addDays(day, 1)) {
+        cell = document.createElement('li');
+        cell.className = DAY_CLASSES[day.getDay()];
+        number = document.createElement('span');
+        number.className = 'day_number';
+        number.textContent = (
+            day.getTime() === state.first.getTime() || day.getDate() === 1
+                ? MONTH_NAMES[day.getMonth()].slice(0, 3) + ' '
+                : ''
+        ) + day.getDate();
+        list = document.createElement('ul');
+        events = state.events[formatDate(day)];
+        events.filter(function (event) {
+            return event.kind === 'due_out';
+        }).concat(events.filter(function (event) {
+            return event.kind === 'due_back';
+        })).forEach(function (event) {
+            list.appendChild(eventItem(event));
+        });
+        cell.appendChild(number);
+        cell.appendChild(list);
+        state.body.appendChild(cell);
+    }
+
+    if (state.view === 'month') {
+        state.title.textContent = MONTH_NAMES[state.first.getMonth()] + ' ' +
+            state.first.getFullYear();
+    } else {
+        state.title.textContent = [state.first, state.last].map(function (d) {
+            return d.getDate() + ' ' + MONTH_NAMES[d.getMonth()].slice(0, 3) +
+                ' ' + d.getFullYear();
+        }).join(' to ');
+    }
+    previous = shiftWindow(state.view, state.first, state.last, -1);
+    next = shiftWindow(state.view, state.first, state.last, 1);
+    state.previous.href = pageUrl(state, previous[0], previous[1]);
+    state.next.href = pageUrl(state, next[0], next[1]);
+}
+
+/* Show the days from `first` to `last`, fetching any that are missing.
+ *
+ * If `push` is true, add the new window to the browser's history. */
+function navigate(state, first, last, push) {
+    'use strict';
+    var missing = missingDays(state, first, last), request;
+
+    function show() {
+        state.first = first;
+        state.last = last;
+        render(state);
+        if (push) {
+            history.pushState(null, '', pageUrl(state, first, last));
+        }
+    }
+
+    if (missing === null) {
+        show();
+        return;
+    }
+    request = new XMLHttpRequest();
+    request.open(
+        'GET',
+        state.eventsUrl + '?start=' + formatDate(missing[0]) +
+            '&end=' + formatDate(missing[1])
+    );
+    request.onload = function () {
+        if (request.status !== 200) {
+            // Fall back to loading the page.
+            window.location = pageUrl(state, first, last);
+            return;
+        }
+        addEvents(
+            state,
+            missing[0],
+            missing[1],
+            JSON.parse(request.responseText).events
+        );
+        show();
+    };
+    request.send();
+}
+
+/* Follow the calendar's navigation links without reloading the page. */
+function setUp() {
+    'use strict';
+    var body = document.querySelector('ol.calendar-body'), state;
+    if (!body || !window.history.pushState) {
+        return;
+    }
+    state = {
+        view: body.getAttribute('data-view'),
+        first: parseDate(body.getAttribute('data-first')),
+        last: parseDate(body.getAttribute('data-last')),
+        eventsUrl: body.getAttribute('data-events-url'),
+        events: {},
+        body: body,
+        title: document.querySelector('h1.calendar-title'),
+        previous: document.querySelector('a.calendar-prev'),
+        next: document.querySelector('a.calendar-next')
+    };
+    addEvents(
+        state,
+        state.first,
+        state.last,
+        JSON.parse(document.getElementById('calendar-events').textContent)
+    );
+
+    function follow(delta) {
+        return function (event) {
+            var today = addDays(new Date(), 0), target;
+            if (delta !== 0) {
+                target = shiftWindow(state.view, state.first, state.last, delta);
+            } else {
+                target = calendarWindow(
+                    state.view,
+                    today,
+                    addDays(today, daysBetween(state.first, state.last))
+                );
+            }
+            event.preventDefault();
+            navigate(state, target[0], target[1], true);
+        };
+    }
+
+    state.previous.addEventListener('click', follow(-1));
+    state.next.addEventListener('click', follow(1));
+    document.querySelector('a.calendar-today').addEventListener(
+        'click',
+        follow(0)
+    );
+    window.addEventListener('popstate', function () {
+        var query = {}, target;
+        window.location.search.slice(1).split('&').forEach(function (pair) {
+            var parts = pair.split('=');
+            query[parts[0]] = decodeURIComponent(parts[1] || '');
+        });
+        if (query.view !== state.view || !query.start) {
+            window.location.reload();
+            return;
+        }
+        target = calendarWindow(
+            state.view,
+            parseDate(query.start),
+            parseDate(query.end || query.start)
+        );
+        navigate(state, target[0], target[1], false);
+    });
+}
+
+setUp();
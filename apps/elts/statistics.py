@@ -0,0 +1,244 @@
+"""Statistics about how punctually items are picked up and returned.
+
+Each lend has a deadline for going out (the end of ``due_out``) and a deadline
+for coming back (the end of ``due_back``). An item's delay is the time between a
+deadline and the moment the item actually went out or came back, in seconds. A
+positive delay is late, and a negative delay is early. Delays are measured for
+two kinds of event:
+
+``pickup``
+    Lends with both ``due_out`` and ``out`` set.
+``return``
+    Lends with both ``due_back`` and ``back`` set.
+
+Like ``elts.analytics``, this module loads delays into NumPy arrays and
+summarizes many groups of them at once.
+
+"""
+from django.contrib.auth.models import User
+from elts import analytics
+from elts.models import Item, LatenessSummary, Lend, Tag
+import numpy as np
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+# Module 'numpy' has no 'int64' member (no-member)
+
+# The kinds of event whose delays are measured. Each maps to the planned and
+# actual fields of ``Lend`` that are compared.
+KINDS = {'pickup': ('due_out', 'out'), 'return': ('due_back', 'back')}
+
+# The percentiles reported for each group of delays.
+PERCENTILES = (10, 50, 90)
+
+# The edges of the bins that delays are counted in, in seconds. Each bin
+# includes its lower edge, so there is one more bin than there are edges.
+BIN_EDGES = (-7 * 86400, -86400, -3600, 1, 3600, 86400, 7 * 86400)
+BIN_NAMES = (
+    'over a week early',
+    'days early',
+    'hours early',
+    'within the hour',
+    'under an hour late',
+    'hours late',
+    'days late',
+    'over a week late',
+)
+
+def delays(kind, lends):
+    """Measure the ``kind`` delays of ``lends``.
+
+    ``kind`` is one of ``KINDS``, and ``lends`` is a ``Lend`` queryset. Lends
+    without a ``kind`` event are skipped. Three arrays are returned: the IDs of
+    each lend's item and user, and each lend's delay.
+
+    """
+    planned, actual = KINDS[kind]
+    item_ids, user_ids, deadlines, times = analytics.columns(
+        lends.filter(**{
+            planned + '__isnull': False,
+            actual + '__isnull': False,
+        }).values_list('item_id', 'user_id', planned, actual),
+        4
+    )
+    return (
+        np.array(item_ids, dtype = np.int64),
+        np.array(user_ids, dtype = np.int64),
+        analytics.datetimes_to_times(times, 0) -
+        analytics.dates_to_times(deadlines, 1, 0)
+    )
+
+def distribution(groups, values, size):
+    """Summarize ``values`` in each of ``size`` groups.
+
+    ``groups`` and ``values`` are integer arrays of equal length. Value ``i``
+    belongs to group ``groups[i]``. A dict of arrays, each with one row per
+    group, is returned:
+
+    ``count``
+        How many values the group has.
+    ``late``
+        How many of the group's values are positive.
+    ``percentiles``
+        One column per entry in ``PERCENTILES``, holding that percentile of the
+        group's values. These are ``nan`` for an empty group.
+    ``histogram``
+        One column per bin described by ``BIN_EDGES``, holding how many of the
+        group's values fall in that bin.
+
+    >>> summary = distribution(
+    ...     np.array([0, 1, 0, 0, 0]),
+    ...     np.array([30, -5, 10, 0, 20]),
+    ...     3
+    ... )
+    >>> summary['count'].tolist(), summary['late'].tolist()
+    ([4, 1, 0], [3, 0, 0])
+    >>> summary['percentiles'][0].tolist()
+    [0.0, 10.0, 30.0]
+    >>> summary['histogram'][0].tolist()
+    [0, 0, 0, 1, 3, 0, 0, 0]
+
+    """
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    counts = np.bincount(groups, minlength = size)
+    firsts = np.cumsum(counts) - counts
+    late = np.bincount(groups[values > 0], minlength = size)
+
+    # Use the nearest-rank method, so that every percentile is a real delay.
+    percentiles = np.empty((size, len(PERCENTILES)))
+    percentiles.fill(np.nan)
+    nonempty = counts > 0
+    for column, percentile in enumerate(PERCENTILES):
+        ranks = np.ceil(percentile / 100.0 * counts[nonempty]).astype(np.int64)
+        percentiles[nonempty, column] = values[
+            firsts[nonempty] + np.maximum(ranks - 1, 0)
+        ]
+
+    bins = np.searchsorted(BIN_EDGES, values, 'right')
+    histogram = np.bincount(
+        groups * len(BIN_NAMES) + bins,
+        minlength = size * len(BIN_NAMES)
+    ).reshape(size, len(BIN_NAMES))
+    return {
+        'count': counts,
+        'late': late,
+        'percentiles': percentiles,
+        'histogram': histogram,
+    }
+
+def lateness(kind, scope):
+    """Summarize the ``kind`` delays of every user, item or tag.
+
+    ``kind`` is one of ``KINDS``, and ``scope`` is one of ``'user'``, ``'item'``
+    or ``'tag'``. The delays of a tag are those of the items with that tag.
+
+    A list of ``(object, summary)`` tuples is returned, where ``summary`` is a
+    dict with the same keys as the dict returned by ``distribution``. Objects
+    without any delays are omitted.
+
+    """
+    item_ids, user_ids, values = delays(kind, Lend.objects.all())
+    if scope == 'user':
+        objects = list(User.objects.order_by('id'))
+        keys = user_ids
+    elif scope == 'item':
+        objects = list(Item.objects.order_by('id'))
+        keys = item_ids
+    else:
+        objects = list(Tag.objects.order_by('id'))
+        pair_tag_ids, pair_item_ids = analytics.columns(
+            analytics.tag_pairs(),
+            2
+        )
+        indices, keys = analytics.join(
+            item_ids,
+            np.array(pair_item_ids, dtype = np.int64),
+            np.array(pair_tag_ids, dtype = np.int64)
+        )
+        values = values[indices]
+
+    summary = distribution(
+        np.searchsorted(np.array([obj.id for obj in objects]), keys),
+        values,
+        len(objects)
+    )
+    return [
+        (obj, dict((name, column[i]) for name, column in summary.items()))
+        for i, obj in enumerate(objects)
+        if summary['count'][i]
+    ]
+
+def refresh_summaries(user_ids = None):
+    """Recompute the ``LatenessSummary`` of each of ``user_ids``.
+
+    If ``user_ids`` is ``None``, recompute every user's summary. However many
+    users are given, their lends are fetched with one query per kind of delay.
+
+    """
+    if user_ids is None:
+        user_ids = User.objects.values_list('id', flat = True)
+    user_ids = np.unique(np.array(list(user_ids), dtype = np.int64))
+    lends = Lend.objects.filter(user_id__in = user_ids.tolist())
+    fields = {}
+    for kind in ('pickup', 'return'):
+        _, lend_user_ids, values = delays(kind, lends)
+        summary = distribution(
+            np.searchsorted(user_ids, lend_user_ids),
+            values,
+            len(user_ids)
+        )
+        medians = summary['percentiles'][:, PERCENTILES.index(50)]
+        fields[kind] = (summary['count'], summary['late'], medians)
+
+    for i, user_id in enumerate(user_ids.tolist()):
+        row = {
+            'pickups': int(fields['pickup'][0][i]),
+            'late_pickups': int(fields['pickup'][1][i]),
+            'median_pickup_delay': _int_or_none(fields['pickup'][2][i]),
+            'returns': int(fields['return'][0][i]),
+            'late_returns': int(fields['return'][1][i]),
+            'median_return_delay': _int_or_none(fields['return'][2][i]),
+        }
+        # A user whose lends are all being deleted, perhaps because the user is
+        # being deleted, should not be given a new row.
+        if (
+            not LatenessSummary.objects.filter(user = user_id).update(**row)
+            and (row['pickups'] or row['returns'])
+        ):
+            LatenessSummary.objects.create(user_id = user_id, **row)
+
+def on_time_score(user):
+    """Return ``user``'s on-time score, as described by ``LatenessSummary``.
+
+    If ``user`` has no summary, or has never picked up or returned an item,
+    ``None`` is returned. If ``user`` was fetched with
+    ``select_related('lateness')``, no query is made.
+
+    """
+    try:
+        return user.lateness.on_time_score()
+    except LatenessSummary.DoesNotExist:
+        return None
+
+def describe_score(user):
+    """Describe ``user``'s on-time score in a few words.
+
+    See ``on_time_score``.
+
+    """
+    score = on_time_score(user)
+    if score is None:
+        return u'no lending history'
+    return u'{:.0f}% on time'.format(score)
+
+def _int_or_none(value):
+    """Convert ``value`` to an integer, or to ``None`` if it is ``nan``.
+
+    >>> _int_or_none(np.float64(3.0))
+    3
+    >>> _int_or_none(np.nan) is None
+    True
+
+    """
+    return None if np.isnan(value) else int(value)
@@ -81,6 +81,7 @@ class LendTable(tables.Table):
     class Meta(object):
         """Non-column table attributes."""
         model = models.Lend
+        exclude = ('kit_lend_id',)
 
     def render_actions(self, record):
         """Define how the ``actions`` column should be rendered.
@@ -151,6 +152,61 @@ class TagTable(tables.Table):
         """
         return _truncate_string(value)
 
+class KitTable(tables.Table):
+    """An HTML table displaying ``Kit`` objects.
+
+    The ``actions`` column contains links for reading, updating and deleting
+    ``Kit`` objects.
+
+    """
+    actions = tables.Column(empty_values=(), orderable=False)
+
+    class Meta(object):
+        """Non-column table attributes."""
+        model = models.Kit
+
+    def render_actions(self, record):
+        """Define how the ``actions`` column should be rendered.
+
+        ``record`` represents a row of data from the database (and,
+        consequently, a row in the table).
+
+        """
+        return mark_safe(_restful_links('kit', record.id))
+
+    def render_description(self, value):
+        """Define how the ``description`` column should be rendered.
+
+        ``value`` represents a single cell of data from the table.
+
+        """
+        return _truncate_string(value)
+
+class KitLendTable(tables.Table):
+    """An HTML table displaying ``KitLend`` objects.
+
+    Each row stands for the lends of every item in a kit. The ``actions``
+    column contains a link for reading them. A kit lend is cancelled from
+    there, as it cannot be edited.
+
+    """
+    actions = tables.Column(empty_values=(), orderable=False)
+
+    class Meta(object):
+        """Non-column table attributes."""
+        model = models.KitLend
+
+    def render_actions(self, record):
+        """Define how the ``actions`` column should be rendered.
+
+        ``record`` represents a row of data from the database (and,
+        consequently, a row in the table).
+
+        """
+        return mark_safe('<a href="{}">View</a>'.format(
+            _read_url('kit_lend', record.id)
+        ))
+
 def _truncate_string(string):
     """If ``string`` is too long, truncate it and append an ellipsis.
 
@@ -0,0 +1,84 @@
+"""Tasks which are run by background workers.
+
+See ``elts.jobs`` for how tasks are run. The tasks in ``RECURRING`` are
+scheduled whenever workers are started. To change how often they run, or to
+stop one from running, set ``ELTS_RECURRING_JOBS`` to a dict like
+``RECURRING``. An interval of ``None`` stops a task from recurring.
+
+"""
+from datetime import date, timedelta
+from django.conf import settings
+from django.utils import timezone
+from elts import idempotency, jobs, notifications, quotas, statistics
+from elts.models import Job
+
+# pylint: disable=E1101
+# Class 'Job' has no 'objects' member (no-member)
+
+# Maps the name of each recurring task to how often it runs, in seconds.
+RECURRING = {
+    'refresh_lateness': 24 * 3600,
+    'refresh_lend_counts': 24 * 3600,
+    'purge_jobs': 24 * 3600,
+    'purge_idempotency_keys': 24 * 3600,
+    'send_notifications': 3600,
+}
+
+def schedule_recurring():
+    """Schedule each recurring task, as described in the module docstring."""
+    for name, interval in getattr(
+        settings,
+        'ELTS_RECURRING_JOBS',
+        RECURRING
+    ).items():
+        if interval is None:
+            Job.objects.filter(task = name, interval__isnull = False).delete()
+        else:
+            jobs.schedule(name, interval)
+
+@jobs.task
+def refresh_lateness():
+    """Recompute every user's ``LatenessSummary``.
+
+    Summaries are kept up to date as lends are saved. This catches lends which
+    were changed without being saved one by one.
+
+    """
+    statistics.refresh_summaries()
+
+@jobs.task
+def refresh_lend_counts():
+    """Recompute every user's ``ActiveLendCount``.
+
+    Counts are kept up to date as lends are saved. This catches lends which
+    were changed without being saved one by one.
+
+    """
+    quotas.refresh_counts()
+
+@jobs.task
+def purge_jobs(days = 30):
+    """Delete jobs which finished more than ``days`` days ago."""
+    Job.objects.filter(
+        status__in = [Job.DONE, Job.FAILED],
+        finished__lt = timezone.now() - timedelta(days = days),
+    ).delete()
+
+@jobs.task
+def purge_idempotency_keys():
+    """Delete idempotency keys which have expired.
+
+    See ``elts.idempotency``.
+
+    """
+    idempotency.purge()
+
+@jobs.task(atomic = False)
+def send_notifications():
+    """Email borrowers about items that are overdue or due back soon.
+
+    Notifications are recorded a batch at a time, as they are sent, so that a
+    failure does not cause the ones already sent to be sent again.
+
+    """
+    notifications.send(date.today())
@@ -3,7 +3,7 @@ from django.utils.timezone import utc
 from datetime import date, datetime
 from django.db.models import Q
 from django.template import Library
-from elts import models
+from elts import caching, models, signals
 
 # A function decorated with @register.filter can be used as a filter.
 register = Library() # pylint: disable=C0103
@@ -27,6 +27,23 @@ def category_tags(category):
     """
     return models.Tag.objects.filter(category__exact = category) # pylint: disable=E1101
 
+@register.filter
+def sidebar_version(user):
+    """Return the version of ``user``'s cached sidebar.
+
+    The sidebar summarizes ``user``'s categories. It is cached, and this version
+    is part of its cache key. See ``elts.signals`` for what changes the version.
+
+    >>> from elts import factories
+    >>> user = factories.UserFactory.create()
+    >>> version = sidebar_version(user)
+    >>> category = factories.CategoryFactory.create(user = user)
+    >>> sidebar_version(user) == version
+    False
+
+    """
+    return caching.get_version(signals.sidebar_version_name(user.id))
+
 # FIXME: write doctests
 @register.filter
 def count(queryset):
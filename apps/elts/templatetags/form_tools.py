@@ -0,0 +1,24 @@
+"""Tools for displaying forms in templates."""
+from django.template import Library
+from django.utils.html import format_html
+from elts import idempotency
+
+# A function decorated with @register.simple_tag can be used as a tag.
+register = Library() # pylint: disable=C0103
+
+@register.simple_tag
+def idempotency_key_field():
+    """Return a hidden form field holding a fresh idempotency key.
+
+    Whatever a form with this field creates is created only once, however
+    many times the form is submitted. See ``elts.idempotency``.
+
+    >>> idempotency_key_field() == idempotency_key_field()
+    False
+
+    """
+    return format_html(
+        "<input type='hidden' name='{}' value='{}' />",
+        idempotency.FIELD,
+        idempotency.new_key()
+    )
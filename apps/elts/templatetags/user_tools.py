@@ -0,0 +1,29 @@
+"""Tools for displaying user information in templates."""
+from django.template import Library
+from django.utils.http import urlquote
+from elts import ical, statistics
+
+# A function decorated with @register.filter can be used as a filter.
+register = Library() # pylint: disable=C0103
+
+@register.filter
+def on_time_score(user):
+    """Describe how punctually ``user`` picks up and returns items.
+
+    >>> from elts import factories
+    >>> on_time_score(factories.UserFactory.create())
+    u'no lending history'
+
+    """
+    return statistics.describe_score(user)
+
+@register.simple_tag
+def feed_token(user, kind, id_):
+    """Return a URL-encoded token that lets a calendar client read the feed of
+    ``kind`` ``id_`` as ``user``.
+
+    For example, ``{% feed_token user 'tag' tag.id %}``. See ``elts.ical``.
+
+    """
+    token = ical.make_token(user, ical.feed_name(kind, id_))
+    return urlquote(token, safe = '')
@@ -0,0 +1,157 @@
+"""Unit tests for the ``analytics`` module."""
+from datetime import date, datetime, timedelta
+from django.test import TestCase
+from django.utils.timezone import utc
+from elts import analytics, factories
+
+# pylint: disable=E1101
+# Class 'ItemFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class UtilizationTestCase(TestCase):
+    """Tests for ``analytics.utilization``."""
+    def setUp(self):
+        """Create two tagged items, and a category containing that tag.
+
+        The window is ten days in June, so that no day in it is lengthened or
+        shortened by daylight saving time.
+
+        """
+        self.start = date(2013, 6, 1)
+        self.lower = analytics.to_time(self.start)
+        self.upper = analytics.to_time(self.start + timedelta(days = 10))
+        self.tag = factories.TagFactory.create()
+        self.category = factories.CategoryFactory.create(tags = [self.tag])
+        self.items = [factories.ItemFactory.create() for _ in range(2)]
+        for item in self.items:
+            item.tags.add(self.tag)
+
+    def _reserve(self, item, first_day, last_day):
+        """Reserve ``item`` for days ``first_day`` to ``last_day`` of the
+        window."""
+        factories.FutureLendFactory.create(
+            item_id = item,
+            due_out = self.start + timedelta(days = first_day),
+            due_back = self.start + timedelta(days = last_day),
+        )
+
+    def _usage(self, scope):
+        """Return the reserved usage of ``scope``, as a list of fractions."""
+        return [
+            used / available for _, used, available in analytics.utilization(
+                'reserved',
+                self.lower,
+                self.upper
+            )[scope]
+        ]
+
+    def test_items(self):
+        """Check that overlapping and clipped reservations are counted once."""
+        self._reserve(self.items[0], -3, 1)
+        self._reserve(self.items[0], 1, 3)
+        self._reserve(self.items[1], 8, 20)
+        self.assertEqual(self._usage('items'), [0.4, 0.2])
+
+    def test_groups(self):
+        """Check that tags and categories total the usage of their items."""
+        self._reserve(self.items[0], 0, 9)
+        self.assertEqual(self._usage('tags'), [0.5])
+        self.assertEqual(self._usage('categories'), [0.5])
+
+    def test_group_order(self):
+        """Check that each group gets its own usage when the groups' names
+        sort the opposite way to their IDs."""
+        user = factories.UserFactory.create()
+        tags = []
+        categories = []
+        for item, name in zip(self.items, ('z', 'a')):
+            tag = factories.TagFactory.create(name = name)
+            item.tags.add(tag)
+            tags.append(tag)
+            categories.append(factories.CategoryFactory.create(
+                user = user,
+                name = name,
+                tags = [tag],
+            ))
+        self._reserve(self.items[0], 0, 9)
+        self._reserve(self.items[1], 0, 4)
+        usage = analytics.utilization('reserved', self.lower, self.upper)
+        for scope, groups in (('tags', tags), ('categories', categories)):
+            fractions = dict(
+                (group, used / available)
+                for group, used, available in usage[scope]
+            )
+            self.assertEqual(fractions[groups[0]], 1.0)
+            self.assertEqual(fractions[groups[1]], 0.5)
+        self.assertEqual(
+            [tag.name for tag, _, _ in usage['tags'] if tag in tags],
+            ['a', 'z']
+        )
+
+    def test_lent(self):
+        """Check that an item which has not come back is in use until now."""
+        factories.PastLendFactory.create(
+            item_id = self.items[0],
+            out = datetime(2000, 1, 1, tzinfo = utc),
+        )
+        self.assertEqual(
+            [used for _, used, _ in analytics.utilization(
+                'lent',
+                self.lower,
+                self.upper
+            )['items']],
+            [self.upper - self.lower, 0]
+        )
+
+class CapacityTestCase(TestCase):
+    """Tests for ``analytics.capacity``."""
+    def setUp(self):
+        """Create three items with a tag."""
+        self.start = date(2013, 6, 1)
+        self.tag = factories.TagFactory.create()
+        self.items = [factories.ItemFactory.create() for _ in range(3)]
+        for item in self.items:
+            item.tags.add(self.tag)
+
+    def _lend(self, item, first_day, last_day):
+        """Lend out ``item`` for days ``first_day`` to ``last_day``."""
+        factories.PastLendFactory.create(
+            item_id = item,
+            out = analytics.to_datetime(
+                analytics.to_time(self.start + timedelta(days = first_day))
+            ),
+            back = analytics.to_datetime(
+                analytics.to_time(self.start + timedelta(days = last_day + 1))
+            ),
+        )
+
+    def test_peak(self):
+        """Check that the peak counts only lends which overlap."""
+        self._lend(self.items[0], 0, 4)
+        self._lend(self.items[1], 2, 6)
+        self._lend(self.items[2], 5, 9)
+        row, = analytics.capacity()
+        self.assertEqual(row['tag'], self.tag)
+        self.assertEqual(row['items'], 3)
+        self.assertEqual(row['peak'], 2)
+        self.assertEqual(
+            row['peak_at'],
+            analytics.to_time(self.start + timedelta(days = 2))
+        )
+        self.assertEqual(row['shortfall'], 0)
+        self.assertEqual(
+            [demand for _, demand in row['timeline']],
+            [1, 2, 2, 1, 0]
+        )
+
+    def test_window(self):
+        """Check that demand outside the window is ignored."""
+        self._lend(self.items[0], 0, 4)
+        self._lend(self.items[1], 2, 6)
+        row, = analytics.capacity(
+            analytics.to_time(self.start + timedelta(days = 5))
+        )
+        self.assertEqual(row['peak'], 1)
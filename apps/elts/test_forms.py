@@ -4,10 +4,11 @@ Each test case in this module tests a single form. For example, the
 ``ItemFormTestCase`` tests just the ``ItemForm`` form.
 
 """
-from datetime import timedelta
+from datetime import date, timedelta
 from django.test import TestCase
 from elts import factories
 from elts import forms
+from elts import models
 import random
 import unittest
 
@@ -91,6 +92,59 @@ class TagFormTestCase(TestCase):
         })
         self.assertFalse(form.is_valid())
 
+class VersionedFormTestCase(TestCase):
+    """Tests for ``VersionedForm``, by way of ``TagForm``."""
+    def setUp(self):
+        """Create a tag, accessible as ``self.tag``."""
+        self.tag = factories.TagFactory.create()
+
+    def _form(self, version):
+        """Return a bound ``TagForm`` which updates ``self.tag``."""
+        tag = models.Tag.objects.get(id = self.tag.id)
+        return forms.TagForm(
+            {'name': factories.tag_name(), 'version': version},
+            instance = tag
+        )
+
+    def test_save(self):
+        """Update a tag, giving its current version."""
+        form = self._form(self.tag.version)
+        self.assertTrue(form.is_valid())
+        self.assertIsNotNone(form.save())
+        self.assertFalse(form.stale)
+        tag = models.Tag.objects.get(id = self.tag.id)
+        self.assertEqual(tag.version, self.tag.version + 1)
+        self.assertEqual(tag.name, form.cleaned_data['name'])
+
+    def test_stale(self):
+        """Update a tag twice, giving the same version both times.
+
+        The second update should not be saved, and should offer the latest
+        version, so that it can be submitted again.
+
+        """
+        first = self._form(self.tag.version)
+        self.assertTrue(first.is_valid())
+        first.save()
+
+        second = self._form(self.tag.version)
+        self.assertTrue(second.is_valid())
+        self.assertIsNone(second.save())
+        self.assertTrue(second.stale)
+        self.assertTrue(second.non_field_errors())
+        tag = models.Tag.objects.get(id = self.tag.id)
+        self.assertEqual(tag.name, first.cleaned_data['name'])
+
+        third = self._form(second.data['version'])
+        self.assertTrue(third.is_valid())
+        self.assertIsNotNone(third.save())
+
+    def test_no_version(self):
+        """Update a tag without giving a version."""
+        form = self._form('')
+        self.assertTrue(form.is_valid())
+        self.assertIsNotNone(form.save())
+
 class CategoryFormTestCase(TestCase):
     """Tests for ``CategoryForm``."""
     def test_valid(self):
@@ -500,6 +554,45 @@ class LendFormTestCase(TestCase):
         new_lend['back'] = old_lend.back + timedelta(days = 1)
         self.assertFalse(forms.LendForm(new_lend).is_valid())
 
+class LendFormQuotaTestCase(TestCase):
+    """Tests for how ``LendForm`` checks quotas. See ``elts.quotas``."""
+    def setUp(self):
+        """Lend an item to a user who may only have one item out."""
+        self.lend = factories.PastLendFactory.create()
+        self.user = self.lend.user_id
+        models.LendQuota.objects.create(user = self.user, limit = 1)
+
+    def test_full(self):
+        """Lend out another item to the user."""
+        form = forms.LendForm({
+            'user_id': self.user.id,
+            'item_id': factories.ItemFactory.create().id,
+            'out': factories.lend_out(),
+        })
+        self.assertFalse(form.is_valid())
+
+    def test_reserve(self):
+        """Reserve another item for the user, without lending it out."""
+        form = forms.LendForm({
+            'user_id': self.user.id,
+            'item_id': factories.ItemFactory.create().id,
+            'due_out': factories.lend_due_out(),
+        })
+        self.assertTrue(form.is_valid())
+
+    def test_same_lend(self):
+        """Edit the lend which the user already has out."""
+        form = forms.LendForm(
+            {
+                'user_id': self.user.id,
+                'item_id': self.lend.item_id.id,
+                'out': self.lend.out,
+                'version': self.lend.version,
+            },
+            instance = self.lend
+        )
+        self.assertTrue(form.is_valid())
+
 class LoginFormTestCase(TestCase):
     """Tests for ``LoginForm``."""
     def test_valid(self):
@@ -519,3 +612,159 @@ class LoginFormTestCase(TestCase):
         """Create a LoginForm without setting ``password``."""
         form = forms.LoginForm({'username': factories.user_username()})
         self.assertFalse(form.is_valid())
+
+class RecurringLendFormTestCase(TestCase):
+    """Tests for ``RecurringLendForm``."""
+    def setUp(self):
+        """Create an item and a user, and describe a rule reserving it."""
+        self.item = factories.ItemFactory.create()
+        self.data = {
+            'item_id': self.item.id,
+            'user_id': factories.UserFactory.create().id,
+            'due_out': '2014-01-14',
+            'days': 1,
+            'interval': 1,
+            'count': 15,
+        }
+
+    def test_valid(self):
+        """Create a valid RecurringLendForm, and reserve the item."""
+        form = forms.RecurringLendForm(self.data)
+        self.assertTrue(form.is_valid())
+        lends = form.save()
+        self.assertEqual(len(lends), 15)
+        self.assertEqual(
+            self.item.lend_set.filter(due_out__gte = date(2014, 1, 14)).count(),
+            15
+        )
+
+    def test_count_and_until(self):
+        """Set both ``count`` and ``until``, or neither."""
+        self.data['until'] = '2014-04-22'
+        self.assertFalse(forms.RecurringLendForm(self.data).is_valid())
+        del self.data['count']
+        del self.data['until']
+        self.assertFalse(forms.RecurringLendForm(self.data).is_valid())
+
+    def test_overlapping(self):
+        """Make each reservation last longer than a week."""
+        self.data['days'] = 8
+        self.assertFalse(forms.RecurringLendForm(self.data).is_valid())
+
+    def test_conflicts(self):
+        """Check that each clashing occurrence is reported."""
+        for day in (21, 28):
+            factories.FutureLendFactory.create(
+                item_id = self.item,
+                due_out = date(2014, 1, day),
+                due_back = date(2014, 1, day),
+            )
+        form = forms.RecurringLendForm(self.data)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.non_field_errors()), 2)
+
+class AllocatedLendFormTestCase(TestCase):
+    """Tests for ``AllocatedLendForm``."""
+    def setUp(self):
+        """Create a tag, an item with it, and a user to reserve it for."""
+        self.tag = factories.TagFactory.create()
+        self.item = factories.ItemFactory.create(is_lendable = True)
+        self.item.tags.add(self.tag)
+        self.user = factories.UserFactory.create()
+        self.data = {
+            'tag': self.tag.id,
+            'user_id': self.user.id,
+            'due_out': '2014-01-14',
+            'due_back': '2014-01-15',
+        }
+
+    def test_valid(self):
+        """Create a valid AllocatedLendForm, and reserve the item."""
+        form = forms.AllocatedLendForm(self.user, self.data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save().item_id, self.item)
+
+    def _is_valid(self):
+        """Tell whether ``self.data`` is valid for ``self.user``."""
+        return forms.AllocatedLendForm(self.user, self.data).is_valid()
+
+    def test_category(self):
+        """Reserve an item in one of the user's categories."""
+        category = factories.CategoryFactory.create(
+            user = self.user,
+            tags = [self.tag],
+        )
+        del self.data['tag']
+        self.data['category'] = category.id
+        self.assertTrue(self._is_valid())
+        self.assertFalse(
+            forms.AllocatedLendForm(
+                factories.UserFactory.create(),
+                self.data
+            ).is_valid()
+        )
+
+    def test_tag_and_category(self):
+        """Set neither ``tag`` nor ``category``."""
+        del self.data['tag']
+        self.assertFalse(self._is_valid())
+
+    def test_busy(self):
+        """Try to reserve an item while every item is taken."""
+        factories.FutureLendFactory.create(
+            item_id = self.item,
+            due_out = date(2014, 1, 15),
+            due_back = None,
+        )
+        self.assertFalse(self._is_valid())
+
+class KitLendFormTestCase(TestCase):
+    """Tests for ``KitLendForm``."""
+    def setUp(self):
+        """Create a kit of two items, and set ``self.data``."""
+        self.kit = factories.KitFactory.create()
+        self.data = {
+            'kit_id': self.kit.id,
+            'user_id': factories.UserFactory.create().id,
+            'due_out': '2014-01-14',
+            'due_back': '2014-01-15',
+        }
+
+    def test_valid(self):
+        """Create a valid KitLendForm, and reserve the kit."""
+        form = forms.KitLendForm(self.data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(
+            sorted(lend.item_id.id for lend in form.save().lends.all()),
+            sorted(item.id for item in self.kit.items.all())
+        )
+
+    def test_item_ids(self):
+        """Find the items to lock before validating the form."""
+        self.assertEqual(
+            forms.KitLendForm(self.data).item_ids(),
+            sorted(item.id for item in self.kit.items.all())
+        )
+        self.data['kit_id'] = 'x'
+        self.assertEqual(forms.KitLendForm(self.data).item_ids(), [])
+
+    def test_busy(self):
+        """Reserve the kit while one of its items is reserved."""
+        factories.FutureLendFactory.create(
+            item_id = self.kit.items.all()[0],
+            due_out = date(2014, 1, 15),
+            due_back = None,
+        )
+        form = forms.KitLendForm(self.data)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.non_field_errors()), 1)
+
+    def test_empty(self):
+        """Reserve a kit with no items."""
+        self.data['kit_id'] = factories.KitFactory.create(items = []).id
+        self.assertFalse(forms.KitLendForm(self.data).is_valid())
+
+    def test_due_back_before_due_out(self):
+        """Reserve the kit with ``due_back`` before ``due_out``."""
+        self.data['due_back'] = '2014-01-13'
+        self.assertFalse(forms.KitLendForm(self.data).is_valid())
@@ -0,0 +1,103 @@
+"""Unit tests for the ``ical`` module."""
+from datetime import date, datetime, timedelta
+from django.test import TestCase
+from django.utils import timezone
+from elts import factories, ical
+
+# pylint: disable=E1101
+# Class 'UserFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class LendsTestCase(TestCase):
+    """Tests for ``ical.lends``."""
+    def setUp(self):
+        """Pick a day to look at the feed on."""
+        self.today = date(2013, 6, 15)
+        self.lower, self.upper = ical.window(self.today)
+
+    def _ids(self):
+        """Return the IDs of the lends covered as of ``self.today``."""
+        return set(lend.id for lend in ical.lends(self.today))
+
+    def test_reservations(self):
+        """Check that reservations are covered if they touch the window."""
+        inside = factories.FutureLendFactory.create(
+            due_out = self.upper,
+            due_back = self.upper + timedelta(days = 5),
+        )
+        after = factories.FutureLendFactory.create(
+            due_out = self.upper + timedelta(days = 1),
+            due_back = self.upper + timedelta(days = 5),
+        )
+        self.assertIn(inside.id, self._ids())
+        self.assertNotIn(after.id, self._ids())
+
+    def test_out(self):
+        """Check that an item which is still out is covered, however long ago
+        it went out."""
+        long_ago = datetime(2010, 1, 1, tzinfo = timezone.utc)
+        out = factories.PastLendFactory.create(out = long_ago)
+        back = factories.PastLendFactory.create(
+            out = long_ago,
+            back = long_ago + timedelta(days = 1),
+        )
+        self.assertIn(out.id, self._ids())
+        self.assertNotIn(back.id, self._ids())
+
+class FeedTestCase(TestCase):
+    """Tests for ``ical.feed``."""
+    def test_feed(self):
+        """Check that a feed is well formed and lists each lend once."""
+        lend = factories.PastLendFactory.create(
+            out = timezone.now(),
+            due_back = date.today(),
+        )
+        lines = list(ical.feed(
+            u'Lends, all of them',
+            ical.lends(date.today()),
+            timezone.now(),
+            show_user = True
+        ))
+        self.assertTrue(all(line.endswith(b'\r\n') for line in lines))
+        self.assertEqual(lines[0], b'BEGIN:VCALENDAR\r\n')
+        self.assertEqual(lines[-1], b'END:VCALENDAR\r\n')
+        self.assertIn(b'X-WR-CALNAME:Lends\\, all of them\r\n', lines)
+        self.assertEqual(lines.count(b'BEGIN:VEVENT\r\n'), 1)
+        self.assertIn(b'UID:lend-{}@elts\r\n'.format(lend.id), lines)
+
+class TokenTestCase(TestCase):
+    """Tests for ``ical.make_token`` and ``ical.check_token``."""
+    def test_round_trip(self):
+        """Check that a token stands in for the user it was made for."""
+        user = factories.UserFactory.create()
+        token = ical.make_token(user, 'user-1')
+        self.assertEqual(ical.check_token(token, 'user-1'), user)
+
+    def test_other_feed(self):
+        """Check that a token is refused for any other feed."""
+        user = factories.UserFactory.create()
+        token = ical.make_token(user, 'user-1')
+        self.assertIsNone(ical.check_token(token, 'user-2'))
+        self.assertIsNone(ical.check_token(token, 'tag-1'))
+
+    def test_inactive(self):
+        """Check that a token is refused once its user is deactivated."""
+        user = factories.UserFactory.create()
+        token = ical.make_token(user, 'user-1')
+        user.is_active = False
+        user.save()
+        self.assertIsNone(ical.check_token(token, 'user-1'))
+
+    def test_revoke(self):
+        """Check that revoking a user's tokens leaves other users' alone."""
+        user, other = factories.UserFactory.create_batch(2)
+        token = ical.make_token(user, 'user-1')
+        other_token = ical.make_token(other, 'user-1')
+        ical.revoke_tokens(user)
+        self.assertIsNone(ical.check_token(token, 'user-1'))
+        self.assertEqual(ical.check_token(other_token, 'user-1'), other)
+        token = ical.make_token(user, 'user-1')
+        self.assertEqual(ical.check_token(token, 'user-1'), user)
@@ -0,0 +1,135 @@
+"""Unit tests for the ``idempotency`` module.
+
+The ``lend/`` URI is used throughout, as it is one of the views decorated with
+``idempotency.idempotent``.
+
+"""
+from datetime import date, timedelta
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.utils import timezone
+from elts import factories, idempotency, models
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class IdempotentTestCase(TestCase):
+    """Tests for ``idempotency.idempotent``."""
+    URI = reverse('elts.views.lend')
+
+    def setUp(self):
+        """Log in, and set ``self.data`` to a valid reservation."""
+        self.user, password = factories.create_user()
+        self.client.login(username = self.user.username, password = password)
+        self.data = {
+            'item_id': factories.ItemFactory.create().id,
+            'user_id': self.user.id,
+            'due_out': str(date.today()),
+            'due_back': str(date.today() + timedelta(days = 1)),
+        }
+
+    def _post(self, key):
+        """POST ``self.data`` to ``self.URI`` with the header ``key``."""
+        return self.client.post(
+            self.URI,
+            self.data,
+            HTTP_IDEMPOTENCY_KEY = key
+        )
+
+    def test_replay(self):
+        """POST twice with the same key. The lend is created once."""
+        num_lends = models.Lend.objects.count()
+        first = self._post('abc')
+        second = self._post('abc')
+        self.assertEqual(models.Lend.objects.count(), num_lends + 1)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_form_field(self):
+        """POST twice with the same key in a form field."""
+        num_lends = models.Lend.objects.count()
+        self.data[idempotency.FIELD] = 'abc'
+        for _ in range(2):
+            response = self.client.post(self.URI, self.data)
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(models.Lend.objects.count(), num_lends + 1)
+
+    def test_different_keys(self):
+        """POST twice with different keys. The second POST is a clash."""
+        self.assertEqual(self._post('abc').status_code, 302)
+        self.assertEqual(self._post('def').status_code, 422)
+
+    def test_no_key(self):
+        """POST twice without a key. The second POST is a clash."""
+        for status in (302, 422):
+            response = self.client.post(self.URI, self.data)
+            self.assertEqual(response.status_code, status)
+
+    def test_invalid_form(self):
+        """POST an invalid form twice with the same key.
+
+        The second response should be the first one, even though the form would
+        now be valid.
+
+        """
+        del self.data['item_id']
+        first = self._post('abc')
+        self.data['item_id'] = factories.ItemFactory.create().id
+        second = self._post('abc')
+        self.assertEqual(first.status_code, 422)
+        self.assertEqual(second.status_code, 422)
+        self.assertEqual(second.content, first.content)
+        self.assertFalse(models.Lend.objects.filter(user_id = self.user))
+
+    def test_in_progress(self):
+        """POST a key which an unfinished request has claimed."""
+        models.IdempotencyKey.objects.create(
+            digest = idempotency._digest(self.user.id, self.URI, 'abc')
+        )
+        self.assertEqual(self._post('abc').status_code, 409)
+        self.assertFalse(models.Lend.objects.filter(user_id = self.user))
+
+    def test_stale_claim(self):
+        """POST a key which was claimed by a request that never finished."""
+        models.IdempotencyKey.objects.create(
+            digest = idempotency._digest(self.user.id, self.URI, 'abc')
+        )
+        models.IdempotencyKey.objects.update(
+            created = timezone.now() - timedelta(minutes = 2)
+        )
+        self.assertEqual(self._post('abc').status_code, 302)
+        self.assertEqual(self._post('abc').status_code, 302)
+        self.assertEqual(
+            models.Lend.objects.filter(user_id = self.user).count(),
+            1
+        )
+
+    def test_expired(self):
+        """POST twice with the same key, which expires in between."""
+        self._post('abc')
+        models.IdempotencyKey.objects.update(
+            created = timezone.now() - timedelta(days = 2)
+        )
+        self.assertEqual(self._post('abc').status_code, 422)
+
+    def test_purge(self):
+        """Check that ``purge`` deletes expired keys, and only those."""
+        self._post('abc')
+        self._post('def')
+        models.IdempotencyKey.objects.filter(
+            digest = idempotency._digest(self.user.id, self.URI, 'abc')
+        ).update(created = timezone.now() - timedelta(days = 2))
+        idempotency.purge()
+        self.assertEqual(
+            list(models.IdempotencyKey.objects.values_list(
+                'digest',
+                flat = True
+            )),
+            [idempotency._digest(self.user.id, self.URI, 'def')]
+        )
@@ -0,0 +1,125 @@
+"""Unit tests for the ``jobs`` module."""
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from elts import jobs, models
+
+# pylint: disable=E1101
+# Class 'Job' has no 'objects' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+# The arguments that ``_record`` has been called with.
+_CALLS = []
+
+@jobs.task
+def _record(**arguments):
+    """Remember ``arguments``, then fail if told to."""
+    _CALLS.append(arguments)
+    if arguments.get('fail'):
+        raise ValueError('Told to fail.')
+
+class WorkTestCase(TestCase):
+    """Tests for ``jobs.work``."""
+    def setUp(self):
+        """Forget earlier calls to ``_record``."""
+        del _CALLS[:]
+
+    def _reload(self, job):
+        """Return a fresh copy of ``job``."""
+        return models.Job.objects.get(id = job.id)
+
+    def test_success(self):
+        """Check that a due job is run once, with its arguments."""
+        job = jobs.enqueue('_record', number = 1)
+        jobs.work(once = True)
+        self.assertEqual(_CALLS, [{'number': 1}])
+        self.assertEqual(self._reload(job).status, models.Job.DONE)
+
+    def test_not_due(self):
+        """Check that a job is not run before its time."""
+        job = jobs.enqueue(
+            '_record',
+            run_at = timezone.now() + timedelta(hours = 1)
+        )
+        jobs.work(once = True)
+        self.assertEqual(_CALLS, [])
+        self.assertEqual(self._reload(job).status, models.Job.WAITING)
+
+    def test_retry(self):
+        """Check that a failed job is tried again later, then given up on."""
+        job = jobs.enqueue('_record', fail = True)
+        job.max_attempts = 2
+        job.save()
+        jobs.work(once = True)
+        job = self._reload(job)
+        self.assertEqual(job.status, models.Job.WAITING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Told to fail.', job.error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        models.Job.objects.filter(id = job.id).update(run_at = timezone.now())
+        jobs.work(once = True)
+        self.assertEqual(self._reload(job).status, models.Job.FAILED)
+        self.assertEqual(len(_CALLS), 2)
+
+    def test_recurring(self):
+        """Check that a recurring job is run, then scheduled again."""
+        jobs.schedule('_record', 60)
+        jobs.schedule('_record', 120)
+        jobs.work(once = True)
+        job, = models.Job.objects.all()
+        self.assertEqual(len(_CALLS), 1)
+        self.assertEqual(job.status, models.Job.WAITING)
+        self.assertEqual(job.interval, 120)
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_schedule_twice(self):
+        """Check that a task is not given a second recurring job, even if its
+        first one is created behind ``schedule``'s back."""
+        models.Job.objects.create(
+            task = '_record',
+            recurring = '_record',
+            run_at = timezone.now(),
+            interval = 60,
+        )
+        jobs.schedule('_record', 120)
+        job, = models.Job.objects.all()
+        self.assertEqual(job.interval, 120)
+
+    def test_timeout(self):
+        """Check that a job whose worker died is retried, then given up on.
+
+        Whatever the first worker records afterwards is thrown away.
+
+        """
+        job = jobs.enqueue('_record')
+        job.max_attempts = 2
+        job.save()
+        old = timezone.now() - timedelta(days = 1)
+        for attempts in (1, 2):
+            models.Job.objects.filter(id = job.id).update(run_at = old)
+            claimed = jobs.claim('dead')
+            self.assertEqual(claimed.id, job.id)
+            models.Job.objects.filter(id = job.id).update(started = old)
+            self.assertIsNone(jobs.claim('alive'))
+            self.assertEqual(self._reload(job).attempts, attempts)
+        job = self._reload(job)
+        self.assertEqual(job.status, models.Job.FAILED)
+        self.assertIn('dead', job.error)
+        jobs.run(claimed)
+        self.assertEqual(self._reload(job).status, models.Job.FAILED)
+
+    def test_claimed(self):
+        """Check that a job claimed by one worker is not run by another."""
+        job = jobs.enqueue('_record')
+        self.assertEqual(jobs.claim('first').id, job.id)
+        self.assertIsNone(jobs.claim('second'))
+
+    def test_unknown_task(self):
+        """Check that a job for a task that does not exist fails."""
+        job = jobs.enqueue('no_such_task')
+        jobs.work(once = True)
+        self.assertIn('no_such_task', self._reload(job).error)
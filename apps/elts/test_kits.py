@@ -0,0 +1,85 @@
+"""Unit tests for the ``kits`` module."""
+from datetime import date
+from django.test import TestCase
+from elts import factories, kits, models
+
+# pylint: disable=E1101
+# Class 'ItemFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class ConflictsTestCase(TestCase):
+    """Tests for ``kits.conflicts``."""
+    def setUp(self):
+        """Create a kit of two items, and reserve the first of them.
+
+        The reservation lasts from 2014-01-10 to 2014-01-12, and is accessible
+        as ``self.lend``.
+
+        """
+        self.kit = factories.KitFactory.create()
+        self.item_ids = kits.item_ids(self.kit)
+        self.lend = factories.FutureLendFactory.create(
+            item_id_id = self.item_ids[0],
+            due_out = date(2014, 1, 10),
+            due_back = date(2014, 1, 12),
+        )
+
+    def test_clash(self):
+        """Find a reservation which overlaps the new ones."""
+        for due_out, due_back in (
+            (date(2014, 1, 12), date(2014, 1, 14)),
+            (date(2014, 1, 8), date(2014, 1, 10)),
+            (date(2014, 1, 1), None),
+        ):
+            self.assertEqual(
+                kits.conflicts(self.item_ids, due_out, due_back),
+                [self.lend]
+            )
+
+    def test_no_clash(self):
+        """Find nothing before or after the reservation."""
+        for due_out, due_back in (
+            (date(2014, 1, 13), date(2014, 1, 14)),
+            (date(2014, 1, 8), date(2014, 1, 9)),
+            (date(2014, 1, 13), None),
+        ):
+            self.assertEqual(
+                kits.conflicts(self.item_ids, due_out, due_back),
+                []
+            )
+
+    def test_other_items(self):
+        """Ignore the reservations of items which are not in the kit."""
+        self.assertEqual(
+            kits.conflicts(self.item_ids[1:], date(2014, 1, 10)),
+            []
+        )
+
+class ReserveTestCase(TestCase):
+    """Tests for ``kits.reserve``."""
+    def setUp(self):
+        """Create a kit of two items, and a user."""
+        self.kit = factories.KitFactory.create()
+        self.user = factories.UserFactory.create()
+
+    def test_reserve(self):
+        """Reserve every item in the kit."""
+        kit_lend = kits.reserve(
+            self.kit,
+            self.user,
+            date(2014, 1, 10),
+            date(2014, 1, 12)
+        )
+        lends = models.Lend.objects.filter(kit_lend_id = kit_lend)
+        self.assertEqual(
+            sorted(lend.item_id.id for lend in lends),
+            kits.item_ids(self.kit)
+        )
+        for lend in lends:
+            self.assertEqual(lend.user_id, self.user)
+            self.assertEqual(lend.due_out, date(2014, 1, 10))
+            self.assertEqual(lend.due_back, date(2014, 1, 12))
+        self.assertEqual(models.Lend.objects.count(), 2)
@@ -0,0 +1,184 @@
+"""Unit tests for the ``lending`` module."""
+from datetime import date, timedelta
+from django.test import TestCase
+from django.utils import timezone
+from elts import factories, lending, models
+
+# pylint: disable=E1101
+# Class 'ItemFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class CheckOutTestCase(TestCase):
+    """Tests for ``lending.check_out``."""
+    def setUp(self):
+        """Reserve an item for today, as ``self.lend``."""
+        self.now = timezone.now()
+        self.today = timezone.localtime(self.now).date()
+        self.item = factories.ItemFactory.create()
+        self.lend = factories.FutureLendFactory.create(
+            item_id = self.item,
+            due_out = self.today,
+            due_back = self.today + timedelta(days = 2),
+        )
+
+    def test_check_out(self):
+        """Check out the item."""
+        lend = lending.check_out(self.item, self.now)
+        self.assertEqual(lend.id, self.lend.id)
+        lend = models.Lend.objects.get(id = self.lend.id)
+        self.assertEqual(lend.out, self.now)
+        self.assertEqual(lend.version, self.lend.version + 1)
+
+    def test_user(self):
+        """Check out the item for someone who has not reserved it."""
+        user = factories.UserFactory.create()
+        self.assertRaises(
+            LookupError,
+            lending.check_out,
+            self.item,
+            self.now,
+            user.id
+        )
+        lending.check_out(self.item, self.now, self.lend.user_id.id)
+
+    def test_not_reserved(self):
+        """Check out an item which is only reserved for later."""
+        self.lend.due_out = self.today + timedelta(days = 1)
+        self.lend.save()
+        self.assertRaises(LookupError, lending.check_out, self.item, self.now)
+
+    def test_overdue_reservation(self):
+        """Check out an item whose reservation has passed."""
+        self.lend.due_out = self.today - timedelta(days = 3)
+        self.lend.due_back = self.today - timedelta(days = 1)
+        self.lend.save()
+        self.assertRaises(LookupError, lending.check_out, self.item, self.now)
+
+    def test_already_out(self):
+        """Check out an item which someone else has not yet brought back."""
+        factories.PastLendFactory.create(
+            item_id = self.item,
+            out = self.now - timedelta(days = 1),
+        )
+        self.assertRaises(
+            lending.Unavailable,
+            lending.check_out,
+            self.item,
+            self.now
+        )
+        lend = models.Lend.objects.get(id = self.lend.id)
+        self.assertIsNone(lend.out)
+
+    def test_quota(self):
+        """Check out the item to someone with as many items out as they may
+        have."""
+        models.LendQuota.objects.create(user = self.lend.user_id, limit = 1)
+        factories.PastLendFactory.create(
+            user_id = self.lend.user_id,
+            out = self.now - timedelta(days = 1),
+        )
+        self.assertRaises(
+            lending.Unavailable,
+            lending.check_out,
+            self.item,
+            self.now
+        )
+
+    def test_twice(self):
+        """Check out the item twice. Nothing is left to check out."""
+        lending.check_out(self.item, self.now)
+        self.assertRaises(LookupError, lending.check_out, self.item, self.now)
+
+class CheckInTestCase(TestCase):
+    """Tests for ``lending.check_in``."""
+    def setUp(self):
+        """Lend out an item, as ``self.lend``."""
+        self.now = timezone.now()
+        self.item = factories.ItemFactory.create()
+        self.lend = factories.PastLendFactory.create(
+            item_id = self.item,
+            due_out = date.today() - timedelta(days = 1),
+            out = self.now - timedelta(days = 1),
+        )
+
+    def test_check_in(self):
+        """Check in the item."""
+        lend = lending.check_in(self.item, self.now)
+        self.assertEqual(lend.id, self.lend.id)
+        lend = models.Lend.objects.get(id = self.lend.id)
+        self.assertEqual(lend.back, self.now)
+        self.assertEqual(lend.version, self.lend.version + 1)
+
+    def test_twice(self):
+        """Check in the item twice. It is not out the second time."""
+        lending.check_in(self.item, self.now)
+        self.assertRaises(LookupError, lending.check_in, self.item, self.now)
+
+    def test_check_out_again(self):
+        """Check in the item, then check out its next reservation."""
+        lending.check_in(self.item, self.now)
+        factories.FutureLendFactory.create(
+            item_id = self.item,
+            due_out = timezone.localtime(self.now).date(),
+        )
+        lending.check_out(self.item, self.now + timedelta(seconds = 1))
+
+class CheckInManyTestCase(TestCase):
+    """Tests for ``lending.check_in_many``."""
+    def setUp(self):
+        """Lend out two items, as ``self.lends``, and create an item which is
+        not out, as ``self.idle``."""
+        self.now = timezone.now()
+        self.lends = [
+            factories.PastLendFactory.create(
+                out = self.now - timedelta(days = 1)
+            )
+            for _ in range(2)
+        ]
+        self.idle = factories.ItemFactory.create()
+
+    def _backs(self):
+        """Return the ``back`` of each of ``self.lends``, as now saved."""
+        return [
+            models.Lend.objects.get(id = lend.id).back
+            for lend in self.lends
+        ]
+
+    def test_items(self):
+        """Check in both items, and one which is not out."""
+        item_ids = [lend.item_id.id for lend in self.lends]
+        results = lending.check_in_many(self.now, item_ids + [self.idle.id])
+        self.assertEqual(results, {
+            item_ids[0]: [self.lends[0].id],
+            item_ids[1]: [self.lends[1].id],
+            self.idle.id: [],
+        })
+        self.assertEqual(self._backs(), [self.now, self.now])
+
+    def test_lends(self):
+        """Check in one lend by its ID, and leave the other out."""
+        lend = self.lends[0]
+        self.assertEqual(
+            lending.check_in_many(self.now, lend_ids = [lend.id]),
+            {lend.item_id.id: [lend.id]}
+        )
+        self.assertEqual(self._backs(), [self.now, None])
+        self.assertEqual(
+            models.Lend.objects.get(id = lend.id).version,
+            lend.version + 1
+        )
+
+    def test_twice(self):
+        """Check in a lend twice. Nothing is checked in the second time."""
+        lending.check_in_many(self.now, lend_ids = [self.lends[0].id])
+        self.assertEqual(
+            lending.check_in_many(self.now, lend_ids = [self.lends[0].id]),
+            {}
+        )
+
+    def test_nothing(self):
+        """Check in nothing."""
+        self.assertEqual(lending.check_in_many(self.now), {})
@@ -0,0 +1,69 @@
+"""Unit tests for the ``notifications`` module."""
+from datetime import date, timedelta
+from django.core import mail
+from django.test import TestCase
+from elts import factories, models, notifications
+
+# pylint: disable=E1101
+# Class 'UserFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class SendTestCase(TestCase):
+    """Tests for ``notifications.send``.
+
+    Django's test runner replaces the email backend with one that collects
+    emails in ``django.core.mail.outbox``.
+
+    """
+    def setUp(self):
+        """Create a user with an email address."""
+        self.today = date(2014, 3, 10)
+        self.user = factories.UserFactory.create(email = 'borrower@example.com')
+
+    def _lend(self, days, **kwargs):
+        """Lend out an item due back ``days`` days after ``self.today``."""
+        kwargs.setdefault('user_id', self.user)
+        return factories.PastLendFactory.create(
+            due_out = self.today - timedelta(days = 30),
+            due_back = self.today + timedelta(days = days),
+            **kwargs
+        )
+
+    def test_digest(self):
+        """Check that a borrower gets one email about all of their lends."""
+        overdue = self._lend(-3)
+        due_soon = self._lend(1)
+        self._lend(10)
+        self._lend(-3, back = factories.lend_back())
+        self.assertEqual(notifications.send(self.today), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertEqual(mail.outbox[0].subject, 'Items are overdue')
+        self.assertIn(overdue.item_id.name, mail.outbox[0].body)
+        self.assertIn(due_soon.item_id.name, mail.outbox[0].body)
+        self.assertEqual(models.Notification.objects.count(), 2)
+
+    def test_rerun(self):
+        """Check that sending again does not repeat notifications."""
+        self._lend(-3)
+        notifications.send(self.today)
+        self.assertEqual(notifications.send(self.today), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_due_back_changed(self):
+        """Check that a borrower is told again after ``due_back`` changes."""
+        lend = self._lend(1)
+        notifications.send(self.today)
+        lend.due_back = self.today - timedelta(days = 1)
+        lend.save()
+        self.assertEqual(notifications.send(self.today), 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_no_email(self):
+        """Check that a borrower without an email address is skipped."""
+        self._lend(-3, user_id = factories.UserFactory.create(email = ''))
+        self.assertEqual(notifications.send(self.today), 0)
+        self.assertEqual(models.Notification.objects.count(), 0)
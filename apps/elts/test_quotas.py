@@ -0,0 +1,89 @@
+"""Unit tests for the ``quotas`` module."""
+from django.contrib.auth.models import Group
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from elts import factories, models, quotas
+
+# pylint: disable=E1101
+# Class 'LendQuota' has no 'objects' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class CountTestCase(TestCase):
+    """Tests for the ``ActiveLendCount`` rows kept by ``quotas``."""
+    def setUp(self):
+        """Create a user, and lend them an item as ``self.lend``."""
+        self.user = factories.UserFactory.create()
+        self.lend = factories.PastLendFactory.create(user_id = self.user)
+
+    def test_save(self):
+        """Check that lending and returning items changes the count."""
+        self.assertEqual(quotas.active(self.user.id), 1)
+        factories.PastLendFactory.create(user_id = self.user)
+        self.assertEqual(quotas.active(self.user.id), 2)
+        self.lend.back = timezone.now()
+        self.lend.save()
+        self.assertEqual(quotas.active(self.user.id), 1)
+
+    def test_change_user(self):
+        """Check that giving a lend to another user changes both counts."""
+        other = factories.UserFactory.create()
+        self.lend.user_id = other
+        self.lend.save()
+        self.assertEqual(quotas.active(self.user.id), 0)
+        self.assertEqual(quotas.active(other.id), 1)
+
+    def test_delete(self):
+        """Check that deleting a lend changes the count."""
+        self.lend.delete()
+        self.assertEqual(quotas.active(self.user.id), 0)
+
+    def test_refresh(self):
+        """Check that a count changed behind ``quotas``' back is corrected."""
+        models.ActiveLendCount.objects.all().delete()
+        self.assertEqual(quotas.active(self.user.id), 0)
+        quotas.refresh_counts()
+        self.assertEqual(quotas.active(self.user.id), 1)
+
+class LimitTestCase(TestCase):
+    """Tests for ``quotas.limit`` and ``quotas.full``."""
+    def setUp(self):
+        """Create a user who belongs to two groups."""
+        self.user = factories.UserFactory.create()
+        self.groups = [
+            Group.objects.create(name = name) for name in ('a', 'b')
+        ]
+        self.user.groups.add(*self.groups)
+
+    def test_none(self):
+        """A user with no quota may have any number of items out."""
+        self.assertIsNone(quotas.limit(self.user.id))
+        factories.PastLendFactory.create(user_id = self.user)
+        self.assertIsNone(quotas.full(self.user.id))
+
+    def test_default(self):
+        """The ``ELTS_LEND_QUOTA`` setting applies to everyone else."""
+        with override_settings(ELTS_LEND_QUOTA = 4):
+            self.assertEqual(quotas.limit(self.user.id), 4)
+
+    def test_groups(self):
+        """The largest quota of the user's groups applies."""
+        for group, limit in zip(self.groups, (1, 3)):
+            models.LendQuota.objects.create(group = group, limit = limit)
+        models.LendQuota.objects.create(
+            group = Group.objects.create(name = 'c'),
+            limit = 5
+        )
+        self.assertEqual(quotas.limit(self.user.id), 3)
+
+    def test_user(self):
+        """The user's own quota overrides their groups' quotas."""
+        models.LendQuota.objects.create(group = self.groups[0], limit = 3)
+        models.LendQuota.objects.create(user = self.user, limit = 1)
+        self.assertEqual(quotas.limit(self.user.id), 1)
+        self.assertIsNone(quotas.full(self.user.id))
+        factories.PastLendFactory.create(user_id = self.user)
+        self.assertEqual(quotas.full(self.user.id), 1)
@@ -0,0 +1,77 @@
+"""Unit tests for the ``recurrence`` module."""
+from datetime import date
+from django.test import TestCase
+from elts import caching, factories, recurrence, signals
+import numpy as np
+
+# pylint: disable=E1101
+# Class 'ItemFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+def _ordinals(*days):
+    """Return ``days``, which are ``datetime.date`` objects, as ordinals."""
+    return np.array([day.toordinal() for day in days], dtype = np.int64)
+
+class ConflictsTestCase(TestCase):
+    """Tests for ``recurrence.conflicts``."""
+    def setUp(self):
+        """Create an item."""
+        self.item = factories.ItemFactory.create()
+
+    def test_conflicts(self):
+        """Check that each occurrence is matched with the lends it clashes
+        with."""
+        short = factories.FutureLendFactory.create(
+            item_id = self.item,
+            due_out = date(2014, 1, 21),
+            due_back = date(2014, 1, 22),
+        )
+        endless = factories.FutureLendFactory.create(
+            item_id = self.item,
+            due_out = date(2014, 2, 4),
+            due_back = None,
+        )
+        factories.FutureLendFactory.create(
+            due_out = date(2014, 1, 14),
+            due_back = date(2014, 1, 14),
+        )
+        starts = _ordinals(
+            date(2014, 1, 14),
+            date(2014, 1, 21),
+            date(2014, 1, 28),
+            date(2014, 2, 4),
+            date(2014, 2, 11),
+        )
+        clashes = recurrence.conflicts(self.item, starts, starts)
+        self.assertEqual(
+            [[lend.id for lend in lends] for lends in clashes],
+            [[], [short.id], [], [endless.id], [endless.id]]
+        )
+
+class CreateTestCase(TestCase):
+    """Tests for ``recurrence.create``."""
+    def test_create(self):
+        """Check that lends are created, and that cached data is invalidated.
+        """
+        item = factories.ItemFactory.create()
+        user = factories.UserFactory.create()
+        version = caching.get_version(signals.LENDS_VERSION)
+        starts = _ordinals(date(2014, 1, 14), date(2014, 1, 21))
+        recurrence.create(item, user, starts, starts + 1)
+        self.assertEqual(
+            list(item.lend_set.order_by('due_out').values_list(
+                'due_out',
+                'due_back'
+            )),
+            [
+                (date(2014, 1, 14), date(2014, 1, 15)),
+                (date(2014, 1, 21), date(2014, 1, 22)),
+            ]
+        )
+        self.assertNotEqual(
+            caching.get_version(signals.LENDS_VERSION),
+            version
+        )
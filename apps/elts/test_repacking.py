@@ -0,0 +1,113 @@
+"""Unit tests for the ``repacking`` module and ``repack`` command."""
+from datetime import date, datetime
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.six import StringIO
+from elts import caching, factories, models, repacking, signals
+
+# pylint: disable=E1101
+# Class 'ItemFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class RepackTestCase(TestCase):
+    """Tests for ``repacking.repack``."""
+    def setUp(self):
+        """Create two items with a tag, and scatter reservations across them.
+
+        The first item is reserved on days 1 and 2 of January 2014, and the
+        second on days 3 and 4. Moving either reservation leaves one item free
+        for the whole month.
+
+        """
+        self.today = date(2014, 1, 1)
+        self.tag = factories.TagFactory.create()
+        self.items = []
+        for _ in range(2):
+            item = factories.ItemFactory.create(is_lendable = True)
+            item.tags.add(self.tag)
+            self.items.append(item)
+        self.early = factories.FutureLendFactory.create(
+            item_id = self.items[0],
+            due_out = date(2014, 1, 1),
+            due_back = date(2014, 1, 2),
+        )
+        self.late = factories.FutureLendFactory.create(
+            item_id = self.items[1],
+            due_out = date(2014, 1, 3),
+            due_back = date(2014, 1, 4),
+        )
+
+    def _item_ids(self):
+        """Return the IDs of the items now reserved by each lend."""
+        return [
+            models.Lend.objects.get(id = lend.id).item_id_id
+            for lend in (self.early, self.late)
+        ]
+
+    def test_dry_run(self):
+        """Check that a move is planned, but not made."""
+        changes, before, after = repacking.repack(self.tag, self.today)
+        self.assertEqual(len(changes), 1)
+        self.assertGreater(after, before)
+        self.assertEqual(
+            self._item_ids(),
+            [self.items[0].id, self.items[1].id]
+        )
+        self.assertFalse(models.Repack.objects.exists())
+
+    def test_apply(self):
+        """Check that both reservations end up on one item, that the move is
+        recorded, and that cached data is invalidated."""
+        version = caching.get_version(signals.LENDS_VERSION)
+        changes, _, _ = repacking.repack(self.tag, self.today, apply = True)
+        item_ids = self._item_ids()
+        self.assertEqual(item_ids[0], item_ids[1])
+        report = models.Repack.objects.get()
+        self.assertEqual(report.changes.count(), len(changes))
+        self.assertNotEqual(
+            caching.get_version(signals.LENDS_VERSION),
+            version
+        )
+
+    def test_started(self):
+        """Check that a reservation which has started is not moved."""
+        self.early.out = timezone.make_aware(
+            datetime(2014, 1, 1, 9),
+            timezone.utc
+        )
+        self.early.save()
+        repacking.repack(self.tag, self.today, apply = True)
+        self.assertEqual(self._item_ids()[0], self.items[0].id)
+
+    def test_waitlist(self):
+        """Check that someone waiting for the days a reservation leaves is
+        given them."""
+        for lend in (self.early, self.late):
+            lend.due_out = lend.due_out.replace(year = 2100)
+            lend.due_back = lend.due_back.replace(year = 2100)
+            lend.save()
+            models.WaitlistEntry.objects.create(
+                item_id = lend.item_id,
+                user_id = factories.UserFactory.create(),
+                due_out = lend.due_out,
+                due_back = lend.due_back,
+            )
+        changes, _, _ = repacking.repack(
+            self.tag,
+            date(2100, 1, 1),
+            apply = True
+        )
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(models.WaitlistEntry.objects.count(), 1)
+        self.assertEqual(models.Lend.objects.count(), 3)
+
+    def test_command(self):
+        """Run the ``repack`` command in dry-run mode."""
+        output = StringIO()
+        call_command('repack', str(self.tag.id), stdout = output)
+        self.assertIn('Would move 1 reservations', output.getvalue())
+        self.assertFalse(models.Repack.objects.exists())
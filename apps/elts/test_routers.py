@@ -0,0 +1,85 @@
+"""Unit tests for the ``routers`` and ``middleware`` modules."""
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from elts import middleware, models, routers
+
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+@override_settings(ELTS_READ_REPLICAS = ['replica'])
+class ReplicaRouterTestCase(TestCase):
+    """Tests for ``ReplicaRouter``."""
+    def setUp(self):
+        """Create a router."""
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        """Forbid replica reads, as is the default."""
+        routers.use_replicas(False)
+
+    def test_read_replica(self):
+        """Check that reads go to a replica if replicas are allowed."""
+        routers.use_replicas(True)
+        self.assertEqual(self.router.db_for_read(models.Item), 'replica')
+
+    def test_read_default(self):
+        """Check that reads go to ``default`` if replicas are forbidden."""
+        routers.use_replicas(False)
+        self.assertEqual(self.router.db_for_read(models.Item), 'default')
+
+    def test_read_sessions_and_users(self):
+        """Check that sessions and users are always read from ``default``."""
+        routers.use_replicas(True)
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_write(self):
+        """Check that writes go to ``default``."""
+        routers.use_replicas(True)
+        self.assertEqual(self.router.db_for_write(models.Item), 'default')
+
+    @override_settings(ELTS_READ_REPLICAS = [])
+    def test_no_replicas(self):
+        """Check that reads go to ``default`` if there are no replicas."""
+        routers.use_replicas(True)
+        self.assertEqual(self.router.db_for_read(models.Item), 'default')
+
+class ReplicaMiddlewareTestCase(TestCase):
+    """Tests for ``ReplicaMiddleware``."""
+    def setUp(self):
+        """Create a middleware object and a request factory."""
+        self.middleware = middleware.ReplicaMiddleware()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        """Forbid replica reads, as is the default."""
+        routers.use_replicas(False)
+
+    def test_get(self):
+        """Check that a GET request may read from a replica."""
+        self.middleware.process_request(self.factory.get('/'))
+        self.assertTrue(routers.replicas_allowed())
+
+    def test_post(self):
+        """Check that a POST request reads from ``default``.
+
+        The response must pin the client to ``default``.
+
+        """
+        request = self.factory.post('/')
+        self.middleware.process_request(request)
+        self.assertFalse(routers.replicas_allowed())
+        response = self.middleware.process_response(request, HttpResponse())
+        self.assertIn(middleware.PRIMARY_COOKIE, response.cookies)
+
+    def test_pinned_get(self):
+        """Check that a GET request from a pinned client reads ``default``."""
+        request = self.factory.get('/')
+        request.COOKIES[middleware.PRIMARY_COOKIE] = '1'
+        self.middleware.process_request(request)
+        self.assertFalse(routers.replicas_allowed())
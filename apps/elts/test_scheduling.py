@@ -0,0 +1,59 @@
+"""Unit tests for the ``scheduling`` module."""
+from datetime import date
+from django.test import TestCase
+from elts import factories, scheduling
+
+# pylint: disable=E1101
+# Class 'ItemFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class AllocateTestCase(TestCase):
+    """Tests for ``scheduling.allocate``."""
+    def setUp(self):
+        """Create a tag and three lendable items with it."""
+        self.tag = factories.TagFactory.create()
+        self.items = []
+        for _ in range(3):
+            item = factories.ItemFactory.create(is_lendable = True)
+            item.tags.add(self.tag)
+            self.items.append(item)
+
+    def _reserve(self, item, due_out, due_back):
+        """Reserve ``item`` from ``due_out`` to ``due_back``."""
+        factories.FutureLendFactory.create(
+            item_id = item,
+            due_out = due_out,
+            due_back = due_back,
+        )
+
+    def test_best_fit(self):
+        """Check that the item with the shortest gap around the reservation
+        is chosen."""
+        self._reserve(self.items[0], date(2014, 1, 1), date(2014, 1, 10))
+        self._reserve(self.items[1], date(2014, 1, 1), date(2014, 1, 13))
+        self._reserve(self.items[1], date(2014, 1, 17), date(2014, 1, 20))
+        self._reserve(self.items[2], date(2014, 1, 14), date(2014, 1, 14))
+        item = scheduling.allocate(
+            [self.tag],
+            date(2014, 1, 15),
+            date(2014, 1, 16)
+        )
+        self.assertEqual(item, self.items[1])
+
+    def test_busy(self):
+        """Check that ``None`` is returned if every item is taken."""
+        for item in self.items:
+            self._reserve(item, date(2014, 1, 1), None)
+        self.assertIsNone(
+            scheduling.allocate([self.tag], date(2014, 2, 1), date(2014, 2, 2))
+        )
+
+    def test_not_lendable(self):
+        """Check that items which may not be lent are never chosen."""
+        for item in self.items:
+            item.is_lendable = False
+            item.save()
+        self.assertIsNone(scheduling.allocate([self.tag], date(2014, 2, 1)))
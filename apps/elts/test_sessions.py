@@ -0,0 +1,48 @@
+"""Unit tests for the ``sessions`` module."""
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import TestCase
+from elts.sessions import SessionStore
+
+# pylint: disable=E1101
+# Class 'Session' has no 'objects' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class SessionStoreTestCase(TestCase):
+    """Tests for ``SessionStore``."""
+    def setUp(self):
+        """Create and save a session, and clear the cache."""
+        cache.clear()
+        session = SessionStore()
+        session['foo'] = 'bar'
+        session.save()
+        self.session_key = session.session_key
+
+    def test_cached_load(self):
+        """Check that a cached session is read without the database."""
+        SessionStore(self.session_key).load()
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(self.session_key)['foo'], 'bar')
+
+    def test_unchanged_save(self):
+        """Check that saving an unchanged session does not write to it."""
+        session = SessionStore(self.session_key)
+        session['foo'] = 'bar'
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_changed_save(self):
+        """Check that saving a changed session writes it to the database."""
+        session = SessionStore(self.session_key)
+        session['foo'] = 'baz'
+        session.save()
+        cache.clear()
+        self.assertEqual(
+            Session.objects.get(
+                session_key = self.session_key
+            ).get_decoded()['foo'],
+            'baz'
+        )
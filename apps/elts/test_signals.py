@@ -0,0 +1,46 @@
+"""Unit tests for the ``signals`` module."""
+from django.test import TestCase
+from elts import caching, factories, signals
+
+# pylint: disable=E1101
+# Class 'CategoryFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class SidebarVersionTestCase(TestCase):
+    """Tests for the receivers which invalidate cached sidebars."""
+    def setUp(self):
+        """Create a category with one tag, and an item with that tag."""
+        self.tag = factories.TagFactory.create()
+        self.category = factories.CategoryFactory.create(tags = [self.tag])
+        self.item = factories.ItemFactory.create()
+        self.item.tags.add(self.tag)
+        self.version = self._version()
+
+    def _version(self):
+        """Return the version of the sidebar of ``self.category``'s user."""
+        return caching.get_version(
+            signals.sidebar_version_name(self.category.user_id)
+        )
+
+    def test_lend(self):
+        """Check that lending out an item in the category bumps the version."""
+        factories.PastLendFactory.create(item_id = self.item)
+        self.assertNotEqual(self._version(), self.version)
+
+    def test_unrelated_lend(self):
+        """Check that lending out an unrelated item leaves the version."""
+        factories.PastLendFactory.create()
+        self.assertEqual(self._version(), self.version)
+
+    def test_item_tags(self):
+        """Check that untagging an item in the category bumps the version."""
+        self.item.tags.remove(self.tag)
+        self.assertNotEqual(self._version(), self.version)
+
+    def test_tag_delete(self):
+        """Check that deleting a tag used by the category bumps the version."""
+        self.tag.delete()
+        self.assertNotEqual(self._version(), self.version)
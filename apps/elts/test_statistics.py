@@ -0,0 +1,84 @@
+"""Unit tests for the ``statistics`` module."""
+from datetime import date, timedelta
+from django.test import TestCase
+from elts import analytics, factories, models, statistics
+
+# pylint: disable=E1101
+# Class 'LatenessSummary' has no 'objects' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+def _lend(user, item, days_late):
+    """Lend ``item`` to ``user``, and have it come back ``days_late`` days
+    late."""
+    due_back = date(2013, 6, 10)
+    return factories.PastLendFactory.create(
+        user_id = user,
+        item_id = item,
+        due_out = date(2013, 6, 1),
+        due_back = due_back,
+        out = analytics.to_datetime(analytics.to_time(date(2013, 6, 1))),
+        back = analytics.to_datetime(
+            analytics.to_time(due_back + timedelta(days = days_late)) + 60
+        ),
+    )
+
+class SummaryTestCase(TestCase):
+    """Tests for the ``LatenessSummary`` rows kept by ``statistics``."""
+    def setUp(self):
+        """Create a user and an item."""
+        self.user = factories.UserFactory.create()
+        self.item = factories.ItemFactory.create()
+
+    def _summary(self, user):
+        """Return ``user``'s summary."""
+        return models.LatenessSummary.objects.get(user = user)
+
+    def test_save(self):
+        """Check that saving a lend refreshes its user's summary."""
+        _lend(self.user, self.item, 2)
+        _lend(self.user, self.item, -1)
+        summary = self._summary(self.user)
+        self.assertEqual(summary.pickups, 2)
+        self.assertEqual(summary.late_pickups, 0)
+        self.assertEqual(summary.returns, 2)
+        self.assertEqual(summary.late_returns, 1)
+        self.assertEqual(summary.on_time_score(), 75.0)
+
+    def test_change_user(self):
+        """Check that giving a lend to another user refreshes both users."""
+        lend = _lend(self.user, self.item, 2)
+        other = factories.UserFactory.create()
+        lend.user_id = other
+        lend.save()
+        self.assertEqual(self._summary(self.user).returns, 0)
+        self.assertEqual(self._summary(other).late_returns, 1)
+
+    def test_delete(self):
+        """Check that deleting a lend refreshes its user's summary."""
+        _lend(self.user, self.item, 2).delete()
+        self.assertEqual(self._summary(self.user).returns, 0)
+
+    def test_score(self):
+        """Check the score of a user with no summary."""
+        self.assertIsNone(statistics.on_time_score(self.user))
+
+class LatenessTestCase(TestCase):
+    """Tests for ``statistics.lateness``."""
+    def test_tag(self):
+        """Check that a tag's delays are those of its items."""
+        tag = factories.TagFactory.create()
+        user = factories.UserFactory.create()
+        for days_late in (1, 2, 4):
+            item = factories.ItemFactory.create()
+            item.tags.add(tag)
+            _lend(user, item, days_late)
+        _lend(user, factories.ItemFactory.create(), 5)
+
+        (obj, summary), = statistics.lateness('return', 'tag')
+        self.assertEqual(obj, tag)
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['late'], 3)
+        self.assertEqual(summary['percentiles'][1], 86400 + 60)
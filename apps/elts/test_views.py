@@ -9,11 +9,16 @@ requests which act like PUT or DELETE requests by virtue of passing the
 '_method' argument.
 
 """
-from datetime import date
+from datetime import date, timedelta
 from django.core.urlresolvers import reverse
-from django.test import TestCase
-from elts import factories, models
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.client import Client
+from django.utils import timezone
+from elts import factories, ical, kits, models, writes
+import json
 import string
+import threading
 
 # pylint: disable=E1103
 # Instance of 'WSGIRequest' has no 'status_code' member (but some types could
@@ -51,6 +56,22 @@ def _test_logout(instance, uri = None):
     )
     instance.assertRedirects(response, target)
 
+def _assert_invalid_form(instance, response, template):
+    """Assert that ``response`` shows the user an invalid form.
+
+    ``instance`` is an instance of a ``TestCase`` subclass. In other words, a
+    caller typically passes ``self`` to this method.
+
+    ``template`` is the name of the template which should have been rendered,
+    such as ``elts/item-create-form.html``. The response should have a 422
+    status code, and the submitted form data should not have been stored in
+    the session.
+
+    """
+    instance.assertEqual(response.status_code, 422)
+    instance.assertTemplateUsed(response, template)
+    instance.assertNotIn('form_data', instance.client.session)
+
 class IndexTestCase(TestCase):
     """Tests for the ``/`` URI.
 
@@ -77,6 +98,18 @@ class IndexTestCase(TestCase):
         response = self.client.get(self.URI)
         self.assertEqual(response.status_code, 200)
 
+    def test_get_current_events(self):
+        """GET ``self.URI`` and check which lends are listed."""
+        overdue = factories.PastLendFactory.create(
+            due_out = date.today() - timedelta(days = 2),
+            due_back = date.today() - timedelta(days = 1),
+        )
+        due_out = factories.FutureLendFactory.create(due_out = date.today())
+        response = self.client.get(self.URI)
+        self.assertEqual(response.context['overdue'], [overdue])
+        self.assertEqual(response.context['due_out'], [due_out])
+        self.assertIn(overdue, response.context['out'])
+
     def test_put(self):
         """PUT ``self.URI``."""
         response = self.client.post(self.URI, {'_method': 'PUT'})
@@ -110,9 +143,30 @@ class CalendarTestCase(TestCase):
         self.assertEqual(response.status_code, 405)
 
     def test_get(self):
-        """GET ``self.URI``."""
-        response = self.client.get(self.URI)
-        self.assertEqual(response.status_code, 200)
+        """GET ``self.URI`` with each kind of view."""
+        lend = factories.FutureLendFactory.create(
+            due_out = date(2014, 2, 12),
+            due_back = date(2014, 3, 3),
+        )
+        for view, days in (('month', 28), ('week', 7), ('range', 20)):
+            response = self.client.get(
+                self.URI,
+                {'view': view, 'start': '2014-02-12', 'end': '2014-03-03'}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['days']), days)
+            self.assertContains(
+                response,
+                reverse('elts.views.lend_id', args = [lend.id])
+            )
+
+    def test_get_too_long(self):
+        """GET ``self.URI`` for a range of more than a year."""
+        response = self.client.get(
+            self.URI,
+            {'view': 'range', 'start': '2014-01-01', 'end': '2016-01-01'}
+        )
+        self.assertEqual(response.status_code, 400)
 
     def test_put(self):
         """PUT ``self.URI``."""
@@ -124,14 +178,14 @@ class CalendarTestCase(TestCase):
         response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-class CategoryTestCase(TestCase):
-    """Tests for the ``category/`` URI.
+class CalendarEventsTestCase(TestCase):
+    """Tests for the ``calendar/events/`` URI.
 
-    The ``category/`` URI is available through the ``elts.views.category``
-    function.
+    The ``calendar/events/`` URI is available through the
+    ``elts.views.calendar_events`` function.
 
     """
-    URI = reverse('elts.views.category')
+    URI = reverse('elts.views.calendar_events')
 
     def setUp(self):
         """Authenticate the test client."""
@@ -143,24 +197,62 @@ class CategoryTestCase(TestCase):
 
     def test_post(self):
         """POST ``self.URI``."""
-        num_categories = models.Category.objects.count()
-        response = self.client.post(
+        response = self.client.post(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.URI``, and check which events are returned."""
+        lend = factories.FutureLendFactory.create(
+            due_out = date(2014, 2, 12),
+            due_back = date(2014, 3, 3),
+        )
+        response = self.client.get(
             self.URI,
-            factories.CategoryFactory.attributes()
+            {'start': '2014-02-01', 'end': '2014-02-28'}
         )
-        self.assertEqual(models.Category.objects.count(), num_categories + 1)
-        self.assertRedirects(
-            response,
-            reverse(
-                'elts.views.category_id',
-                args = [models.Category.objects.latest('id').id]
-            )
+        self.assertEqual(response.status_code, 200)
+        events = json.loads(response.content)['events']
+        self.assertEqual(
+            [(event['lend'], event['date'], event['kind']) for event in events],
+            [(lend.id, '2014-02-12', 'due_out')]
         )
 
-    def test_get(self):
-        """GET ``self.URI``."""
-        response = self.client.get(self.URI)
-        self.assertEqual(response.status_code, 405)
+        etag = response['ETag']
+        response = self.client.get(
+            self.URI,
+            {'start': '2014-02-01', 'end': '2014-02-28'},
+            HTTP_IF_NONE_MATCH = etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_kit(self):
+        """GET ``self.URI`` when a kit is reserved. It is one event."""
+        kit_lend = kits.reserve(
+            factories.KitFactory.create(),
+            factories.UserFactory.create(),
+            date(2014, 2, 12)
+        )
+        response = self.client.get(
+            self.URI,
+            {'start': '2014-02-01', 'end': '2014-02-28'}
+        )
+        events = json.loads(response.content)['events']
+        self.assertEqual(len(events), 1)
+        self.assertEqual(
+            events[0]['url'],
+            reverse('elts.views.kit_lend_id', args = [kit_lend.id])
+        )
+
+    def test_get_invalid(self):
+        """GET ``self.URI`` with missing, reversed or too long windows."""
+        for data in (
+            {},
+            {'start': '2014-02-01'},
+            {'start': '2014-02-28', 'end': '2014-02-01'},
+            {'start': '2014-01-01', 'end': '2016-01-01'},
+        ):
+            response = self.client.get(self.URI, data)
+            self.assertEqual(response.status_code, 400)
 
     def test_put(self):
         """PUT ``self.URI``."""
@@ -172,72 +264,157 @@ class CategoryTestCase(TestCase):
         response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-    def test_post_failure(self):
-        """POST ``self.URI``, incorrectly."""
-        response = self.client.post(
+class CalendarEventsRaceTestCase(TransactionTestCase):
+    """Tests for ``calendar/events/`` while lends are being saved."""
+    URI = reverse('elts.views.calendar_events')
+
+    def setUp(self):
+        """Skip this test if threads cannot share the test database.
+
+        Each thread has its own connection, and each connection to an
+        in-memory SQLite database sees a database of its own.
+
+        """
+        if (connection.vendor == 'sqlite'
+                and connection.settings_dict['NAME'] == ':memory:'):
+            self.skipTest('The test database is private to each thread.')
+
+    def _events(self, client):
+        """GET ``self.URI`` with ``client``, and return the IDs of the lends
+        listed."""
+        response = client.get(
             self.URI,
-            {'name': factories.invalid_category_name()}
-        )
-        self.assertRedirects(
-            response,
-            reverse('elts.views.category_create_form')
+            {'start': '2014-02-01', 'end': '2014-02-28'}
         )
+        return [event['lend'] for event in json.loads(response.content)[
+            'events'
+        ]]
 
-class CategoryCreateFormTestCase(TestCase):
-    """Tests for the ``category/create-form/`` URI.
+    def test_saved_during_render(self):
+        """Save a lend while another request renders the calendar from the
+        data committed so far. The lend is shown afterwards."""
+        _login(self.client)
+        other = Client()
+        _login(other)
+        item = factories.ItemFactory.create()
+        self.assertEqual(self._events(self.client), [])
+
+        seen = []
+        def render():
+            """Render the calendar in another request, then close this
+            thread's connection."""
+            try:
+                seen.extend(self._events(other))
+            finally:
+                connection.close()
+
+        with writes.items_locked([item.id]):
+            lend = factories.FutureLendFactory.create(
+                item_id = item,
+                due_out = date(2014, 2, 12),
+                due_back = date(2014, 3, 3),
+            )
+            thread = threading.Thread(target = render)
+            thread.start()
+            thread.join()
+        self.assertEqual(seen, [])
+        self.assertEqual(self._events(self.client), [lend.id])
 
-    The ``category/create-form/`` URI is available through the
-    ``elts.views.category_create_form`` function.
+class CalendarUserIdTestCase(TestCase):
+    """Tests for the ``calendar/user/<id>.ics`` URI.
+
+    The ``calendar/user/<id>.ics`` URI is available through the
+    ``elts.views.calendar_user_id`` function.
 
     """
-    URI = reverse('elts.views.category_create_form')
+    FUNCTION = 'elts.views.calendar_user_id'
 
     def setUp(self):
-        """Authenticate the test client."""
+        """Authenticate the test client, create a lend, and set ``self.uri``.
+
+        The lend created is accessible as ``self.lend``.
+
+        """
         _login(self.client)
+        self.lend = factories.FutureLendFactory.create(
+            due_out = date.today(),
+            due_back = date.today() + timedelta(days = 1),
+        )
+        self.uri = reverse(self.FUNCTION, args = [self.lend.user_id.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
-        _test_logout(self)
+        _test_logout(self, self.uri)
 
     def test_post(self):
-        """POST ``self.URI``."""
-        response = self.client.post(self.URI)
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 405)
 
     def test_get(self):
-        """GET ``self.URI``."""
-        response = self.client.get(self.URI)
+        """GET ``self.uri``, and check that the lend is in the feed."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        content = b''.join(response.streaming_content)
+        self.assertIn(b'UID:lend-{}@elts'.format(self.lend.id), content)
+
+    def test_conditional_get(self):
+        """GET ``self.uri`` again, with and without lends having changed."""
+        etag = self.client.get(self.uri)['ETag']
+        response = self.client.get(self.uri, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.lend.due_back += timedelta(days = 1)
+        self.lend.save()
+        response = self.client.get(self.uri, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_token(self):
+        """GET ``self.uri`` without a session, using a token instead."""
+        self.client.logout()
+        user = self.lend.user_id
+        response = self.client.get(
+            self.uri,
+            {'token': ical.make_token(user, 'user-{}'.format(user.id))}
+        )
         self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.uri, {'token': 'forged'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            self.uri,
+            {'token': ical.make_token(user, 'user-{}'.format(user.id + 1))}
+        )
+        self.assertEqual(response.status_code, 403)
 
     def test_put(self):
-        """PUT ``self.URI``."""
-        response = self.client.post(self.URI, {'_method': 'PUT'})
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
         self.assertEqual(response.status_code, 405)
 
     def test_delete(self):
-        """DELETE ``self.URI``."""
-        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-class CategoryIdTestCase(TestCase):
-    """Tests for the ``category/<id>/`` URI.
+class CalendarTagIdTestCase(TestCase):
+    """Tests for the ``calendar/tag/<id>.ics`` URI.
 
-    The ``category/<id>/`` URI is available through the
-    ``elts.views.category_id`` function.
+    The ``calendar/tag/<id>.ics`` URI is available through the
+    ``elts.views.calendar_tag_id`` function.
 
     """
-    FUNCTION = 'elts.views.category_id'
+    FUNCTION = 'elts.views.calendar_tag_id'
 
     def setUp(self):
-        """Authenticate the test client, create a category and set ``self.uri``.
+        """Authenticate the test client, create a tag, and set ``self.uri``.
 
-        The category created is accessible as ``self.category``.
+        The tag created is accessible as ``self.tag``.
 
         """
         _login(self.client)
-        self.category = factories.CategoryFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.category.id])
+        self.tag = factories.TagFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.tag.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
@@ -245,205 +422,285 @@ class CategoryIdTestCase(TestCase):
 
     def test_post(self):
         """POST ``self.uri``."""
-        response = self.client.post(self.uri, {})
+        response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 405)
 
     def test_get(self):
-        """GET ``self.uri``."""
+        """GET ``self.uri``, and check that only tagged items are listed."""
+        tagged = factories.FutureLendFactory.create(due_out = date.today())
+        tagged.item_id.tags.add(self.tag)
+        untagged = factories.FutureLendFactory.create(due_out = date.today())
         response = self.client.get(self.uri)
         self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertIn(b'UID:lend-{}@elts'.format(tagged.id), content)
+        self.assertNotIn(b'UID:lend-{}@elts'.format(untagged.id), content)
+
+    def test_token(self):
+        """GET ``self.uri`` without a session, using a token instead."""
+        user = factories.UserFactory.create()
+        token = ical.make_token(user, 'tag-{}'.format(self.tag.id))
+        self.client.logout()
+        response = self.client.get(self.uri, {'token': token})
+        self.assertEqual(response.status_code, 200)
+        ical.revoke_tokens(user)
+        response = self.client.get(self.uri, {'token': token})
+        self.assertEqual(response.status_code, 403)
 
     def test_put(self):
         """PUT ``self.uri``."""
-        data = factories.CategoryFactory.attributes()
-        data['_method'] = 'PUT'
-        response = self.client.post(self.uri, data)
-        self.assertRedirects(response, self.uri)
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
 
     def test_delete(self):
         """DELETE ``self.uri``."""
         response = self.client.post(self.uri, {'_method': 'DELETE'})
-        self.assertRedirects(response, reverse('elts.views.item'))
-
-    def test_post_bad_id(self):
-        """POST ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri, {})
-        self.assertEqual(response.status_code, 404)
-
-    def test_get_bad_id(self):
-        """GET ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.get(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_put_bad_id(self):
-        """PUT ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri, {'_method': 'PUT'})
-        self.assertEqual(response.status_code, 404)
-
-    def test_delete_bad_id(self):
-        """DELETE ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_put_failure(self):
-        """PUT ``self.uri``, incorrectly."""
-        response = self.client.post(
-            self.uri,
-            {'name': factories.invalid_category_name(), '_method': 'PUT'}
-        )
-        self.assertRedirects(
-            response,
-            reverse(
-                'elts.views.category_id_update_form',
-                args = [self.category.id]
-            )
-        )
+        self.assertEqual(response.status_code, 405)
 
-class CategoryIdDeleteFormTestCase(TestCase):
-    """Tests for the ``category/<id>/delete-form/`` URI.
+class UtilizationTestCase(TestCase):
+    """Tests for the ``utilization/`` URI.
 
-    The ``category/<id>/delete-form/`` URI is available through the
-    ``elts.views.category_id_delete_form`` function.
+    The ``utilization/`` URI is available through the
+    ``elts.views.utilization`` function.
 
     """
-    FUNCTION = 'elts.views.category_id_delete_form'
+    URI = reverse('elts.views.utilization')
 
     def setUp(self):
-        """Authenticate the test client, create a category and set ``self.uri``.
-
-        The category created is accessible as ``self.category``.
-
-        """
+        """Authenticate the test client."""
         _login(self.client)
-        self.category = factories.CategoryFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.category.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
-        _test_logout(self, self.uri)
+        _test_logout(self)
 
     def test_post(self):
-        """POST ``self.uri``."""
-        response = self.client.post(self.uri, {})
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
         self.assertEqual(response.status_code, 405)
 
     def test_get(self):
-        """GET ``self.uri``."""
-        response = self.client.get(self.uri)
+        """GET ``self.URI``."""
+        factories.PastLendFactory.create()
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['items']), 1)
+
+    def test_get_csv(self):
+        """GET ``self.URI`` as a CSV document."""
+        factories.PastLendFactory.create()
+        response = self.client.get(self.URI, {'format': 'csv'})
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(response.content.splitlines()), 2)
+
+    def test_get_failure(self):
+        """GET ``self.URI`` with a window that ends before it starts."""
+        response = self.client.get(
+            self.URI,
+            {'start': '2014-03-31', 'end': '2014-03-01'}
+        )
+        self.assertEqual(response.status_code, 400)
 
     def test_put(self):
-        """PUT ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'PUT'})
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
         self.assertEqual(response.status_code, 405)
 
     def test_delete(self):
-        """DELETE ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-    def test_post_bad_id(self):
-        """POST ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri, {})
-        self.assertEqual(response.status_code, 404)
-
-    def test_get_bad_id(self):
-        """GET ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.get(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_put_bad_id(self):
-        """PUT ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_delete_bad_id(self):
-        """DELETE ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-class CategoryIdUpdateFormTestCase(TestCase):
-    """Tests for the ``category/<id>/update-form/`` URI.
+class CapacityTestCase(TestCase):
+    """Tests for the ``capacity/`` URI.
 
-    The ``category/<id>/update-form/`` URI is available through the
-    ``elts.views.category_id_update_form`` function.
+    The ``capacity/`` URI is available through the ``elts.views.capacity``
+    function.
 
     """
-    FUNCTION = 'elts.views.category_id_update_form'
+    URI = reverse('elts.views.capacity')
 
     def setUp(self):
-        """Authenticate the test client, create a category and set ``self.uri``.
-
-        The category created is accessible as ``self.category``.
-
-        """
+        """Authenticate the test client, and reserve an item with a tag."""
         _login(self.client)
-        self.category = factories.CategoryFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.category.id])
+        self.tag = factories.TagFactory.create()
+        item = factories.ItemFactory.create()
+        item.tags.add(self.tag)
+        factories.FutureLendFactory.create(
+            item_id = item,
+            due_out = date.today(),
+            due_back = date.today(),
+        )
 
     def test_logout(self):
         """Call ``_test_logout()``."""
-        _test_logout(self, self.uri)
+        _test_logout(self)
 
     def test_post(self):
-        """POST ``self.uri``."""
-        response = self.client.post(self.uri, {})
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
         self.assertEqual(response.status_code, 405)
 
     def test_get(self):
-        """GET ``self.uri``."""
-        response = self.client.get(self.uri)
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI, {'tag': self.tag.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['tags'][0]['peak'], 1)
+        self.assertEqual(len(response.context['tags'][0]['timeline']), 2)
+
+    def test_get_json(self):
+        """GET ``self.URI`` as a JSON document."""
+        response = self.client.get(self.URI, {'format': 'json'})
         self.assertEqual(response.status_code, 200)
+        tags = json.loads(response.content)['tags']
+        self.assertEqual([tag['tag'] for tag in tags], [self.tag.id])
+        self.assertEqual(tags[0]['peak'], 1)
 
     def test_put(self):
-        """PUT ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'PUT'})
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
         self.assertEqual(response.status_code, 405)
 
     def test_delete(self):
-        """DELETE ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-    def test_post_bad_id(self):
-        """POST ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri, {})
-        self.assertEqual(response.status_code, 404)
+class LatenessTestCase(TestCase):
+    """Tests for the ``lateness/`` URI.
 
-    def test_get_bad_id(self):
-        """GET ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.get(self.uri)
-        self.assertEqual(response.status_code, 404)
+    The ``lateness/`` URI is available through the ``elts.views.lateness``
+    function.
 
-    def test_put_bad_id(self):
-        """PUT ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
+    """
+    URI = reverse('elts.views.lateness')
 
-    def test_delete_bad_id(self):
-        """DELETE ``self.uri`` with a bad ID."""
-        self.category.delete()
-        response = self.client.post(self.uri)
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.URI`` for each kind of delay and scope."""
+        factories.PastLendFactory.create(
+            due_out = date.today(),
+            back = factories.lend_back(),
+            due_back = date.today(),
+        )
+        for kind in ('pickup', 'return'):
+            for scope in ('user', 'item', 'tag'):
+                response = self.client.get(
+                    self.URI,
+                    {'kind': kind, 'scope': scope}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class TimelineTestCase(TestCase):
+    """Tests for the ``timeline/`` URI.
+
+    The ``timeline/`` URI is available through the ``elts.views.timeline``
+    function.
+
+    """
+    URI = reverse('elts.views.timeline')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.URI``, and check that a reservation is drawn."""
+        lend = factories.FutureLendFactory.create(
+            due_out = date(2014, 6, 11),
+            due_back = date(2014, 6, 20),
+        )
+        response = self.client.get(
+            self.URI,
+            {'start': '2014-06-01', 'end': '2014-06-30'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response,
+            reverse('elts.views.lend_id', args = [lend.id])
+        )
+
+    def test_get_json(self):
+        """GET ``self.URI`` as JSON, filtered by tag."""
+        tag = factories.TagFactory.create()
+        lend = factories.FutureLendFactory.create(
+            due_out = date(2014, 6, 11),
+            due_back = date(2014, 6, 20),
+        )
+        lend.item_id.tags.add(tag)
+        factories.ItemFactory.create()
+        response = self.client.get(
+            self.URI,
+            {
+                'start': '2014-06-01',
+                'end': '2014-06-30',
+                'tag': tag.id,
+                'format': 'json',
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        items = json.loads(response.content)['items']
+        self.assertEqual([item['id'] for item in items], [lend.item_id.id])
+        self.assertEqual(
+            [interval['kind'] for interval in items[0]['intervals']],
+            ['reserved']
+        )
+
+    def test_get_bad_page(self):
+        """GET a page of items that does not exist."""
+        response = self.client.get(self.URI, {'page': 1000})
         self.assertEqual(response.status_code, 404)
 
-class ItemTestCase(TestCase):
-    """Tests for the ``item/`` URI.
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
 
-    The ``item/`` URI is available through the ``elts.views.item`` function.
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class CategoryTestCase(TestCase):
+    """Tests for the ``category/`` URI.
+
+    The ``category/`` URI is available through the ``elts.views.category``
+    function.
 
     """
-    URI = reverse('elts.views.item')
+    URI = reverse('elts.views.category')
 
     def setUp(self):
         """Authenticate the test client."""
@@ -455,24 +712,24 @@ class ItemTestCase(TestCase):
 
     def test_post(self):
         """POST ``self.URI``."""
-        num_items = models.Item.objects.count()
+        num_categories = models.Category.objects.count()
         response = self.client.post(
             self.URI,
-            factories.ItemFactory.attributes()
+            factories.CategoryFactory.attributes()
         )
-        self.assertEqual(models.Item.objects.count(), num_items + 1)
+        self.assertEqual(models.Category.objects.count(), num_categories + 1)
         self.assertRedirects(
             response,
             reverse(
-                'elts.views.item_id',
-                args = [models.Item.objects.latest('id').id]
+                'elts.views.category_id',
+                args = [models.Category.objects.latest('id').id]
             )
         )
 
     def test_get(self):
         """GET ``self.URI``."""
         response = self.client.get(self.URI)
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 405)
 
     def test_put(self):
         """PUT ``self.URI``."""
@@ -486,20 +743,20 @@ class ItemTestCase(TestCase):
 
     def test_post_failure(self):
         """POST ``self.URI``, incorrectly."""
-        response = self.client.post(self.URI, {})
-        self.assertRedirects(
-            response,
-            reverse('elts.views.item_create_form')
+        response = self.client.post(
+            self.URI,
+            {'name': factories.invalid_category_name()}
         )
+        _assert_invalid_form(self, response, 'elts/category-create-form.html')
 
-class ItemCreateFormTestCase(TestCase):
-    """Tests for the ``item/create-form/`` URI.
+class CategoryCreateFormTestCase(TestCase):
+    """Tests for the ``category/create-form/`` URI.
 
-    The ``item/create-form/`` URI is available through the
-    ``elts.views.item_create_form`` function.
+    The ``category/create-form/`` URI is available through the
+    ``elts.views.category_create_form`` function.
 
     """
-    URI = reverse('elts.views.item_create_form')
+    URI = reverse('elts.views.category_create_form')
 
     def setUp(self):
         """Authenticate the test client."""
@@ -529,24 +786,24 @@ class ItemCreateFormTestCase(TestCase):
         response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-class ItemIdTestCase(TestCase):
-    """Tests for the ``item/<id>/`` URI.
+class CategoryIdTestCase(TestCase):
+    """Tests for the ``category/<id>/`` URI.
 
-    The ``item/<id>/`` URI is available through the ``elts.views.item_id``
-    function.
+    The ``category/<id>/`` URI is available through the
+    ``elts.views.category_id`` function.
 
     """
-    FUNCTION = 'elts.views.item_id'
+    FUNCTION = 'elts.views.category_id'
 
     def setUp(self):
-        """Authenticate the test client, create an item, and set ``self.uri``.
+        """Authenticate the test client, create a category and set ``self.uri``.
 
-        The item created is accessible as ``self.item``.
+        The category created is accessible as ``self.category``.
 
         """
         _login(self.client)
-        self.item = factories.ItemFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.item.id])
+        self.category = factories.CategoryFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.category.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
@@ -564,7 +821,7 @@ class ItemIdTestCase(TestCase):
 
     def test_put(self):
         """PUT ``self.uri``."""
-        data = factories.ItemFactory.attributes()
+        data = factories.CategoryFactory.attributes()
         data['_method'] = 'PUT'
         response = self.client.post(self.uri, data)
         self.assertRedirects(response, self.uri)
@@ -576,54 +833,58 @@ class ItemIdTestCase(TestCase):
 
     def test_post_bad_id(self):
         """POST ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri, {})
         self.assertEqual(response.status_code, 404)
 
     def test_get_bad_id(self):
         """GET ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.get(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_put_bad_id(self):
         """PUT ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri, {'_method': 'PUT'})
         self.assertEqual(response.status_code, 404)
 
     def test_delete_bad_id(self):
         """DELETE ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_put_failure(self):
         """PUT ``self.uri``, incorrectly."""
-        response = self.client.post(self.uri, {'_method': 'PUT'})
-        self.assertRedirects(
+        response = self.client.post(
+            self.uri,
+            {'name': factories.invalid_category_name(), '_method': 'PUT'}
+        )
+        _assert_invalid_form(
+            self,
             response,
-            reverse('elts.views.item_id_update_form', args = [self.item.id])
+            'elts/category-id-update-form.html'
         )
 
-class ItemIdDeleteFormTestCase(TestCase):
-    """Tests for the ``item/<id>/delete-form/`` URI.
+class CategoryIdDeleteFormTestCase(TestCase):
+    """Tests for the ``category/<id>/delete-form/`` URI.
 
-    The ``item/<id>/delete-form/`` URI is available through the
-    ``elts.views.item_id_delete_form`` function.
+    The ``category/<id>/delete-form/`` URI is available through the
+    ``elts.views.category_id_delete_form`` function.
 
     """
-    FUNCTION = 'elts.views.item_id_delete_form'
+    FUNCTION = 'elts.views.category_id_delete_form'
 
     def setUp(self):
-        """Authenticate the test client, create an item, and set ``self.uri``.
+        """Authenticate the test client, create a category and set ``self.uri``.
 
-        The item created is accessible as ``self.item``.
+        The category created is accessible as ``self.category``.
 
         """
         _login(self.client)
-        self.item = factories.ItemFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.item.id])
+        self.category = factories.CategoryFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.category.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
@@ -651,46 +912,46 @@ class ItemIdDeleteFormTestCase(TestCase):
 
     def test_post_bad_id(self):
         """POST ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri, {})
         self.assertEqual(response.status_code, 404)
 
     def test_get_bad_id(self):
         """GET ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.get(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_put_bad_id(self):
         """PUT ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_delete_bad_id(self):
         """DELETE ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 404)
 
-class ItemIdUpdateFormTestCase(TestCase):
-    """Tests for the ``item/<id>/update-form/`` URI.
+class CategoryIdUpdateFormTestCase(TestCase):
+    """Tests for the ``category/<id>/update-form/`` URI.
 
-    The ``item/<id>/update-form/`` URI is available through the
-    ``elts.views.item_id_update_form`` function.
+    The ``category/<id>/update-form/`` URI is available through the
+    ``elts.views.category_id_update_form`` function.
 
     """
-    FUNCTION = 'elts.views.item_id_update_form'
+    FUNCTION = 'elts.views.category_id_update_form'
 
     def setUp(self):
-        """Authenticate the test client, create an item, and set ``self.uri``.
+        """Authenticate the test client, create a category and set ``self.uri``.
 
-        The item created is accessible as ``self.item``.
+        The category created is accessible as ``self.category``.
 
         """
         _login(self.client)
-        self.item = factories.ItemFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.item.id])
+        self.category = factories.CategoryFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.category.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
@@ -718,36 +979,35 @@ class ItemIdUpdateFormTestCase(TestCase):
 
     def test_post_bad_id(self):
         """POST ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri, {})
         self.assertEqual(response.status_code, 404)
 
     def test_get_bad_id(self):
         """GET ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.get(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_put_bad_id(self):
         """PUT ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_delete_bad_id(self):
         """DELETE ``self.uri`` with a bad ID."""
-        self.item.delete()
+        self.category.delete()
         response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 404)
 
-class ItemNoteTestCase(TestCase):
-    """Tests for the ``item-note/`` URI.
+class ItemTestCase(TestCase):
+    """Tests for the ``item/`` URI.
 
-    The ``item-note/`` URI is available through the ``elts.views.item_note``
-    function.
+    The ``item/`` URI is available through the ``elts.views.item`` function.
 
     """
-    URI = reverse('elts.views.item_note')
+    URI = reverse('elts.views.item')
 
     def setUp(self):
         """Authenticate the test client."""
@@ -758,23 +1018,25 @@ class ItemNoteTestCase(TestCase):
         _test_logout(self)
 
     def test_post(self):
-        """POST ``self.uri``."""
-        item_id = factories.ItemFactory.create()
-        num_item_notes = models.ItemNote.objects.count()
+        """POST ``self.URI``."""
+        num_items = models.Item.objects.count()
         response = self.client.post(
             self.URI,
-            {'note_text': factories.note_note_text(), 'item_id': item_id.id}
+            factories.ItemFactory.attributes()
         )
-        self.assertEqual(models.ItemNote.objects.count(), num_item_notes + 1)
+        self.assertEqual(models.Item.objects.count(), num_items + 1)
         self.assertRedirects(
             response,
-            reverse('elts.views.item_id', args = [item_id.id])
+            reverse(
+                'elts.views.item_id',
+                args = [models.Item.objects.latest('id').id]
+            )
         )
 
     def test_get(self):
         """GET ``self.URI``."""
         response = self.client.get(self.URI)
-        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response.status_code, 200)
 
     def test_put(self):
         """PUT ``self.URI``."""
@@ -786,46 +1048,125 @@ class ItemNoteTestCase(TestCase):
         response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-    def test_post_failure_v1(self):
+    def test_post_failure(self):
         """POST ``self.URI``, incorrectly."""
         response = self.client.post(self.URI, {})
-        self.assertEqual(response.status_code, 422)
+        _assert_invalid_form(self, response, 'elts/item-create-form.html')
 
-    def test_post_failure_v2(self):
-        """POST ``self.URI``, incorrectly."""
-        item_id = factories.ItemFactory.create()
-        num_item_notes = models.ItemNote.objects.count()
-        response = self.client.post(
-            self.URI,
-            {
-                'note_text': factories.invalid_note_note_text(),
-                'item_id': item_id.id
-            }
-        )
-        self.assertEqual(models.ItemNote.objects.count(), num_item_notes)
-        self.assertRedirects(
-            response,
-            reverse('elts.views.item_id', args = [item_id.id])
+class ItemCreateFormTestCase(TestCase):
+    """Tests for the ``item/create-form/`` URI.
+
+    The ``item/create-form/`` URI is available through the
+    ``elts.views.item_create_form`` function.
+
+    """
+    URI = reverse('elts.views.item_create_form')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class ItemCheckInTestCase(TestCase):
+    """Tests for the ``item/check-in/`` URI.
+
+    The ``item/check-in/`` URI is available through the
+    ``elts.views.item_check_in`` function.
+
+    """
+    URI = reverse('elts.views.item_check_in')
+
+    def setUp(self):
+        """Authenticate the test client, and lend out an item.
+
+        The lend created is accessible as ``self.lend``.
+
+        """
+        _login(self.client)
+        self.lend = factories.PastLendFactory.create(
+            out = timezone.now() - timedelta(days = 1)
         )
 
-class ItemNoteIdTestCase(TestCase):
-    """Tests for the ``item-note/<id>/`` URI.
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
 
-    The ``item-note/<id>/`` URI is available through the
-    ``elts.views.item_note_id`` function.
+    def test_post(self):
+        """POST ``self.URI``."""
+        idle = factories.ItemFactory.create()
+        response = self.client.post(
+            self.URI,
+            {
+                'item_id': [self.lend.item_id.id, idle.id],
+                'lend_id': [self.lend.id, self.lend.id + 1],
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {
+            'items': {
+                str(self.lend.item_id.id): [self.lend.id],
+                str(idle.id): [],
+            },
+            'lends_not_out': [self.lend.id + 1],
+        })
+        self.assertIsNotNone(models.Lend.objects.get(id = self.lend.id).back)
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class ItemIdTestCase(TestCase):
+    """Tests for the ``item/<id>/`` URI.
+
+    The ``item/<id>/`` URI is available through the ``elts.views.item_id``
+    function.
 
     """
-    FUNCTION = 'elts.views.item_note_id'
+    FUNCTION = 'elts.views.item_id'
 
     def setUp(self):
-        """Log in the test client, create an item note, and set ``self.uri``.
+        """Authenticate the test client, create an item, and set ``self.uri``.
 
-        The item note created is accessible as ``self.item_note``.
+        The item created is accessible as ``self.item``.
 
         """
         _login(self.client)
-        self.item_note = factories.ItemNoteFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.item_note.id])
+        self.item = factories.ItemFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.item.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
@@ -833,209 +1174,1057 @@ class ItemNoteIdTestCase(TestCase):
 
     def test_post(self):
         """POST ``self.uri``."""
-        response = self.client.post(self.uri)
+        response = self.client.post(self.uri, {})
         self.assertEqual(response.status_code, 405)
 
     def test_get(self):
         """GET ``self.uri``."""
         response = self.client.get(self.uri)
-        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response.status_code, 200)
 
     def test_put(self):
         """PUT ``self.uri``."""
-        data = factories.ItemNoteFactory.attributes()
+        data = factories.ItemFactory.attributes()
         data['_method'] = 'PUT'
         response = self.client.post(self.uri, data)
-        self.assertRedirects(
-            response,
-            reverse('elts.views.item_id', args = [self.item_note.item_id.id])
-        )
+        self.assertRedirects(response, self.uri)
 
     def test_delete(self):
         """DELETE ``self.uri``."""
-        item_id = self.item_note.item_id.id
         response = self.client.post(self.uri, {'_method': 'DELETE'})
-        self.assertRedirects(
-            response,
-            reverse('elts.views.item_id', args = [item_id])
-        )
+        self.assertRedirects(response, reverse('elts.views.item'))
 
     def test_post_bad_id(self):
         """POST ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri)
+        self.item.delete()
+        response = self.client.post(self.uri, {})
         self.assertEqual(response.status_code, 404)
 
     def test_get_bad_id(self):
         """GET ``self.uri`` with a bad ID."""
-        self.item_note.delete()
+        self.item.delete()
         response = self.client.get(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_put_bad_id(self):
         """PUT ``self.uri`` with a bad ID."""
-        self.item_note.delete()
+        self.item.delete()
         response = self.client.post(self.uri, {'_method': 'PUT'})
         self.assertEqual(response.status_code, 404)
 
     def test_delete_bad_id(self):
         """DELETE ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.item.delete()
+        response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 404)
 
     def test_put_failure(self):
         """PUT ``self.uri``, incorrectly."""
         response = self.client.post(self.uri, {'_method': 'PUT'})
+        _assert_invalid_form(self, response, 'elts/item-id-update-form.html')
+
+    def test_put_stale(self):
+        """PUT ``self.uri`` twice, giving the same version both times."""
+        for status in (302, 409):
+            data = factories.ItemFactory.attributes()
+            data['_method'] = 'PUT'
+            data['version'] = self.item.version
+            response = self.client.post(self.uri, data)
+            self.assertEqual(response.status_code, status)
+
+class ItemIdDeleteFormTestCase(TestCase):
+    """Tests for the ``item/<id>/delete-form/`` URI.
+
+    The ``item/<id>/delete-form/`` URI is available through the
+    ``elts.views.item_id_delete_form`` function.
+
+    """
+    FUNCTION = 'elts.views.item_id_delete_form'
+
+    def setUp(self):
+        """Authenticate the test client, create an item, and set ``self.uri``.
+
+        The item created is accessible as ``self.item``.
+
+        """
+        _login(self.client)
+        self.item = factories.ItemFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.item.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_bad_id(self):
+        """POST ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_bad_id(self):
+        """GET ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_put_bad_id(self):
+        """PUT ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_bad_id(self):
+        """DELETE ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+class ItemIdCheckOutTestCase(TestCase):
+    """Tests for the ``item/<id>/check-out/`` URI.
+
+    The ``item/<id>/check-out/`` URI is available through the
+    ``elts.views.item_id_check_out`` function.
+
+    """
+    FUNCTION = 'elts.views.item_id_check_out'
+
+    def setUp(self):
+        """Authenticate the test client, reserve an item for today, and set
+        ``self.uri``.
+
+        The reservation created is accessible as ``self.lend``.
+
+        """
+        _login(self.client)
+        self.lend = factories.FutureLendFactory.create(due_out = date.today())
+        self.uri = reverse(self.FUNCTION, args = [self.lend.item_id.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri, {})
         self.assertRedirects(
             response,
-            reverse(
-                'elts.views.item_note_id_update_form',
-                args = [self.item_note.item_id.id]
-            )
+            reverse('elts.views.lend_id', args = [self.lend.id])
         )
+        self.assertIsNotNone(models.Lend.objects.get(id = self.lend.id).out)
 
-class ItemNoteIdUpdateFormTestCase(TestCase):
-    """Tests for the ``item-note/<id>/update-form/`` URI.
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 405)
 
-    The ``item-note/<id>/update-form/`` URI is available through the
-    ``elts.views.item_note_id_update_form`` function.
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_bad_id(self):
+        """POST ``self.uri`` with a bad ID."""
+        self.lend.item_id.delete()
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_failure(self):
+        """POST ``self.uri`` for someone who has not reserved the item."""
+        response = self.client.post(
+            self.uri,
+            {'user_id': factories.UserFactory.create().id}
+        )
+        self.assertEqual(response.status_code, 422)
+
+    def test_post_conflict(self):
+        """POST ``self.uri`` while someone else has the item out."""
+        factories.PastLendFactory.create(
+            item_id = self.lend.item_id,
+            out = timezone.now() - timedelta(days = 1),
+        )
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 409)
+
+class ItemIdCheckInTestCase(TestCase):
+    """Tests for the ``item/<id>/check-in/`` URI.
+
+    The ``item/<id>/check-in/`` URI is available through the
+    ``elts.views.item_id_check_in`` function.
 
     """
-    FUNCTION = 'elts.views.item_note_id_update_form'
+    FUNCTION = 'elts.views.item_id_check_in'
 
     def setUp(self):
-        """Log in the test client, create an item note, and set ``self.uri``.
+        """Authenticate the test client, lend out an item, and set
+        ``self.uri``.
 
-        The item note created is accessible as ``self.item_note``.
+        The lend created is accessible as ``self.lend``.
 
         """
         _login(self.client)
-        self.item_note = factories.ItemNoteFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.item_note.id])
+        self.lend = factories.PastLendFactory.create(
+            out = timezone.now() - timedelta(days = 1)
+        )
+        self.uri = reverse(self.FUNCTION, args = [self.lend.item_id.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri, {})
+        self.assertRedirects(
+            response,
+            reverse('elts.views.lend_id', args = [self.lend.id])
+        )
+        self.assertIsNotNone(models.Lend.objects.get(id = self.lend.id).back)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 405)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_bad_id(self):
+        """POST ``self.uri`` with a bad ID."""
+        self.lend.item_id.delete()
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_failure(self):
+        """POST ``self.uri`` twice. The item is not out the second time."""
+        self.client.post(self.uri, {})
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 422)
+
+class ItemIdUpdateFormTestCase(TestCase):
+    """Tests for the ``item/<id>/update-form/`` URI.
+
+    The ``item/<id>/update-form/`` URI is available through the
+    ``elts.views.item_id_update_form`` function.
+
+    """
+    FUNCTION = 'elts.views.item_id_update_form'
+
+    def setUp(self):
+        """Authenticate the test client, create an item, and set ``self.uri``.
+
+        The item created is accessible as ``self.item``.
+
+        """
+        _login(self.client)
+        self.item = factories.ItemFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.item.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_bad_id(self):
+        """POST ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_bad_id(self):
+        """GET ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_put_bad_id(self):
+        """PUT ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_bad_id(self):
+        """DELETE ``self.uri`` with a bad ID."""
+        self.item.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+class ItemNoteTestCase(TestCase):
+    """Tests for the ``item-note/`` URI.
+
+    The ``item-note/`` URI is available through the ``elts.views.item_note``
+    function.
+
+    """
+    URI = reverse('elts.views.item_note')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        item_id = factories.ItemFactory.create()
+        num_item_notes = models.ItemNote.objects.count()
+        response = self.client.post(
+            self.URI,
+            {'note_text': factories.note_note_text(), 'item_id': item_id.id}
+        )
+        self.assertEqual(models.ItemNote.objects.count(), num_item_notes + 1)
+        self.assertRedirects(
+            response,
+            reverse('elts.views.item_id', args = [item_id.id])
+        )
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_failure_v1(self):
+        """POST ``self.URI``, incorrectly."""
+        response = self.client.post(self.URI, {})
+        self.assertEqual(response.status_code, 422)
+
+    def test_post_failure_v2(self):
+        """POST ``self.URI``, incorrectly."""
+        item_id = factories.ItemFactory.create()
+        num_item_notes = models.ItemNote.objects.count()
+        response = self.client.post(
+            self.URI,
+            {
+                'note_text': factories.invalid_note_note_text(),
+                'item_id': item_id.id
+            }
+        )
+        self.assertEqual(models.ItemNote.objects.count(), num_item_notes)
+        _assert_invalid_form(self, response, 'elts/item-id.html')
+
+class ItemNoteIdTestCase(TestCase):
+    """Tests for the ``item-note/<id>/`` URI.
+
+    The ``item-note/<id>/`` URI is available through the
+    ``elts.views.item_note_id`` function.
+
+    """
+    FUNCTION = 'elts.views.item_note_id'
+
+    def setUp(self):
+        """Log in the test client, create an item note, and set ``self.uri``.
+
+        The item note created is accessible as ``self.item_note``.
+
+        """
+        _login(self.client)
+        self.item_note = factories.ItemNoteFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.item_note.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 405)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        data = factories.ItemNoteFactory.attributes()
+        data['_method'] = 'PUT'
+        response = self.client.post(self.uri, data)
+        self.assertRedirects(
+            response,
+            reverse('elts.views.item_id', args = [self.item_note.item_id.id])
+        )
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        item_id = self.item_note.item_id.id
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertRedirects(
+            response,
+            reverse('elts.views.item_id', args = [item_id])
+        )
+
+    def test_post_bad_id(self):
+        """POST ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_bad_id(self):
+        """GET ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_put_bad_id(self):
+        """PUT ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_bad_id(self):
+        """DELETE ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_put_failure(self):
+        """PUT ``self.uri``, incorrectly."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        _assert_invalid_form(
+            self,
+            response,
+            'elts/item-note-id-update-form.html'
+        )
+
+class ItemNoteIdUpdateFormTestCase(TestCase):
+    """Tests for the ``item-note/<id>/update-form/`` URI.
+
+    The ``item-note/<id>/update-form/`` URI is available through the
+    ``elts.views.item_note_id_update_form`` function.
+
+    """
+    FUNCTION = 'elts.views.item_note_id_update_form'
+
+    def setUp(self):
+        """Log in the test client, create an item note, and set ``self.uri``.
+
+        The item note created is accessible as ``self.item_note``.
+
+        """
+        _login(self.client)
+        self.item_note = factories.ItemNoteFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.item_note.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_bad_id(self):
+        """POST ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_bad_id(self):
+        """GET ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_put_bad_id(self):
+        """PUT ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_bad_id(self):
+        """DELETE ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+class ItemNoteIdDeleteFormTestCase(TestCase):
+    """Tests for the ``item-note/<id>/delete-form/`` URI.
+
+    The ``item-note/<id>/delete-form/`` URI is available through the
+    ``elts.views.item_note_id_delete_form`` function.
+
+    """
+    FUNCTION = 'elts.views.item_note_id_delete_form'
+
+    def setUp(self):
+        """Log in the test client, create an item note, and set ``self.uri``.
+
+        The item note created is accessible as ``self.item_note``.
+
+        """
+        _login(self.client)
+        self.item_note = factories.ItemNoteFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.item_note.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_bad_id(self):
+        """POST ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_bad_id(self):
+        """GET ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_put_bad_id(self):
+        """PUT ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_bad_id(self):
+        """DELETE ``self.uri`` with a bad ID."""
+        self.item_note.delete()
+        response = self.client.post(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+class KitTestCase(TestCase):
+    """Tests for the ``kit/`` URI.
+
+    The ``kit/`` URI is available through the ``elts.views.kit`` function.
+
+    """
+    URI = reverse('elts.views.kit')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``."""
+        item = factories.ItemFactory.create()
+        response = self.client.post(
+            self.URI,
+            {'name': 'camera kit', 'description': '', 'items': [item.id]}
+        )
+        kit = models.Kit.objects.get(name = 'camera kit')
+        self.assertEqual(list(kit.items.all()), [item])
+        self.assertRedirects(
+            response,
+            reverse('elts.views.kit_id', args = [kit.id])
+        )
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        factories.KitFactory.create()
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_failure(self):
+        """POST ``self.URI``, incorrectly."""
+        response = self.client.post(self.URI, {})
+        _assert_invalid_form(self, response, 'elts/kit-create-form.html')
+
+class KitIdTestCase(TestCase):
+    """Tests for the ``kit/<id>/`` URI.
+
+    The ``kit/<id>/`` URI is available through the ``elts.views.kit_id``
+    function.
+
+    """
+    FUNCTION = 'elts.views.kit_id'
+
+    def setUp(self):
+        """Authenticate the test client, create a kit, and set ``self.uri``.
+
+        The kit created is accessible as ``self.kit``.
+
+        """
+        _login(self.client)
+        self.kit = factories.KitFactory.create()
+        self.uri = reverse(self.FUNCTION, args = [self.kit.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {
+            '_method': 'PUT',
+            'name': self.kit.name,
+            'description': 'Camera and tripod.',
+            'items': [item.id for item in self.kit.items.all()],
+        })
+        self.assertRedirects(response, self.uri)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertRedirects(response, reverse('elts.views.kit'))
+        self.assertFalse(models.Kit.objects.filter(id = self.kit.id).exists())
+
+    def test_delete_reserved(self):
+        """DELETE ``self.uri`` once the kit has been reserved. The kit and its
+        lends are kept."""
+        kit_lend = kits.reserve(
+            self.kit,
+            factories.UserFactory.create(),
+            date.today()
+        )
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(models.Kit.objects.filter(id = self.kit.id).exists())
+        self.assertEqual(
+            models.Lend.objects.filter(kit_lend_id = kit_lend).count(),
+            self.kit.items.count()
+        )
+
+    def test_get_bad_id(self):
+        """GET ``self.uri`` with a bad ID."""
+        self.kit.delete()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+    def test_put_failure(self):
+        """PUT ``self.uri``, incorrectly."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        _assert_invalid_form(self, response, 'elts/kit-id-update-form.html')
+
+class KitLendTestCase(TestCase):
+    """Tests for the ``kit-lend/`` URI.
+
+    The ``kit-lend/`` URI is available through the ``elts.views.kit_lend``
+    function.
+
+    """
+    URI = reverse('elts.views.kit_lend')
+
+    def setUp(self):
+        """Authenticate the test client, and create a kit as ``self.kit``."""
+        _login(self.client)
+        self.kit = factories.KitFactory.create()
+        self.data = {
+            'kit_id': self.kit.id,
+            'user_id': factories.UserFactory.create().id,
+            'due_out': date.today() + timedelta(days = 1),
+            'due_back': date.today() + timedelta(days = 3),
+        }
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``. Every item in the kit is reserved."""
+        response = self.client.post(self.URI, self.data)
+        kit_lend = models.KitLend.objects.get(kit_id = self.kit)
+        self.assertRedirects(
+            response,
+            reverse('elts.views.kit_lend_id', args = [kit_lend.id])
+        )
+        self.assertEqual(kit_lend.lends.count(), 2)
+
+    def test_post_conflict(self):
+        """POST ``self.URI`` when one item is already reserved."""
+        factories.FutureLendFactory.create(
+            item_id = self.kit.items.all()[0],
+            due_out = self.data['due_back'],
+            due_back = None,
+        )
+        response = self.client.post(self.URI, self.data)
+        _assert_invalid_form(self, response, 'elts/kit-lend-create-form.html')
+        self.assertFalse(models.KitLend.objects.exists())
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get_listing(self):
+        """GET the lend listing. The kit's lends are shown as one row."""
+        kits.reserve(self.kit, factories.UserFactory.create(), date.today())
+        response = self.client.get(reverse('elts.views.lend'))
+        self.assertEqual(len(response.context['table'].rows), 0)
+        self.assertEqual(len(response.context['kit_lend_table'].rows), 1)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class KitLendIdTestCase(TestCase):
+    """Tests for the ``kit-lend/<id>/`` URI.
+
+    The ``kit-lend/<id>/`` URI is available through the
+    ``elts.views.kit_lend_id`` function.
+
+    """
+    FUNCTION = 'elts.views.kit_lend_id'
+
+    def setUp(self):
+        """Authenticate the test client, reserve a kit, and set ``self.uri``.
+
+        The kit lend created is accessible as ``self.kit_lend``.
+
+        """
+        _login(self.client)
+        self.kit_lend = kits.reserve(
+            factories.KitFactory.create(),
+            factories.UserFactory.create(),
+            date.today()
+        )
+        self.uri = reverse(self.FUNCTION, args = [self.kit_lend.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['lends']), 2)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``, which cancels the lend of every item."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertRedirects(response, reverse('elts.views.lend'))
+        self.assertFalse(models.Lend.objects.exists())
+
+    def test_get_bad_id(self):
+        """GET ``self.uri`` with a bad ID."""
+        self.kit_lend.delete()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 404)
+
+class LendTestCase(TestCase):
+    """Tests for the ``lend/`` URI.
+
+    The ``lend/`` URI is available through the ``elts.views.lend`` function.
+
+    """
+    URI = reverse('elts.views.lend')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``."""
+        num_lends = models.Lend.objects.count()
+        response = self.client.post(
+            self.URI,
+            {
+                'item_id': factories.ItemFactory.create().id,
+                'user_id': factories.UserFactory.create().id,
+                'due_out': str(date.today()),
+            }
+        )
+        self.assertEqual(models.Lend.objects.count(), num_lends + 1)
+        self.assertRedirects(
+            response,
+            reverse(
+                'elts.views.lend_id',
+                args = [models.Lend.objects.latest('id').id]
+            )
+        )
+
+    def test_post_failure(self):
+        """POST ``self.URI``, incorrectly."""
+        response = self.client.post(self.URI, {})
+        _assert_invalid_form(self, response, 'elts/lend-create-form.html')
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class LendCreateFormTestCase(TestCase):
+    """Tests for the ``lend/create-form/`` URI.
+
+    The ``lend/create-form/`` URI is available through the
+    ``elts.views.lend_create_form`` function.
+
+    """
+    URI = reverse('elts.views.lend_create_form')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class AllocatedLendTestCase(TestCase):
+    """Tests for the ``allocated-lend/`` URI.
+
+    The ``allocated-lend/`` URI is available through the
+    ``elts.views.allocated_lend`` function.
+
+    """
+    URI = reverse('elts.views.allocated_lend')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
 
     def test_logout(self):
         """Call ``_test_logout()``."""
-        _test_logout(self, self.uri)
+        _test_logout(self)
 
     def test_post(self):
-        """POST ``self.uri``."""
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 405)
+        """POST ``self.URI``, reserving any item with a tag."""
+        tag = factories.TagFactory.create()
+        item = factories.ItemFactory.create(is_lendable = True)
+        item.tags.add(tag)
+        response = self.client.post(self.URI, {
+            'tag': tag.id,
+            'user_id': factories.UserFactory.create().id,
+            'due_out': '2014-01-14',
+            'due_back': '2014-01-15',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(item.lend_set.count(), 1)
+
+    def test_post_invalid(self):
+        """POST ``self.URI`` with an invalid reservation."""
+        response = self.client.post(self.URI, {})
+        _assert_invalid_form(
+            self,
+            response,
+            'elts/allocated-lend-create-form.html'
+        )
 
     def test_get(self):
-        """GET ``self.uri``."""
-        response = self.client.get(self.uri)
-        self.assertEqual(response.status_code, 200)
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 405)
 
     def test_put(self):
-        """PUT ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'PUT'})
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
         self.assertEqual(response.status_code, 405)
 
     def test_delete(self):
-        """DELETE ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-    def test_post_bad_id(self):
-        """POST ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_get_bad_id(self):
-        """GET ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.get(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_put_bad_id(self):
-        """PUT ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_delete_bad_id(self):
-        """DELETE ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-class ItemNoteIdDeleteFormTestCase(TestCase):
-    """Tests for the ``item-note/<id>/delete-form/`` URI.
+class AllocatedLendCreateFormTestCase(TestCase):
+    """Tests for the ``allocated-lend/create-form/`` URI.
 
-    The ``item-note/<id>/delete-form/`` URI is available through the
-    ``elts.views.item_note_id_delete_form`` function.
+    The ``allocated-lend/create-form/`` URI is available through the
+    ``elts.views.allocated_lend_create_form`` function.
 
     """
-    FUNCTION = 'elts.views.item_note_id_delete_form'
+    URI = reverse('elts.views.allocated_lend_create_form')
 
     def setUp(self):
-        """Log in the test client, create an item note, and set ``self.uri``.
-
-        The item note created is accessible as ``self.item_note``.
-
-        """
+        """Authenticate the test client."""
         _login(self.client)
-        self.item_note = factories.ItemNoteFactory.create()
-        self.uri = reverse(self.FUNCTION, args = [self.item_note.id])
 
     def test_logout(self):
         """Call ``_test_logout()``."""
-        _test_logout(self, self.uri)
+        _test_logout(self)
 
     def test_post(self):
-        """POST ``self.uri``."""
-        response = self.client.post(self.uri)
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
         self.assertEqual(response.status_code, 405)
 
     def test_get(self):
-        """GET ``self.uri``."""
-        response = self.client.get(self.uri)
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
         self.assertEqual(response.status_code, 200)
 
     def test_put(self):
-        """PUT ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'PUT'})
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
         self.assertEqual(response.status_code, 405)
 
     def test_delete(self):
-        """DELETE ``self.uri``."""
-        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-    def test_post_bad_id(self):
-        """POST ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_get_bad_id(self):
-        """GET ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.get(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_put_bad_id(self):
-        """PUT ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-    def test_delete_bad_id(self):
-        """DELETE ``self.uri`` with a bad ID."""
-        self.item_note.delete()
-        response = self.client.post(self.uri)
-        self.assertEqual(response.status_code, 404)
-
-class LendTestCase(TestCase):
-    """Tests for the ``lend/`` URI.
+class RecurringLendTestCase(TestCase):
+    """Tests for the ``recurring-lend/`` URI.
 
-    The ``lend/`` URI is available through the ``elts.views.lend`` function.
+    The ``recurring-lend/`` URI is available through the
+    ``elts.views.recurring_lend`` function.
 
     """
-    URI = reverse('elts.views.lend')
+    URI = reverse('elts.views.recurring_lend')
 
     def setUp(self):
         """Authenticate the test client."""
@@ -1046,34 +2235,32 @@ class LendTestCase(TestCase):
         _test_logout(self)
 
     def test_post(self):
-        """POST ``self.URI``."""
-        num_lends = models.Lend.objects.count()
-        response = self.client.post(
-            self.URI,
-            {
-                'item_id': factories.ItemFactory.create().id,
-                'user_id': factories.UserFactory.create().id,
-                'due_out': str(date.today()),
-            }
-        )
-        self.assertEqual(models.Lend.objects.count(), num_lends + 1)
-        self.assertRedirects(
+        """POST ``self.URI``, reserving an item every Tuesday."""
+        item = factories.ItemFactory.create()
+        response = self.client.post(self.URI, {
+            'item_id': item.id,
+            'user_id': factories.UserFactory.create().id,
+            'due_out': '2014-01-14',
+            'days': 1,
+            'interval': 1,
+            'until': '2014-04-22',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(item.lend_set.count(), 15)
+
+    def test_post_invalid(self):
+        """POST ``self.URI`` with an invalid rule."""
+        response = self.client.post(self.URI, {})
+        _assert_invalid_form(
+            self,
             response,
-            reverse(
-                'elts.views.lend_id',
-                args = [models.Lend.objects.latest('id').id]
-            )
+            'elts/recurring-lend-create-form.html'
         )
 
-    def test_post_failure(self):
-        """POST ``self.URI``, incorrectly."""
-        response = self.client.post(self.URI, {})
-        self.assertRedirects(response, reverse('elts.views.lend_create_form'))
-
     def test_get(self):
         """GET ``self.URI``."""
         response = self.client.get(self.URI)
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 405)
 
     def test_put(self):
         """PUT ``self.URI``."""
@@ -1085,14 +2272,14 @@ class LendTestCase(TestCase):
         response = self.client.post(self.URI, {'_method': 'DELETE'})
         self.assertEqual(response.status_code, 405)
 
-class LendCreateFormTestCase(TestCase):
-    """Tests for the ``lend/create-form/`` URI.
+class RecurringLendCreateFormTestCase(TestCase):
+    """Tests for the ``recurring-lend/create-form/`` URI.
 
-    The ``lend/create-form/`` URI is available through the
-    ``elts.views.lend_create_form`` function.
+    The ``recurring-lend/create-form/`` URI is available through the
+    ``elts.views.recurring_lend_create_form`` function.
 
     """
-    URI = reverse('elts.views.lend_create_form')
+    URI = reverse('elts.views.recurring_lend_create_form')
 
     def setUp(self):
         """Authenticate the test client."""
@@ -1194,10 +2381,7 @@ class LendIdTestCase(TestCase):
     def test_put_failure(self):
         """PUT ``self.uri``, incorrectly."""
         response = self.client.post(self.uri, {'_method': 'PUT'})
-        self.assertRedirects(
-            response,
-            reverse('elts.views.lend_id_update_form', args = [self.lend.id])
-        )
+        _assert_invalid_form(self, response, 'elts/lend-id-update-form.html')
 
 class LendIdDeleteFormTestCase(TestCase):
     """Tests for the ``lend/<id>/delete-form/`` URI.
@@ -1396,10 +2580,7 @@ class LendNoteTestCase(TestCase):
             }
         )
         self.assertEqual(models.LendNote.objects.count(), num_lend_notes)
-        self.assertRedirects(
-            response,
-            reverse('elts.views.lend_id', args = [lend_id.id])
-        )
+        _assert_invalid_form(self, response, 'elts/lend-id.html')
 
 class LendNoteIdTestCase(TestCase):
     """Tests for the ``lend-note/<id>/`` URI.
@@ -1480,12 +2661,10 @@ class LendNoteIdTestCase(TestCase):
     def test_put_failure(self):
         """PUT ``self.uri``, incorrectly."""
         response = self.client.post(self.uri, {'_method': 'PUT'})
-        self.assertRedirects(
+        _assert_invalid_form(
+            self,
             response,
-            reverse(
-                'elts.views.lend_note_id_update_form',
-                args = [self.lend_note.lend_id.id]
-            )
+            'elts/lend-note-id-update-form.html'
         )
 
 class LendNoteIdUpdateFormTestCase(TestCase):
@@ -1642,7 +2821,7 @@ class LoginTestCase(TestCase):
     def test_post_failure(self):
         """POST ``self.URI``, incorrectly."""
         response = self.client.post(self.URI, {})
-        self.assertRedirects(response, self.URI)
+        _assert_invalid_form(self, response, 'elts/login.html')
 
     def test_get(self):
         """GET ``self.URI``."""
@@ -1718,10 +2897,7 @@ class TagTestCase(TestCase):
     def test_post_failure(self):
         """POST ``self.URI``, incorrectly."""
         response = self.client.post(self.URI, {})
-        self.assertRedirects(
-            response,
-            reverse('elts.views.tag_create_form')
-        )
+        _assert_invalid_form(self, response, 'elts/tag-create-form.html')
 
 class TagCreateFormTestCase(TestCase):
     """Tests for the ``tag/create-form/`` URI.
@@ -1832,10 +3008,7 @@ class TagIdTestCase(TestCase):
     def test_put_failure(self):
         """PUT ``self.uri``, incorrectly."""
         response = self.client.post(self.uri, {'_method': 'PUT'})
-        self.assertRedirects(
-            response,
-            reverse('elts.views.tag_id_update_form', args = [self.tag.id])
-        )
+        _assert_invalid_form(self, response, 'elts/tag-id-update-form.html')
 
 class TagIdUpdateFormTestCase(TestCase):
     """Tests for the ``tag/<id>/update-form/`` URI.
@@ -1970,3 +3143,156 @@ class TagIdDeleteFormTestCase(TestCase):
         self.tag.delete()
         response = self.client.post(self.uri)
         self.assertEqual(response.status_code, 404)
+
+class WaitlistTestCase(TestCase):
+    """Tests for the ``waitlist/`` URI.
+
+    The ``waitlist/`` URI is available through the ``elts.views.waitlist``
+    function.
+
+    """
+    URI = reverse('elts.views.waitlist')
+
+    def setUp(self):
+        """Authenticate the test client, and describe a reservation."""
+        _login(self.client)
+        self.item = factories.ItemFactory.create()
+        self.data = {
+            'item_id': self.item.id,
+            'user_id': factories.UserFactory.create().id,
+            'due_out': '2100-01-01',
+            'due_back': '2100-01-02',
+        }
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI`` while the item is reserved. The user waits."""
+        factories.FutureLendFactory.create(
+            item_id = self.item,
+            due_out = date(2100, 1, 1),
+            due_back = None,
+        )
+        response = self.client.post(self.URI, self.data)
+        self.assertRedirects(response, self.URI)
+        self.assertEqual(models.WaitlistEntry.objects.count(), 1)
+
+    def test_post_free(self):
+        """POST ``self.URI`` while the item is free. It is reserved at once."""
+        response = self.client.post(self.URI, self.data)
+        lend = self.item.lend_set.get()
+        self.assertRedirects(
+            response,
+            reverse('elts.views.lend_id', args = [lend.id])
+        )
+        self.assertEqual(models.WaitlistEntry.objects.count(), 0)
+
+    def test_post_invalid(self):
+        """POST ``self.URI`` with an invalid entry."""
+        response = self.client.post(self.URI, {})
+        _assert_invalid_form(self, response, 'elts/waitlist-create-form.html')
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI)
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class WaitlistCreateFormTestCase(TestCase):
+    """Tests for the ``waitlist/create-form/`` URI.
+
+    The ``waitlist/create-form/`` URI is available through the
+    ``elts.views.waitlist_create_form`` function.
+
+    """
+    URI = reverse('elts.views.waitlist_create_form')
+
+    def setUp(self):
+        """Authenticate the test client."""
+        _login(self.client)
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self)
+
+    def test_post(self):
+        """POST ``self.URI``."""
+        response = self.client.post(self.URI)
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.URI``."""
+        response = self.client.get(self.URI, {'due_out': '2100-01-01'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_put(self):
+        """PUT ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.URI``."""
+        response = self.client.post(self.URI, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 405)
+
+class WaitlistIdTestCase(TestCase):
+    """Tests for the ``waitlist/<id>/`` URI.
+
+    The ``waitlist/<id>/`` URI is available through the
+    ``elts.views.waitlist_id`` function.
+
+    """
+    FUNCTION = 'elts.views.waitlist_id'
+
+    def setUp(self):
+        """Authenticate the test client, create an entry, and set
+        ``self.uri``."""
+        _login(self.client)
+        self.entry = models.WaitlistEntry.objects.create(
+            item_id = factories.ItemFactory.create(),
+            user_id = factories.UserFactory.create(),
+            due_out = date(2100, 1, 1),
+        )
+        self.uri = reverse(self.FUNCTION, args = [self.entry.id])
+
+    def test_logout(self):
+        """Call ``_test_logout()``."""
+        _test_logout(self, self.uri)
+
+    def test_post(self):
+        """POST ``self.uri``."""
+        response = self.client.post(self.uri, {})
+        self.assertEqual(response.status_code, 405)
+
+    def test_get(self):
+        """GET ``self.uri``."""
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 405)
+
+    def test_put(self):
+        """PUT ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'PUT'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_delete(self):
+        """DELETE ``self.uri``."""
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertRedirects(response, reverse('elts.views.waitlist'))
+        self.assertEqual(models.WaitlistEntry.objects.count(), 0)
+
+    def test_delete_bad_id(self):
+        """DELETE ``self.uri`` with a bad ID."""
+        self.entry.delete()
+        response = self.client.post(self.uri, {'_method': 'DELETE'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,74 @@
+"""Unit tests for the ``waiting`` module."""
+from datetime import date
+from django.test import TestCase
+from elts import factories, models, waiting
+
+# pylint: disable=E1101
+# Class 'ItemFactory' has no 'create' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+class PromoteTestCase(TestCase):
+    """Tests for ``waiting.promote`` and the signals which call it."""
+    def setUp(self):
+        """Reserve an item far in the future, and have two users wait for it.
+
+        The first user waits for the first days of the reservation, and the
+        second for the whole of it.
+
+        """
+        self.item = factories.ItemFactory.create()
+        self.lend = factories.FutureLendFactory.create(
+            item_id = self.item,
+            due_out = date(2100, 1, 1),
+            due_back = date(2100, 1, 10),
+        )
+        self.first = models.WaitlistEntry.objects.create(
+            item_id = self.item,
+            user_id = factories.UserFactory.create(),
+            due_out = date(2100, 1, 1),
+            due_back = date(2100, 1, 3),
+        )
+        self.second = models.WaitlistEntry.objects.create(
+            item_id = self.item,
+            user_id = factories.UserFactory.create(),
+            due_out = date(2100, 1, 2),
+            due_back = date(2100, 1, 10),
+        )
+
+    def _waiting(self):
+        """Return the IDs of the entries still waiting."""
+        return set(models.WaitlistEntry.objects.values_list('id', flat = True))
+
+    def test_busy(self):
+        """Check that nobody is promoted while the item is reserved."""
+        self.assertEqual(
+            waiting.promote(self.item.id, date(2100, 1, 1), None),
+            {}
+        )
+        self.assertEqual(self._waiting(), set([self.first.id, self.second.id]))
+
+    def test_delete(self):
+        """Delete the reservation. The first entry is promoted, and the second
+        still clashes with it."""
+        self.lend.delete()
+        self.assertEqual(self._waiting(), set([self.second.id]))
+        lend = models.Lend.objects.get(item_id = self.item)
+        self.assertEqual(lend.user_id, self.first.user_id)
+        self.assertEqual(lend.due_back, date(2100, 1, 3))
+
+    def test_shorten(self):
+        """Shorten the reservation from its start. Only the days it no longer
+        covers are freed."""
+        self.lend.due_out = date(2100, 1, 4)
+        self.lend.save()
+        self.assertEqual(self._waiting(), set([self.second.id]))
+        self.assertEqual(self.item.lend_set.count(), 2)
+
+    def test_lengthen(self):
+        """Lengthen the reservation. Nobody is promoted."""
+        self.lend.due_back = date(2100, 1, 20)
+        self.lend.save()
+        self.assertEqual(self._waiting(), set([self.first.id, self.second.id]))
@@ -0,0 +1,281 @@
+"""Unit tests for the ``writes`` module."""
+from datetime import date, timedelta
+from django.core.urlresolvers import reverse
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.client import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from elts import factories, lending, models, quotas, writes
+import threading
+
+# pylint: disable=E1101
+# Class 'Item' has no 'objects' member (no-member)
+#
+# pylint: disable=R0904
+# Classes inheriting from TestCase will have 60+ too many public methods, and
+# that's not something I have control over. Ignore it.
+
+@override_settings(ELTS_WRITE_QUEUE = True)
+class SerializedTestCase(TestCase):
+    """Tests for ``writes.serialized`` with the write queue enabled."""
+    def test_result(self):
+        """Check that the return value of a write is passed to the caller."""
+        @writes.serialized
+        def create_item():
+            """Create an item and return it."""
+            return factories.ItemFactory.create()
+        item = create_item()
+        self.assertTrue(models.Item.objects.filter(id = item.id).exists())
+
+    def test_exception(self):
+        """Check that an exception raised by a write is passed to the caller.
+
+        The work done by the write must be rolled back.
+
+        """
+        num_items = models.Item.objects.count()
+
+        @writes.serialized
+        def fail():
+            """Create an item, then raise an exception."""
+            factories.ItemFactory.create()
+            raise ValueError
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(models.Item.objects.count(), num_items)
+
+    def test_retry(self):
+        """Check that a write is retried if the database is busy."""
+        calls = []
+
+        @writes.serialized
+        def flaky():
+            """Report that the database is locked on the first call."""
+            calls.append(None)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return len(calls)
+        self.assertEqual(flaky(), 2)
+
+    @override_settings(ELTS_WRITE_QUEUE_RETRIES = 0)
+    def test_give_up(self):
+        """Check that a busy error is raised once retries are used up."""
+        @writes.serialized
+        def busy():
+            """Report that the database is locked."""
+            raise OperationalError('database is locked')
+        self.assertRaises(OperationalError, busy)
+
+    def test_items_locked(self):
+        """Check that items are not locked separately within a batch."""
+        item = factories.ItemFactory.create()
+        @writes.serialized
+        def lock():
+            """Lock ``item``, and return the keys this thread holds."""
+            with writes.items_locked([item.id]):
+                return set(writes._held_keys()) # pylint: disable=W0212
+        self.assertEqual(lock(), set())
+
+    def test_lock_file_error(self):
+        """Check that a batch which cannot start is failed, not left waiting.
+        """
+        @writes.serialized
+        def create_item():
+            """Create an item."""
+            return factories.ItemFactory.create()
+        with override_settings(
+            ELTS_WRITE_QUEUE_LOCK_FILE = '/nonexistent/elts.write-lock'
+        ):
+            self.assertRaises(IOError, create_item)
+        # The writer is not stuck.
+        self.assertIsNotNone(create_item().id)
+
+def _in_thread(function):
+    """Call ``function`` in a new thread, and return the thread.
+
+    The thread closes its own database connection when it is done.
+
+    """
+    def run():
+        """Call ``function``, then close this thread's connection."""
+        try:
+            function()
+        finally:
+            connection.close()
+    thread = threading.Thread(target = run)
+    thread.start()
+    return thread
+
+class ItemsLockedTestCase(TransactionTestCase):
+    """Tests for ``writes.items_locked``."""
+    def _lock(self, item):
+        """Lock ``item`` in another thread.
+
+        Return an event which is set once the item has been locked. The lock is
+        released straight away.
+
+        """
+        locked = threading.Event()
+        def lock():
+            """Lock ``item``, and say so."""
+            with writes.items_locked([item.id]):
+                locked.set()
+        _in_thread(lock)
+        return locked
+
+    def test_items_locked(self):
+        """Check that only callers locking the same item wait for each other.
+        """
+        items = [factories.ItemFactory.create() for _ in range(2)]
+        with writes.items_locked([items[0].id]):
+            other = self._lock(items[1])
+            same = self._lock(items[0])
+            self.assertTrue(other.wait(5))
+            self.assertFalse(same.wait(0.2))
+            # Locking an item twice in one thread is harmless.
+            with writes.items_locked([items[0].id]):
+                pass
+        self.assertTrue(same.wait(5))
+
+class ConcurrentLendTestCase(TransactionTestCase):
+    """POST clashing reservations of one item to ``lend/`` all at once."""
+    THREADS = 8
+
+    def setUp(self):
+        """Skip this test if threads cannot share the test database.
+
+        Each thread has its own connection, and each connection to an
+        in-memory SQLite database sees a database of its own. The default
+        settings give SQLite a ``TEST_NAME``, so that this test is run.
+
+        """
+        if (connection.vendor == 'sqlite'
+                and connection.settings_dict['NAME'] == ':memory:'):
+            self.skipTest('The test database is private to each thread.')
+
+    def test_no_overlaps(self):
+        """Check that exactly one of the reservations is made."""
+        item = factories.ItemFactory.create()
+        due_out = date.today() + timedelta(days = 1)
+        accounts = [factories.create_user() for _ in range(self.THREADS)]
+        go = threading.Event()
+        statuses = []
+
+        def post(index):
+            """Log in, wait for the others, and reserve ``item``."""
+            user, password = accounts[index]
+            client = Client()
+            client.login(username = user.username, password = password)
+            go.wait()
+            response = client.post(reverse('elts.views.lend'), {
+                'item_id': item.id,
+                'user_id': user.id,
+                'due_out': str(due_out + timedelta(days = index)),
+                'due_back': str(due_out + timedelta(days = self.THREADS)),
+            })
+            statuses.append(response.status_code)
+
+        threads = [
+            _in_thread(lambda index = index: post(index))
+            for index in range(self.THREADS)
+        ]
+        go.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(statuses), [302] + [422] * (self.THREADS - 1))
+        self.assertEqual(item.lend_set.count(), 1)
+
+class ConcurrentCheckOutTestCase(TransactionTestCase):
+    """Check items out to and in from one user, all at once."""
+    THREADS = 8
+
+    def setUp(self):
+        """Skip this test if threads cannot share the test database. See
+        ``ConcurrentLendTestCase``."""
+        if (connection.vendor == 'sqlite'
+                and connection.settings_dict['NAME'] == ':memory:'):
+            self.skipTest('The test database is private to each thread.')
+
+    def test_quota(self):
+        """Check that exactly one of the items is checked out."""
+        user = factories.UserFactory.create()
+        models.LendQuota.objects.create(user = user, limit = 1)
+        lends = [
+            factories.FutureLendFactory.create(
+                user_id = user,
+                due_out = date.today(),
+                due_back = date.today() + timedelta(days = 1),
+            )
+            for _ in range(self.THREADS)
+        ]
+        go = threading.Event()
+        outcomes = []
+
+        def check_out(lend):
+            """Wait for the others, and check out the item of ``lend``."""
+            go.wait()
+            try:
+                lending.check_out(lend.item_id, timezone.now())
+            except lending.Unavailable:
+                outcomes.append('unavailable')
+            else:
+                outcomes.append('out')
+
+        threads = [
+            _in_thread(lambda lend = lend: check_out(lend))
+            for lend in lends
+        ]
+        go.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            sorted(outcomes),
+            ['out'] + ['unavailable'] * (self.THREADS - 1)
+        )
+        self.assertEqual(quotas.active(user.id), 1)
+
+    def test_check_in(self):
+        """Check items in and out for one user at once, and check that their
+        count matches their lends."""
+        user = factories.UserFactory.create()
+        out = [
+            factories.PastLendFactory.create(
+                user_id = user,
+                out = timezone.now() - timedelta(days = 1),
+            )
+            for _ in range(self.THREADS // 2)
+        ]
+        reserved = [
+            factories.FutureLendFactory.create(
+                user_id = user,
+                due_out = date.today(),
+                due_back = date.today() + timedelta(days = 1),
+            )
+            for _ in range(self.THREADS // 2)
+        ]
+        go = threading.Event()
+
+        def check(function, lend):
+            """Wait for the others, and call ``function`` on ``lend``'s item.
+            """
+            go.wait()
+            function(lend.item_id, timezone.now())
+
+        threads = [
+            _in_thread(lambda lend = lend: check(lending.check_in, lend))
+            for lend in out
+        ] + [
+            _in_thread(lambda lend = lend: check(lending.check_out, lend))
+            for lend in reserved
+        ]
+        go.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            quotas.active(user.id),
+            models.Lend.objects.filter(
+                user_id = user,
+                out__isnull = False,
+                back__isnull = True,
+            ).count()
+        )
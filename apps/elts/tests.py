@@ -6,15 +6,35 @@ https://docs.djangoproject.com/en/1.6/topics/testing/overview/
 
 """
 from doctest import DocTestSuite
-from templatetags import calendar_tools, category_tools
-import factories, forms, tables, views
+from templatetags import calendar_tools, category_tools, form_tools
+from templatetags import user_tools
+import analytics, caching, factories, forms, ical, idempotency, jobs, models
+import quotas, recurrence, repacking, routers, scheduling, signals, statistics
+import tables, views, waiting, writes
 
 def load_tests(loader, tests, ignore):
     """Create a suite of doctests from this Django application."""
+    tests.addTests(DocTestSuite(analytics))
+    tests.addTests(DocTestSuite(caching))
     tests.addTests(DocTestSuite(factories))
     tests.addTests(DocTestSuite(forms))
+    tests.addTests(DocTestSuite(ical))
+    tests.addTests(DocTestSuite(idempotency))
+    tests.addTests(DocTestSuite(jobs))
+    tests.addTests(DocTestSuite(models))
+    tests.addTests(DocTestSuite(quotas))
+    tests.addTests(DocTestSuite(recurrence))
+    tests.addTests(DocTestSuite(repacking))
+    tests.addTests(DocTestSuite(routers))
+    tests.addTests(DocTestSuite(scheduling))
+    tests.addTests(DocTestSuite(signals))
+    tests.addTests(DocTestSuite(statistics))
     tests.addTests(DocTestSuite(tables))
     tests.addTests(DocTestSuite(category_tools))
     tests.addTests(DocTestSuite(calendar_tools))
+    tests.addTests(DocTestSuite(form_tools))
+    tests.addTests(DocTestSuite(user_tools))
     tests.addTests(DocTestSuite(views))
+    tests.addTests(DocTestSuite(waiting))
+    tests.addTests(DocTestSuite(writes))
     return tests
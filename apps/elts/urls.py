@@ -9,21 +9,39 @@ URL                             POST     GET    PUT      DELETE
                                 (create) (read) (update) (delete)
 =============================== ======== ====== ======== ========
 ``/``                                    *
+``allocated-lend/``             *
+``allocated-lend/create-form/``          *
 ``calendar/``                            *
+``calendar/events/``                     *
+``calendar/tag/<id>.ics``                *
+``calendar/user/<id>.ics``               *
+``capacity/``                            *
 ``category/``                   *
 ``category/create-form/``                *
 ``category/<id>/``                       *      *        *
 ``category/<id>/update-form``            *
 ``category/<id>/delete-form``            *
 ``item/``                       *        *
+``item/check-in/``              *
 ``item/create-form/``                    *
 ``item/<id>/``                           *      *        *
+``item/<id>/check-in/``         *
+``item/<id>/check-out/``        *
 ``item/<id>/delete-form/``               *
 ``item/<id>/update-form/``               *
 ``item-note/``                  *
 ``item-note/<id>/``                             *        *
 ``item-note/<id>/delete-form/``          *
 ``item-note/<id>/update-form/``          *
+``kit/``                        *        *
+``kit/create-form/``                     *
+``kit/<id>/``                            *      *        *
+``kit/<id>/delete-form/``                *
+``kit/<id>/update-form/``                *
+``kit-lend/``                   *
+``kit-lend/create-form/``                *
+``kit-lend/<id>/``                       *               *
+``lateness/``                            *
 ``lend/``                       *        *
 ``lend/create-form/``                    *
 ``lend/<id>/``                           *      *        *
@@ -34,11 +52,18 @@ URL                             POST     GET    PUT      DELETE
 ``lend-note/<id>/delete-form/``          *
 ``lend-note/<id>/update-form/``          *
 ``login/``                      *        *               *
+``recurring-lend/``             *
+``recurring-lend/create-form/``          *
 ``tag/``                        *        *
 ``tag/create-form/``                     *
 ``tag/<id>/                              *      *        *
 ``tag/<id>/delete-form/``                *
 ``tag/<id>/update-form/``                *
+``timeline/``                            *
+``utilization/``                         *
+``waitlist/``                   *        *
+``waitlist/create-form/``                *
+``waitlist/<id>/``                                       *
 =============================== ======== ====== ======== ========
 
 Web browsers only support ``POST`` and ``GET`` operations; ``PUT`` and
@@ -67,21 +92,39 @@ from django.conf.urls import patterns, url
 urlpatterns = patterns( # pylint: disable=C0103
     'elts.views',
     url(r'^$',                             'index'),
+    url(r'^allocated-lend/$',              'allocated_lend'),
+    url(r'^allocated-lend/create-form/$',  'allocated_lend_create_form'),
     url(r'^calendar/$',                    'calendar'),
+    url(r'^calendar/events/$',             'calendar_events'),
+    url(r'^calendar/tag/(\d+)\.ics$',     'calendar_tag_id'),
+    url(r'^calendar/user/(\d+)\.ics$',    'calendar_user_id'),
+    url(r'^capacity/$',                    'capacity'),
     url(r'^category/$',                    'category'),
     url(r'^category/create-form/$',        'category_create_form'),
     url(r'^category/(\d+)/$',              'category_id'),
     url(r'^category/(\d+)/update-form/$',  'category_id_update_form'),
     url(r'^category/(\d+)/delete-form/$',  'category_id_delete_form'),
     url(r'^item/$',                        'item'),
+    url(r'^item/check-in/$',               'item_check_in'),
     url(r'^item/create-form/$',            'item_create_form'),
     url(r'^item/(\d+)/$',                  'item_id'),
+    url(r'^item/(\d+)/check-in/$',         'item_id_check_in'),
+    url(r'^item/(\d+)/check-out/$',        'item_id_check_out'),
     url(r'^item/(\d+)/delete-form/$',      'item_id_delete_form'),
     url(r'^item/(\d+)/update-form/$',      'item_id_update_form'),
     url(r'^item-note/$',                   'item_note'),
     url(r'^item-note/(\d+)/$',             'item_note_id'),
     url(r'^item-note/(\d+)/delete-form/$', 'item_note_id_delete_form'),
     url(r'^item-note/(\d+)/update-form/$', 'item_note_id_update_form'),
+    url(r'^kit/$',                         'kit'),
+    url(r'^kit/create-form/$',             'kit_create_form'),
+    url(r'^kit/(\d+)/$',                   'kit_id'),
+    url(r'^kit/(\d+)/delete-form/$',       'kit_id_delete_form'),
+    url(r'^kit/(\d+)/update-form/$',       'kit_id_update_form'),
+    url(r'^kit-lend/$',                    'kit_lend'),
+    url(r'^kit-lend/create-form/$',        'kit_lend_create_form'),
+    url(r'^kit-lend/(\d+)/$',              'kit_lend_id'),
+    url(r'^lateness/$',                    'lateness'),
     url(r'^lend/$',                        'lend'),
     url(r'^lend/create-form/$',            'lend_create_form'),
     url(r'^lend/(\d+)/$',                  'lend_id'),
@@ -92,9 +135,16 @@ urlpatterns = patterns( # pylint: disable=C0103
     url(r'^lend-note/(\d+)/delete-form/$', 'lend_note_id_delete_form'),
     url(r'^lend-note/(\d+)/update-form/$', 'lend_note_id_update_form'),
     url(r'^login/$',                       'login'),
+    url(r'^recurring-lend/$',              'recurring_lend'),
+    url(r'^recurring-lend/create-form/$',  'recurring_lend_create_form'),
     url(r'^tag/$',                         'tag'),
     url(r'^tag/create-form/$',             'tag_create_form'),
     url(r'^tag/(\d+)/$',                   'tag_id'),
     url(r'^tag/(\d+)/delete-form/$',       'tag_id_delete_form'),
     url(r'^tag/(\d+)/update-form/$',       'tag_id_update_form'),
+    url(r'^timeline/$',                    'timeline'),
+    url(r'^utilization/$',                 'utilization'),
+    url(r'^waitlist/$',                    'waitlist'),
+    url(r'^waitlist/create-form/$',        'waitlist_create_form'),
+    url(r'^waitlist/(\d+)/$',              'waitlist_id'),
 )
@@ -36,16 +36,43 @@ normal template that is intended to be included in other templates with an
 
 """
 from calendar import Calendar, day_name
-from datetime import date
+from copy import copy
+from datetime import date, datetime, time, timedelta
 from django import http
 from django.contrib import auth
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.contrib.auth.views import redirect_to_login
 from django.core.exceptions import NON_FIELD_ERRORS
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.urlresolvers import reverse
+from django.db.models import ProtectedError, Q
 from django.shortcuts import render
+from django.template.response import TemplateResponse
+from django.utils import dateparse, timezone
+from django.utils.encoding import force_text
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 from django_tables2 import RequestConfig
-from elts import forms, models, tables
+from elts import (
+    analytics,
+    caching,
+    forms,
+    ical,
+    idempotency,
+    lending,
+    models,
+    signals,
+    statistics,
+    tables,
+    waiting,
+    writes,
+)
 from elts.templatetags import category_tools
+from itertools import groupby
+import csv
 import json
 
 # pylint: disable=E1101
@@ -53,12 +80,31 @@ import json
 # Instance of 'ItemForm' has no 'save' member (no-member)
 # Class 'Item' has no 'objects' member (no-member)
 
+# The ways in which ``calendar`` can show days.
+_CALENDAR_VIEWS = ('month', 'week', 'range')
+
+# How many items ``timeline`` shows per page.
+_TIMELINE_PAGE_SIZE = 50
+
+# The most days that a calendar may show or that ``calendar_events`` may return
+# at once.
+_CALENDAR_MAX_DAYS = 366
+
 @login_required
 def index(request):
     """Handle a request for ``/``."""
     def get_handler():
-        """Return a summary of information about ELTS."""
-        return render(request, 'elts/index.html', {})
+        """Return a summary of what is happening today.
+
+        List items that are lent out, due out today, due back today and
+        overdue.
+
+        """
+        return render(
+            request,
+            'elts/index.html',
+            _current_events(date.today())
+        )
 
     return {
         'GET': get_handler,
@@ -71,23 +117,427 @@ def index(request):
 def calendar(request):
     """Handle a request for ``calendar/``."""
     def get_handler():
-        """Show items going out and coming back during some month.
+        """Show items going out and coming back during some window of days.
+
+        The ``view`` query string argument may be ``month``, ``week`` or
+        ``range``. A month or week view shows the month or week containing the
+        ``start`` argument, which is a date such as ``2014-03-31``. A range
+        view shows the days from ``start`` to ``end``, which may span several
+        months. By default, the current month is shown.
 
-        By default, show the current month.
+        The lends shown are found with a single query. The page also carries
+        them as JSON, so that ``elts/calendar.js`` can move between windows
+        and only fetch the days it has not seen from ``calendar/events/``.
 
         """
-        # TODO: allow users to decide which day starts the week.
-        month_offset = _convert_to_int(request.GET.get('month_offset', 0))
-        target_date = _increment_month(date.today(), month_offset)
-        day_names = [day_name[day_num] for day_num in Calendar().iterweekdays()]
+        view = request.GET.get('view', 'month')
+        if view not in _CALENDAR_VIEWS:
+            view = 'month'
+        start = _parse_date(request.GET.get('start'), date.today())
+        end = _parse_date(request.GET.get('end'), start)
+        first, last = _calendar_window(view, start, end)
+        if (last - first).days >= _CALENDAR_MAX_DAYS:
+            return http.HttpResponseBadRequest('window is too long')
+
+        events = _calendar_events(first, last)
+        days = []
+        for offset in range((last - first).days + 1):
+            day = first + timedelta(days = offset)
+            days.append({'date': day, 'due_out': [], 'due_back': []})
+        for event in events:
+            days[(event['date'] - first).days][event['kind']].append(
+                dict(event, url = _calendar_url(event))
+            )
         return render(
             request,
             'elts/calendar.html',
             {
-                'prev_month': month_offset - 1,
-                'next_month': month_offset + 1,
-                'target_date': target_date,
-                'day_names': day_names
+                'view': view,
+                'first': first,
+                'last': last,
+                'prev': _calendar_shift(view, first, last, -1),
+                'next': _calendar_shift(view, first, last, 1),
+                'today': _calendar_window(
+                    view,
+                    date.today(),
+                    date.today() + (last - first)
+                ),
+                'days': days,
+                'events_json': _calendar_json(events),
+                'day_names': [
+                    day_name[day_num] for day_num in Calendar().iterweekdays()
+                ],
+            }
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def calendar_events(request):
+    """Handle a request for ``calendar/events/``."""
+    def get_handler():
+        """Return the lends due out or due back in some window as JSON.
+
+        The window is given by the ``start`` and ``end`` query string
+        arguments, which are dates such as ``2014-03-31``. Both are required,
+        and both days are included in the window. Each lend due out or due
+        back in the window is listed once per event.
+
+        The events for a window are cached until a lend changes, and the ETag
+        header is derived from the same version, so a client may ask for a
+        window it has seen before without the database being touched.
+
+        """
+        start = _parse_date(request.GET.get('start'), None)
+        end = _parse_date(request.GET.get('end'), None)
+        if start is None or end is None:
+            return http.HttpResponseBadRequest('start and end are required')
+        if start > end:
+            return http.HttpResponseBadRequest('start is after end')
+        if (end - start).days >= _CALENDAR_MAX_DAYS:
+            return http.HttpResponseBadRequest('window is too long')
+        etag = 'calendar:{}:{}:{}'.format(
+            start,
+            end,
+            caching.get_version(signals.LENDS_VERSION)
+        )
+
+        @condition(etag_func = lambda request: etag)
+        def respond(request):
+            """Return the events."""
+            return http.HttpResponse(
+                _calendar_json(_calendar_events(start, end), start, end),
+                content_type = 'application/json'
+            )
+
+        return respond(request)
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+def calendar_user_id(request, user_id_):
+    """Handle a request for ``calendar/user/<id>.ics``.
+
+    Calendar clients cannot log in, so a ``token`` query string argument is
+    accepted in place of a session. See ``elts.ical``.
+
+    """
+    if not _may_read_feed(request, ical.feed_name('user', user_id_)):
+        return _feed_denied(request)
+    try:
+        user = User.objects.get(id = user_id_)
+    except User.DoesNotExist:
+        raise http.Http404
+
+    def get_handler():
+        """Return user ``user_id_``'s lends as an iCalendar feed."""
+        return _feed_response(
+            request,
+            u'Lends to {}'.format(user),
+            'user-{}.ics'.format(user.id),
+            False,
+            user_id = user,
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+def calendar_tag_id(request, tag_id_):
+    """Handle a request for ``calendar/tag/<id>.ics``.
+
+    Calendar clients cannot log in, so a ``token`` query string argument is
+    accepted in place of a session. See ``elts.ical``.
+
+    """
+    if not _may_read_feed(request, ical.feed_name('tag', tag_id_)):
+        return _feed_denied(request)
+    try:
+        tag_ = models.Tag.objects.get(id = tag_id_)
+    except models.Tag.DoesNotExist:
+        raise http.Http404
+
+    def get_handler():
+        """Return the lends of items with tag ``tag_id_`` as an iCalendar
+        feed."""
+        return _feed_response(
+            request,
+            u'Lends of {}'.format(tag_),
+            'tag-{}.ics'.format(tag_.id),
+            True,
+            item_id__tags = tag_,
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def utilization(request):
+    """Handle a request for ``utilization/``."""
+    def get_handler():
+        """Show how much of some window items, tags and categories were used.
+
+        The window is given by the ``start`` and ``end`` query string arguments,
+        which are dates such as ``2014-03-31``. Both dates are included in the
+        window. By default, the window is the last 30 days, including today.
+
+        Items are in use while they are lent out. The ``kind`` argument may
+        instead be ``reserved`` or ``demand``, as described in
+        ``elts.analytics``. If ``format=csv`` is given, the report is returned
+        as a CSV document instead of a web page.
+
+        """
+        end = _parse_date(request.GET.get('end'), date.today())
+        start = _parse_date(
+            request.GET.get('start'),
+            end - timedelta(days = 29)
+        )
+        if start > end:
+            return http.HttpResponseBadRequest('start is after end')
+        kind = request.GET.get('kind', 'lent')
+        if kind not in analytics.KINDS:
+            kind = 'lent'
+
+        report = analytics.utilization(
+            kind,
+            analytics.to_time(start),
+            analytics.to_time(end + timedelta(days = 1))
+        )
+        for scope, rows in report.items():
+            report[scope] = [
+                (
+                    obj,
+                    used / 3600.0,
+                    available / 3600.0,
+                    _percent(used, available)
+                )
+                for obj, used, available in rows
+            ]
+        if request.GET.get('format') == 'csv':
+            return _utilization_csv(report, kind, start, end)
+        report.update({'kind': kind, 'start': start, 'end': end})
+        return render(request, 'elts/utilization.html', report)
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def capacity(request):
+    """Handle a request for ``capacity/``."""
+    def get_handler():
+        """Show how many items with each tag were in demand at once.
+
+        By default, consider every lend ever made. The ``start`` and ``end``
+        query string arguments may narrow the window, as for ``utilization``.
+        If ``tag`` is given, show only the tag with that ID, along with a
+        timeline of its demand.
+
+        If ``format=json`` is given, return the report as a JSON document. Each
+        tag's timeline is included.
+
+        """
+        start = _parse_date(request.GET.get('start'), None)
+        end = _parse_date(request.GET.get('end'), None)
+        if start is not None and end is not None and start > end:
+            return http.HttpResponseBadRequest('start is after end')
+        report = analytics.capacity(
+            None if start is None else analytics.to_time(start),
+            None if end is None else analytics.to_time(
+                end + timedelta(days = 1)
+            )
+        )
+        tag_id = _convert_to_int(request.GET.get('tag', 0))
+        if tag_id:
+            report = [row for row in report if row['tag'].id == tag_id]
+        for row in report:
+            if row['peak_at'] is not None:
+                row['peak_at'] = analytics.to_datetime(row['peak_at'])
+            row['timeline'] = [
+                (analytics.to_datetime(time_), demand)
+                for time_, demand in row['timeline']
+            ]
+
+        if request.GET.get('format') == 'json':
+            return http.HttpResponse(
+                json.dumps(
+                    {
+                        'start': start,
+                        'end': end,
+                        'tags': [
+                            dict(
+                                row,
+                                tag = row['tag'].id,
+                                name = row['tag'].name
+                            )
+                            for row in report
+                        ],
+                    },
+                    cls = DjangoJSONEncoder
+                ),
+                content_type = 'application/json'
+            )
+        return render(
+            request,
+            'elts/capacity.html',
+            {'start': start, 'end': end, 'tag_id': tag_id, 'tags': report}
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def lateness(request):
+    """Handle a request for ``lateness/``."""
+    def get_handler():
+        """Show how late items are picked up or returned.
+
+        By default, show how late each user returns items. The ``kind``
+        argument may be ``pickup`` or ``return``, and the ``scope`` argument may
+        be ``user``, ``item`` or ``tag``. See ``elts.statistics``.
+
+        """
+        kind = request.GET.get('kind', 'return')
+        if kind not in statistics.KINDS:
+            kind = 'return'
+        scope = request.GET.get('scope', 'user')
+        if scope not in ('user', 'item', 'tag'):
+            scope = 'user'
+        return render(
+            request,
+            'elts/lateness.html',
+            {
+                'kind': kind,
+                'scope': scope,
+                'percentiles': statistics.PERCENTILES,
+                'bin_names': statistics.BIN_NAMES,
+                'rows': [
+                    (
+                        obj,
+                        summary['count'],
+                        summary['late'],
+                        [delay / 3600.0 for delay in summary['percentiles']],
+                        summary['histogram'],
+                    )
+                    for obj, summary in statistics.lateness(kind, scope)
+                ],
+            }
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def timeline(request):
+    """Handle a request for ``timeline/``."""
+    def get_handler():
+        """Show each item's reservations and lends as bars across some window.
+
+        The window is given by the ``start`` and ``end`` query string
+        arguments, which are dates such as ``2014-03-31``. Both dates are
+        included. By default, the window runs from a week ago to a month from
+        now. The ``item`` or ``tag`` argument may give the ID of an item or tag
+        to show. Otherwise, all items are shown.
+
+        Items are shown a page at a time, and the ``page`` argument picks the
+        page. The lends of a page's items are found with a single query, ordered
+        by item. If ``format=json`` is given, the page is returned as a JSON
+        document instead of a web page.
+
+        """
+        end = _parse_date(
+            request.GET.get('end'),
+            date.today() + timedelta(days = 30)
+        )
+        start = _parse_date(
+            request.GET.get('start'),
+            min(end, date.today() - timedelta(days = 7))
+        )
+        if start > end:
+            return http.HttpResponseBadRequest('start is after end')
+        items = models.Item.objects.order_by('name', 'id')
+        item_id_ = _convert_to_int(request.GET.get('item', 0))
+        tag_id_ = _convert_to_int(request.GET.get('tag', 0))
+        if item_id_:
+            items = items.filter(id = item_id_)
+        elif tag_id_:
+            items = items.filter(tags = tag_id_)
+        try:
+            page = Paginator(items, _TIMELINE_PAGE_SIZE).page(
+                request.GET.get('page', 1)
+            )
+        except (EmptyPage, PageNotAnInteger):
+            raise http.Http404
+
+        rows = _timeline_rows(list(page.object_list), start, end)
+        if request.GET.get('format') == 'json':
+            return http.HttpResponse(
+                json.dumps(
+                    {
+                        'start': start,
+                        'end': end,
+                        'page': page.number,
+                        'pages': page.paginator.num_pages,
+                        'items': [
+                            {
+                                'id': item.id,
+                                'name': item.name,
+                                'intervals': [
+                                    {
+                                        'lend': bar['lend'],
+                                        'kind': bar['kind'],
+                                        'start': bar['start'],
+                                        'end': bar['end'],
+                                        'user': bar['user'].username,
+                                    }
+                                    for bar in bars
+                                ],
+                            }
+                            for item, bars in rows
+                        ],
+                    },
+                    cls = DjangoJSONEncoder
+                ),
+                content_type = 'application/json'
+            )
+        return render(
+            request,
+            'elts/timeline.html',
+            {
+                'start': start,
+                'end': end,
+                'item_id': item_id_,
+                'tag_id': tag_id_,
+                'tags': models.Tag.objects.order_by('name'),
+                'page': page,
+                'rows': rows,
             }
         )
 
@@ -101,11 +551,12 @@ def calendar(request):
 @login_required
 def category(request):
     """Handle a request for ``category/``."""
+    @writes.serialized
     def post_handler():
         """Create a new category.
 
         If creation suceeds, redirect user to ``category_id`` view. Otherwise,
-        redirect uesr to ``category_create_form`` view.
+        show the user the category creation form and the errors in it.
 
         """
         form = forms.CategoryForm(request.POST)
@@ -119,9 +570,10 @@ def category(request):
                 reverse('elts.views.category_id', args = [new_category.id])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse('elts.views.category_create_form')
+            return _invalid_form_response(
+                request,
+                'elts/category-create-form.html',
+                {'form': form}
             )
 
     return {
@@ -136,12 +588,11 @@ def category_create_form(request):
     """Handle a request for ``category/create-form/``."""
     def get_handler():
         """Return a form for creating a category."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.CategoryForm()
-        else:
-            form = forms.CategoryForm(json.loads(form_data))
-        return render(request, 'elts/category-create-form.html', {'form': form})
+        return render(
+            request,
+            'elts/category-create-form.html',
+            {'form': forms.CategoryForm()}
+        )
 
     return {
         'GET': get_handler,
@@ -172,28 +623,29 @@ def category_id(request, category_id_):
             }
         )
 
+    @writes.serialized
     def put_handler():
         """Update category ``category_id_``.
 
         If update succeeds, redirect user to ``category_id`` view. Otherwise,
-        redirect user to ``category_id_update_form``.
+        show the user the category update form and the errors in it.
 
         """
-        form = forms.CategoryForm(request.POST, instance = category_)
-        if form.is_valid():
-            form.save()
+        # Validating a form changes its instance. Leave ``category_`` untouched
+        # in case the form is shown again.
+        form = forms.CategoryForm(request.POST, instance = copy(category_))
+        if form.is_valid() and form.save() is not None:
             return http.HttpResponseRedirect(
                 reverse('elts.views.category_id', args = [category_id_])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse(
-                    'elts.views.category_id_update_form',
-                    args = [category_id_]
-                )
+            return _invalid_form_response(
+                request,
+                'elts/category-id-update-form.html',
+                {'category': category_, 'form': form}
             )
 
+    @writes.serialized
     def delete_handler():
         """Delete category ``category_id_``.
 
@@ -222,15 +674,13 @@ def category_id_update_form(request, category_id_):
 
     def get_handler():
         """Return a form for updating category ``category_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.CategoryForm(instance = category_)
-        else:
-            form = forms.CategoryForm(json.loads(form_data))
         return render(
             request,
             'elts/category-id-update-form.html',
-            {'category': category_, 'form': form}
+            {
+                'category': category_,
+                'form': forms.CategoryForm(instance = category_),
+            }
         )
 
     return {
@@ -264,13 +714,15 @@ def category_id_delete_form(request, category_id_):
     )()
 
 @login_required
+@idempotency.idempotent
 def item(request):
     """Handle a request for ``item/``."""
+    @writes.serialized
     def post_handler():
         """Create a new item.
 
         If creation succeeds, redirect user to ``item_id`` view. Otherwise,
-        redirect user to ``item_create_form`` view.
+        show the user the item creation form and the errors in it.
 
         """
         form = forms.ItemForm(request.POST)
@@ -280,10 +732,10 @@ def item(request):
                 reverse('elts.views.item_id', args = [new_item.id])
             )
         else:
-            # Put ``form`` into session for retreival by ``item_create_form``.
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse('elts.views.item_create_form')
+            return _invalid_form_response(
+                request,
+                'elts/item-create-form.html',
+                {'form': form}
             )
 
     def get_handler():
@@ -308,17 +760,57 @@ def item(request):
         _http_405
     )()
 
+@login_required
+@idempotency.idempotent
+def item_check_in(request):
+    """Handle a request for ``item/check-in/``."""
+    @writes.serialized
+    def post_handler():
+        """Check in many items now, and return what was checked in as JSON.
+
+        Items are given by any number of ``item_id`` and ``lend_id`` arguments.
+        Every lend which has one of the items out, and every given lend which
+        is out, is checked in. See ``lending.check_in_many``.
+
+        The response is an object. Its ``items`` member maps the ID of each
+        item to the IDs of the lends checked in for it, which are none if the
+        item was not out. Its ``lends_not_out`` member lists the given lends
+        which were not out.
+
+        """
+        item_ids = _posted_ids(request, 'item_id')
+        lend_ids = _posted_ids(request, 'lend_id')
+        results = lending.check_in_many(timezone.now(), item_ids, lend_ids)
+        checked_in = set(
+            lend_id
+            for lend_ids_ in results.values()
+            for lend_id in lend_ids_
+        )
+        return http.HttpResponse(
+            json.dumps({
+                'items': results,
+                'lends_not_out': sorted(set(lend_ids) - checked_in),
+            }),
+            content_type = 'application/json'
+        )
+
+    return {
+        'POST': post_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
 @login_required
 def item_create_form(request):
     """Handle a request for ``item/create-form/``."""
     def get_handler():
         """Return a form for creating an item."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.ItemForm()
-        else:
-            form = forms.ItemForm(json.loads(form_data))
-        return render(request, 'elts/item-create-form.html', {'form': form})
+        return render(
+            request,
+            'elts/item-create-form.html',
+            {'form': forms.ItemForm()}
+        )
 
     return {
         'GET': get_handler,
@@ -337,43 +829,44 @@ def item_id(request, item_id_):
 
     def get_handler():
         """Return information about item ``item_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.ItemNoteForm()
-        else:
-            form = forms.ItemNoteForm(json.loads(form_data))
         return render(
             request,
             'elts/item-id.html',
-            {'item': item_, 'form': form}
+            {'item': item_, 'form': forms.ItemNoteForm()}
         )
 
+    @writes.serialized
     def put_handler():
         """Update item ``item_id_``.
 
         If update succeeds, redirect user to ``item_id`` view. Otherwise,
-        redirect user to ``item_id_update_form``.
+        show the user the item update form and the errors in it.
 
         """
-        form = forms.ItemForm(request.POST, instance = item_)
-        if form.is_valid():
-            form.save()
+        # Validating a form changes its instance. Leave ``item_`` untouched in
+        # case the form is shown again.
+        form = forms.ItemForm(request.POST, instance = copy(item_))
+        if form.is_valid() and form.save() is not None:
             return http.HttpResponseRedirect(
                 reverse('elts.views.item_id', args = [item_id_])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse('elts.views.item_id_update_form', args = [item_id_])
+            return _invalid_form_response(
+                request,
+                'elts/item-id-update-form.html',
+                {'item': item_, 'form': form}
             )
 
+    @writes.serialized
     def delete_handler():
         """Delete item ``item_id_``.
 
         After delete, redirect user to ``item`` view.
 
         """
-        item_.delete()
+        # Deleting the item's lends promotes whoever is waiting for it.
+        with writes.items_locked([item_.id]):
+            item_.delete()
         return http.HttpResponseRedirect(reverse('elts.views.item'))
 
     return {
@@ -395,15 +888,10 @@ def item_id_update_form(request, item_id_):
 
     def get_handler():
         """Return a form for updating item ``item_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.ItemForm(instance = item_)
-        else:
-            form = forms.ItemForm(json.loads(form_data))
         return render(
             request,
             'elts/item-id-update-form.html',
-            {'item': item_, 'form': form}
+            {'item': item_, 'form': forms.ItemForm(instance = item_)}
         )
 
     return {
@@ -432,14 +920,90 @@ def item_id_delete_form(request, item_id_):
         _http_405
     )()
 
+@login_required
+@idempotency.idempotent
+def item_id_check_out(request, item_id_):
+    """Handle a request for ``item/<id>/check-out/``."""
+    try:
+        item_ = models.Item.objects.get(id = item_id_)
+    except models.Item.DoesNotExist:
+        raise http.Http404
+
+    @writes.serialized
+    def post_handler():
+        """Check out item ``item_id_`` now, as it was reserved for today.
+
+        If ``user_id`` is posted, only that user's reservations are checked
+        out. If check-out succeeds, redirect user to ``lend_id`` view.
+        Otherwise, tell the user why, with a 422 status code if the item is not
+        reserved for today, or 409 if someone else has it out or the borrower
+        has as many items out as they may. See ``elts.lending``.
+
+        """
+        user_id = request.POST.get('user_id')
+        try:
+            lend_ = lending.check_out(
+                item_,
+                timezone.now(),
+                None if user_id is None else _convert_to_int(user_id)
+            )
+        except LookupError as error:
+            return _text_response(error, 422)
+        except lending.Unavailable as error:
+            return _text_response(error, 409)
+        return http.HttpResponseRedirect(
+            reverse('elts.views.lend_id', args = [lend_.id])
+        )
+
+    return {
+        'POST': post_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+@idempotency.idempotent
+def item_id_check_in(request, item_id_):
+    """Handle a request for ``item/<id>/check-in/``."""
+    try:
+        item_ = models.Item.objects.get(id = item_id_)
+    except models.Item.DoesNotExist:
+        raise http.Http404
+
+    @writes.serialized
+    def post_handler():
+        """Check in item ``item_id_`` now.
+
+        If check-in succeeds, redirect user to ``lend_id`` view. Otherwise,
+        tell the user that the item is not out, with a 422 status code. See
+        ``elts.lending``.
+
+        """
+        try:
+            lend_ = lending.check_in(item_, timezone.now())
+        except LookupError as error:
+            return _text_response(error, 422)
+        return http.HttpResponseRedirect(
+            reverse('elts.views.lend_id', args = [lend_.id])
+        )
+
+    return {
+        'POST': post_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
 @login_required
 def tag(request):
     """Handle a request for ``tag/``."""
+    @writes.serialized
     def post_handler():
         """Create a tag.
 
         If creation succeeds, redirect user to ``tag_id`` view. Otherwise,
-        redirect user to ``tag_create_form`` view.
+        show the user the tag creation form and the errors in it.
 
         """
         form = forms.TagForm(request.POST)
@@ -449,9 +1013,10 @@ def tag(request):
                 reverse('elts.views.tag_id', args = [new_tag.id])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse('elts.views.tag_create_form')
+            return _invalid_form_response(
+                request,
+                'elts/tag-create-form.html',
+                {'form': form}
             )
 
     def get_handler():
@@ -488,28 +1053,29 @@ def tag_id(request, tag_id_):
         """Return information about tag ``tag_id_``."""
         return render(request, 'elts/tag-id.html', {'tag': tag_})
 
+    @writes.serialized
     def put_handler():
         """Update tag ``tag_id_``.
 
         If update succeeds, redirect user to ``tag_id`` view. Otherwise,
-        redirect user to ``update_form`` view.
+        show the user the tag update form and the errors in it.
 
         """
-        form = forms.TagForm(request.POST, instance = tag_)
-        if form.is_valid():
-            form.save()
+        # Validating a form changes its instance. Leave ``tag_`` untouched in
+        # case the form is shown again.
+        form = forms.TagForm(request.POST, instance = copy(tag_))
+        if form.is_valid() and form.save() is not None:
             return http.HttpResponseRedirect(
                 reverse('elts.views.tag_id', args = [tag_id_])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse(
-                    'elts.views.tag_id_update_form',
-                    args = [tag_id_]
-                )
+            return _invalid_form_response(
+                request,
+                'elts/tag-id-update-form.html',
+                {'tag': tag_, 'form': form}
             )
 
+    @writes.serialized
     def delete_handler():
         """Delete tag ``tag_id_``.
 
@@ -533,12 +1099,11 @@ def tag_create_form(request):
     """Handle a request for ``tag/create-form/``."""
     def get_handler():
         """Return a form for creating a new tag."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.TagForm()
-        else:
-            form = forms.TagForm(json.loads(form_data))
-        return render(request, 'elts/tag-create-form.html', {'form': form})
+        return render(
+            request,
+            'elts/tag-create-form.html',
+            {'form': forms.TagForm()}
+        )
 
     return {
         'GET': get_handler,
@@ -557,15 +1122,10 @@ def tag_id_update_form(request, tag_id_):
 
     def get_handler():
         """Return a form for updating tag ``tag_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.TagForm(instance = tag_)
-        else:
-            form = forms.TagForm(json.loads(form_data))
         return render(
             request,
             'elts/tag-id-update-form.html',
-            {'tag': tag_, 'form': form}
+            {'tag': tag_, 'form': forms.TagForm(instance = tag_)}
         )
 
     return {
@@ -595,36 +1155,214 @@ def tag_id_delete_form(request, tag_id_):
     )()
 
 @login_required
-def item_note(request):
-    """Handle a request for ``item-note/``."""
+def kit(request):
+    """Handle a request for ``kit/``."""
+    @writes.serialized
     def post_handler():
-        """Create a new item note.
+        """Create a kit.
 
-        Redirect user to ``item_id`` view after handling request.
+        If creation succeeds, redirect user to ``kit_id`` view. Otherwise,
+        show the user the kit creation form and the errors in it.
 
         """
-        # For which item is this note being created?
-        try:
-            item_ = models.Item.objects.get(
-                id = request.POST.get('item_id', None)
-            )
-        except models.Item.DoesNotExist:
-            return http.HttpResponse(status = 422)
-
-        # Get note text and, if valid, save the note.
-        form = forms.ItemNoteForm(request.POST)
+        form = forms.KitForm(request.POST)
         if form.is_valid():
-            models.ItemNote(
-                note_text = form.cleaned_data['note_text'],
-                author_id = request.user,
-                item_id = item_,
-            ).save()
+            new_kit = form.save()
+            return http.HttpResponseRedirect(
+                reverse('elts.views.kit_id', args = [new_kit.id])
+            )
         else:
-            request.session['form_data'] = json.dumps(form.data)
+            return _invalid_form_response(
+                request,
+                'elts/kit-create-form.html',
+                {'form': form}
+            )
 
-        # Return the user to this page whether or not the note was saved.
-        return http.HttpResponseRedirect(
-            reverse('elts.views.item_id', args = [item_.id])
+    def get_handler():
+        """Return information about all kits."""
+        table = tables.KitTable(models.Kit.objects.all())
+        RequestConfig(request).configure(table)
+        return render(
+            request,
+            'elts/kit.html',
+            {'table': table, 'request': request}
+        )
+
+    return {
+        'POST': post_handler,
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def kit_id(request, kit_id_):
+    """Handle a request for ``kit/<id>/``."""
+    try:
+        kit_ = models.Kit.objects.get(id = kit_id_)
+    except models.Kit.DoesNotExist:
+        raise http.Http404
+
+    def get_handler():
+        """Return information about kit ``kit_id_``."""
+        return render(
+            request,
+            'elts/kit-id.html',
+            {
+                'kit': kit_,
+                'items': kit_.items.order_by('name'),
+                'kit_lends': kit_.kitlend_set.filter(
+                    Q(due_back__isnull = True)
+                    | Q(due_back__gte = date.today())
+                ).select_related('user_id').order_by('due_out', 'id'),
+            }
+        )
+
+    @writes.serialized
+    def put_handler():
+        """Update kit ``kit_id_``.
+
+        If update succeeds, redirect user to ``kit_id`` view. Otherwise,
+        show the user the kit update form and the errors in it.
+
+        """
+        # Validating a form changes its instance. Leave ``kit_`` untouched in
+        # case the form is shown again.
+        form = forms.KitForm(request.POST, instance = copy(kit_))
+        if form.is_valid():
+            form.save()
+            return http.HttpResponseRedirect(
+                reverse('elts.views.kit_id', args = [kit_id_])
+            )
+        else:
+            return _invalid_form_response(
+                request,
+                'elts/kit-id-update-form.html',
+                {'kit': kit_, 'form': form}
+            )
+
+    @writes.serialized
+    def delete_handler():
+        """Delete kit ``kit_id_``.
+
+        After deletion, redirect user to ``kit`` view. A kit which has been
+        reserved is kept, and the user is told so with a 409 status code.
+
+        """
+        try:
+            kit_.delete()
+        except ProtectedError:
+            return _text_response(
+                u'{} has been reserved, so it cannot be deleted.'.format(kit_),
+                409
+            )
+        return http.HttpResponseRedirect(reverse('elts.views.kit'))
+
+    return {
+        'GET': get_handler,
+        'PUT': put_handler,
+        'DELETE': delete_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def kit_create_form(request):
+    """Handle a request for ``kit/create-form/``."""
+    def get_handler():
+        """Return a form for creating a new kit."""
+        return render(
+            request,
+            'elts/kit-create-form.html',
+            {'form': forms.KitForm()}
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def kit_id_update_form(request, kit_id_):
+    """Handle a request for ``kit/<id>/update-form/``."""
+    try:
+        kit_ = models.Kit.objects.get(id = kit_id_)
+    except models.Kit.DoesNotExist:
+        raise http.Http404
+
+    def get_handler():
+        """Return a form for updating kit ``kit_id_``."""
+        return render(
+            request,
+            'elts/kit-id-update-form.html',
+            {'kit': kit_, 'form': forms.KitForm(instance = kit_)}
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def kit_id_delete_form(request, kit_id_):
+    """Handle a request for ``kit/<id>/delete-form/``."""
+    try:
+        kit_ = models.Kit.objects.get(id = kit_id_)
+    except models.Kit.DoesNotExist:
+        raise http.Http404
+
+    def get_handler():
+        """Return a form for deleting kit ``kit_id_``."""
+        return render(request, 'elts/kit-id-delete-form.html', {'kit': kit_})
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+@idempotency.idempotent
+def item_note(request):
+    """Handle a request for ``item-note/``."""
+    @writes.serialized
+    def post_handler():
+        """Create a new item note.
+
+        If creation succeeds, redirect user to ``item_id`` view. Otherwise,
+        show the user the item and the errors in the note creation form.
+
+        """
+        # For which item is this note being created?
+        try:
+            item_ = models.Item.objects.get(
+                id = request.POST.get('item_id', None)
+            )
+        except models.Item.DoesNotExist:
+            return http.HttpResponse(status = 422)
+
+        # Get note text and, if valid, save the note.
+        form = forms.ItemNoteForm(request.POST)
+        if not form.is_valid():
+            return _invalid_form_response(
+                request,
+                'elts/item-id.html',
+                {'item': item_, 'form': form}
+            )
+        models.ItemNote(
+            note_text = form.cleaned_data['note_text'],
+            author_id = request.user,
+            item_id = item_,
+        ).save()
+        return http.HttpResponseRedirect(
+            reverse('elts.views.item_id', args = [item_.id])
         )
 
     return {
@@ -643,28 +1381,27 @@ def item_note_id(request, item_note_id_):
         raise http.Http404
     item_id_ = item_note_.item_id.id
 
+    @writes.serialized
     def put_handler():
         """Update item note ``item_note_id_``.
 
         If update succeeds, redirect user to ``item_id`` view. Otherwise,
-        redirect user to ``item_note_id_update_form`` view.
+        show the user the item note update form and the errors in it.
 
         """
         form = forms.ItemNoteForm(request.POST, instance = item_note_)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and form.save() is not None:
             return http.HttpResponseRedirect(
                 reverse('elts.views.item_id', args = [item_id_])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse(
-                    'elts.views.item_note_id_update_form',
-                    args = [item_note_id_]
-                )
+            return _invalid_form_response(
+                request,
+                'elts/item-note-id-update-form.html',
+                {'item_note': item_note_, 'form': form}
             )
 
+    @writes.serialized
     def delete_handler():
         """Delete item note ``item_note_id_``.
 
@@ -694,15 +1431,13 @@ def item_note_id_update_form(request, item_note_id_):
 
     def get_handler():
         """Return a form for updating item note ``item_note_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.ItemNoteForm(instance = item_note_)
-        else:
-            form = forms.ItemNoteForm(json.loads(form_data))
         return render(
             request,
             'elts/item-note-id-update-form.html',
-            {'item_note': item_note_, 'form': form}
+            {
+                'item_note': item_note_,
+                'form': forms.ItemNoteForm(instance = item_note_),
+            }
         )
 
     return {
@@ -736,37 +1471,57 @@ def item_note_id_delete_form(request, item_note_id_):
     )()
 
 @login_required
+@idempotency.idempotent
 def lend(request):
     """Handle a request for ``lend/``."""
+    @writes.serialized
     def post_handler():
         """Create a new item lend.
 
         If creation suceeds, redirect user to ``lend_id`` view. Otherwise,
-        redirect user to ``lend_create_form``.
+        show the user the lend creation form and the errors in it.
 
         """
         form = forms.LendForm(request.POST)
-        if form.is_valid():
-            new_lend = form.save()
+        with writes.items_locked(
+            [_posted_item_id(request)],
+            [_posted_user_id(request)]
+        ):
+            new_lend = form.save() if form.is_valid() else None
+        if new_lend is not None:
             return http.HttpResponseRedirect(
                 reverse('elts.views.lend_id', args = [new_lend.id])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse('elts.views.lend_create_form')
+            return _invalid_form_response(
+                request,
+                'elts/lend-create-form.html',
+                {'form': form}
             )
 
     def get_handler():
-        """Return information about all lends."""
-        table = tables.LendTable(models.Lend.objects.all())
+        """Return information about all lends.
+
+        The lends made by reserving a kit are shown in a table of their own,
+        with one row per kit lend rather than one per item.
+
+        """
+        table = tables.LendTable(
+            models.Lend.objects.filter(kit_lend_id__isnull = True)
+        )
         RequestConfig(request).configure(table)
+        kit_lend_table = tables.KitLendTable(
+            models.KitLend.objects.select_related('kit_id', 'user_id'),
+            prefix = 'kit-lend-',
+        )
+        RequestConfig(request).configure(kit_lend_table)
         return render(
             request,
             'elts/lend.html',
             {
                 'lends': models.Lend.objects.all(),
                 'table': table,
+                'kit_lend_table': kit_lend_table,
                 'request': request,
             }
         )
@@ -784,12 +1539,11 @@ def lend_create_form(request):
     """Handle a request for ``lend/create_form/``."""
     def get_handler():
         """Return a form for creating an lend."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.LendForm()
-        else:
-            form = forms.LendForm(json.loads(form_data))
-        return render(request, 'elts/lend-create-form.html', {'form': form})
+        return render(
+            request,
+            'elts/lend-create-form.html',
+            {'form': forms.LendForm()}
+        )
 
     return {
         'GET': get_handler,
@@ -808,43 +1562,47 @@ def lend_id(request, lend_id_):
 
     def get_handler():
         """Return information about lend ``lend_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.LendNoteForm()
-        else:
-            form = forms.LendNoteForm(json.loads(form_data))
         return render(
             request,
             'elts/lend-id.html',
-            {'lend': lend_, 'form': form}
+            {'lend': lend_, 'form': forms.LendNoteForm()}
         )
 
+    @writes.serialized
     def put_handler():
         """Update lend ``lend_id_``.
 
         If update succeeds, redirect user to ``lend_id`` view. Otherwise,
-        redirect user to ``lend_id_update_form``.
+        show the user the lend update form and the errors in it.
 
         """
         form = forms.LendForm(request.POST, instance = lend_)
-        if form.is_valid():
-            form.save()
+        with writes.items_locked(
+            [lend_.item_id_id, _posted_item_id(request)],
+            [_posted_user_id(request)]
+        ):
+            saved = form.is_valid() and form.save()
+        if saved:
             return http.HttpResponseRedirect(
                 reverse('elts.views.lend_id', args = [lend_id_])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse('elts.views.lend_id_update_form', args = [lend_id_])
+            return _invalid_form_response(
+                request,
+                'elts/lend-id-update-form.html',
+                {'lend': lend_, 'form': form}
             )
 
+    @writes.serialized
     def delete_handler():
         """Delete lend ``lend_id_``.
 
         After delete, redirect user to ``lend`` view.
 
         """
-        lend_.delete()
+        # Whoever is waiting for the item is promoted inside the delete.
+        with writes.items_locked([lend_.item_id_id]):
+            lend_.delete()
         return http.HttpResponseRedirect(reverse('elts.views.lend'))
 
     return {
@@ -866,15 +1624,10 @@ def lend_id_update_form(request, lend_id_):
 
     def get_handler():
         """Return a form for updating lend ``lend_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.LendForm(instance = lend_)
-        else:
-            form = forms.LendForm(json.loads(form_data))
         return render(
             request,
             'elts/lend-id-update-form.html',
-            {'lend': lend_, 'form': form}
+            {'lend': lend_, 'form': forms.LendForm(instance = lend_)}
         )
 
     return {
@@ -904,12 +1657,325 @@ def lend_id_delete_form(request, lend_id_):
     )()
 
 @login_required
+def allocated_lend(request):
+    """Handle a request for ``allocated-lend/``."""
+    @writes.serialized
+    def post_handler():
+        """Reserve whichever item with some tag fits the reservation best.
+
+        If an item is free, reserve it and redirect the user to the
+        ``lend_id`` view. Otherwise, show the user the form and the errors in
+        it.
+
+        """
+        form = forms.AllocatedLendForm(request.user, request.POST)
+        with writes.items_locked(form.candidate_ids()):
+            new_lend = form.save() if form.is_valid() else None
+        if new_lend is not None:
+            return http.HttpResponseRedirect(
+                reverse('elts.views.lend_id', args = [new_lend.id])
+            )
+        else:
+            return _invalid_form_response(
+                request,
+                'elts/allocated-lend-create-form.html',
+                {'form': form}
+            )
+
+    return {
+        'POST': post_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def allocated_lend_create_form(request):
+    """Handle a request for ``allocated-lend/create-form/``."""
+    def get_handler():
+        """Return a form for reserving any item with some tag."""
+        return render(
+            request,
+            'elts/allocated-lend-create-form.html',
+            {'form': forms.AllocatedLendForm(request.user)}
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def recurring_lend(request):
+    """Handle a request for ``recurring-lend/``."""
+    @writes.serialized
+    def post_handler():
+        """Reserve an item on the days given by a weekly rule.
+
+        If every reservation can be made, redirect the user to a timeline of
+        the item showing them. Otherwise, show the user the form and the
+        reservations that clash.
+
+        """
+        form = forms.RecurringLendForm(request.POST)
+        with writes.items_locked([_posted_item_id(request)]):
+            lends = form.save() if form.is_valid() else None
+        if lends is not None:
+            return http.HttpResponseRedirect('{}?{}'.format(
+                reverse('elts.views.timeline'),
+                urlencode({
+                    'item': form.cleaned_data['item_id'].id,
+                    'start': lends[0].due_out,
+                    'end': lends[-1].due_back,
+                })
+            ))
+        else:
+            return _invalid_form_response(
+                request,
+                'elts/recurring-lend-create-form.html',
+                {'form': form}
+            )
+
+    return {
+        'POST': post_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def recurring_lend_create_form(request):
+    """Handle a request for ``recurring-lend/create-form/``."""
+    def get_handler():
+        """Return a form for reserving an item every week or so."""
+        return render(
+            request,
+            'elts/recurring-lend-create-form.html',
+            {'form': forms.RecurringLendForm()}
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+@idempotency.idempotent
+def kit_lend(request):
+    """Handle a request for ``kit-lend/``."""
+    @writes.serialized
+    def post_handler():
+        """Reserve every item in a kit.
+
+        If every item can be reserved, redirect the user to the ``kit_lend_id``
+        view. Otherwise, show the user the form and the reservations that
+        clash.
+
+        """
+        form = forms.KitLendForm(request.POST)
+        with writes.items_locked(form.item_ids()):
+            kit_lend_ = form.save() if form.is_valid() else None
+        if kit_lend_ is not None:
+            return http.HttpResponseRedirect(
+                reverse('elts.views.kit_lend_id', args = [kit_lend_.id])
+            )
+        else:
+            return _invalid_form_response(
+                request,
+                'elts/kit-lend-create-form.html',
+                {'form': form}
+            )
+
+    return {
+        'POST': post_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def kit_lend_create_form(request):
+    """Handle a request for ``kit-lend/create-form/``."""
+    def get_handler():
+        """Return a form for reserving a kit.
+
+        The ``kit_id`` query string argument, if given, chooses the kit.
+
+        """
+        return render(
+            request,
+            'elts/kit-lend-create-form.html',
+            {'form': forms.KitLendForm(
+                initial = {'kit_id': request.GET.get('kit_id')}
+            )}
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def kit_lend_id(request, kit_lend_id_):
+    """Handle a request for ``kit-lend/<id>/``."""
+    try:
+        kit_lend_ = models.KitLend.objects.select_related(
+            'kit_id',
+            'user_id',
+        ).get(id = kit_lend_id_)
+    except models.KitLend.DoesNotExist:
+        raise http.Http404
+
+    def get_handler():
+        """Return information about kit lend ``kit_lend_id_``."""
+        return render(
+            request,
+            'elts/kit-lend-id.html',
+            {
+                'kit_lend': kit_lend_,
+                'lends': kit_lend_.lends.select_related(
+                    'item_id'
+                ).order_by('item_id__name', 'id'),
+            }
+        )
+
+    @writes.serialized
+    def delete_handler():
+        """Cancel kit lend ``kit_lend_id_``, and each of its lends.
+
+        After deletion, redirect user to ``lend`` view.
+
+        """
+        # Whoever is waiting for the items is promoted inside the delete.
+        with writes.items_locked(
+            kit_lend_.lends.values_list('item_id', flat = True)
+        ):
+            kit_lend_.delete()
+        return http.HttpResponseRedirect(reverse('elts.views.lend'))
+
+    return {
+        'GET': get_handler,
+        'DELETE': delete_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def waitlist(request):
+    """Handle a request for ``waitlist/``."""
+    @writes.serialized
+    def post_handler():
+        """Wait for an item to become free.
+
+        If the item is already free, reserve it and redirect the user to the
+        ``lend_id`` view. Otherwise, redirect the user to the ``waitlist_``
+        view. If the form is invalid, show the user the form and the errors in
+        it.
+
+        """
+        form = forms.WaitlistEntryForm(request.POST)
+        if not form.is_valid():
+            return _invalid_form_response(
+                request,
+                'elts/waitlist-create-form.html',
+                {'form': form}
+            )
+        entry = form.save()
+        promoted = waiting.promote(
+            entry.item_id_id,
+            entry.due_out,
+            entry.due_back
+        )
+        if entry.id in promoted:
+            return http.HttpResponseRedirect(reverse(
+                'elts.views.lend_id',
+                args = [promoted[entry.id].id]
+            ))
+        return http.HttpResponseRedirect(reverse('elts.views.waitlist'))
+
+    def get_handler():
+        """Return the waiting users, in the order they will be served."""
+        return render(request, 'elts/waitlist.html', {
+            'entries': models.WaitlistEntry.objects.select_related(
+                'item_id',
+                'user_id',
+            ).order_by('item_id__name', 'item_id', 'created', 'id'),
+        })
+
+    return {
+        'POST': post_handler,
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def waitlist_create_form(request):
+    """Handle a request for ``waitlist/create-form/``."""
+    def get_handler():
+        """Return a form for waiting for an item.
+
+        The form is filled in from the query string, if given. This lets a
+        rejected reservation be turned into a waitlist entry.
+
+        """
+        initial = dict(
+            (name, request.GET[name])
+            for name in ('item_id', 'user_id', 'due_out', 'due_back')
+            if name in request.GET
+        )
+        return render(
+            request,
+            'elts/waitlist-create-form.html',
+            {'form': forms.WaitlistEntryForm(initial = initial)}
+        )
+
+    return {
+        'GET': get_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+def waitlist_id(request, waitlist_id_):
+    """Handle a request for ``waitlist/<id>/``."""
+    try:
+        entry = models.WaitlistEntry.objects.get(id = waitlist_id_)
+    except models.WaitlistEntry.DoesNotExist:
+        raise http.Http404
+
+    @writes.serialized
+    def delete_handler():
+        """Stop waiting. Redirect the user to the ``waitlist`` view."""
+        entry.delete()
+        return http.HttpResponseRedirect(reverse('elts.views.waitlist'))
+
+    return {
+        'DELETE': delete_handler,
+    }.get(
+        _request_type(request),
+        _http_405
+    )()
+
+@login_required
+@idempotency.idempotent
 def lend_note(request):
     """Handle a request for ``lend-note/``."""
+    @writes.serialized
     def post_handler():
         """Create a new lend note.
 
-        Redirect user to ``lend_id`` view after handling request.
+        If creation succeeds, redirect user to ``lend_id`` view. Otherwise,
+        show the user the lend and the errors in the note creation form.
 
         """
         # For which lend is this note being created?
@@ -922,16 +1988,17 @@ def lend_note(request):
 
         # Get note text and, if valid, save the note.
         form = forms.LendNoteForm(request.POST)
-        if form.is_valid():
-            models.LendNote(
-                note_text = form.cleaned_data['note_text'],
-                author_id = request.user,
-                lend_id = lend_,
-            ).save()
-        else:
-            request.session['form_data'] = json.dumps(form.data)
-
-        # Return the user to this page whether or not the note was saved.
+        if not form.is_valid():
+            return _invalid_form_response(
+                request,
+                'elts/lend-id.html',
+                {'lend': lend_, 'form': form}
+            )
+        models.LendNote(
+            note_text = form.cleaned_data['note_text'],
+            author_id = request.user,
+            lend_id = lend_,
+        ).save()
         return http.HttpResponseRedirect(
             reverse('elts.views.lend_id', args = [lend_.id])
         )
@@ -952,11 +2019,12 @@ def lend_note_id(request, lend_note_id_):
         raise http.Http404
     lend_id_ = lend_note_.lend_id.id
 
+    @writes.serialized
     def put_handler():
         """Update lend note ``lend_note_id_``.
 
         If update succeeds, redirect user to ``lend_id`` view. Otherwise,
-        redirect user to ``lend_note_id_update_form`` view.
+        show the user the lend note update form and the errors in it.
 
         """
         form = forms.LendNoteForm(request.POST, instance = lend_note_)
@@ -966,14 +2034,13 @@ def lend_note_id(request, lend_note_id_):
                 reverse('elts.views.lend_id', args = [lend_id_])
             )
         else:
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(
-                reverse(
-                    'elts.views.lend_note_id_update_form',
-                    args = [lend_note_id_]
-                )
+            return _invalid_form_response(
+                request,
+                'elts/lend-note-id-update-form.html',
+                {'lend_note': lend_note_, 'form': form}
             )
 
+    @writes.serialized
     def delete_handler():
         """Delete lend note ``lend_note_id_``.
 
@@ -1003,15 +2070,13 @@ def lend_note_id_update_form(request, lend_note_id_):
 
     def get_handler():
         """Return a form for updating lend note ``lend_note_id_``."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.LendNoteForm(instance = lend_note_)
-        else:
-            form = forms.LendNoteForm(json.loads(form_data))
         return render(
             request,
             'elts/lend-note-id-update-form.html',
-            {'lend_note': lend_note_, 'form': form}
+            {
+                'lend_note': lend_note_,
+                'form': forms.LendNoteForm(instance = lend_note_),
+            }
         )
 
     return {
@@ -1048,26 +2113,24 @@ def login(request):
     """Handle a request for ``login/``."""
     def get_handler():
         """Return a form for logging in."""
-        form_data = request.session.pop('form_data', None)
-        if form_data is None:
-            form = forms.LoginForm()
-        else:
-            form = forms.LoginForm(json.loads(form_data))
-        return render(request, 'elts/login.html', {'form': form})
+        return render(request, 'elts/login.html', {'form': forms.LoginForm()})
 
     # Log in user
     def post_handler():
         """Log in user.
 
-        If login suceeds, redirect user to ``index`` view. Otherwise, redirect
-        user to ``login`` view.
+        If login suceeds, redirect user to ``index`` view. Otherwise, show the
+        user the login form and the errors in it.
 
         """
         # Check validity of submitted data
         form = forms.LoginForm(request.POST)
         if not form.is_valid():
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(reverse('elts.views.login'))
+            return _invalid_form_response(
+                request,
+                'elts/login.html',
+                {'form': form}
+            )
 
         # Check for invalid credentials.
         user = auth.authenticate(
@@ -1078,16 +2141,22 @@ def login(request):
             form._errors[NON_FIELD_ERRORS] = form.error_class([
                 'Credentials are invalid.'
             ])
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(reverse('elts.views.login'))
+            return _invalid_form_response(
+                request,
+                'elts/login.html',
+                {'form': form}
+            )
 
         # Check for inactive user
         if not user.is_active:
             form._errors[NON_FIELD_ERRORS] = form.error_class([
                 'Account is inactive.'
             ])
-            request.session['form_data'] = json.dumps(form.data)
-            return http.HttpResponseRedirect(reverse('elts.views.login'))
+            return _invalid_form_response(
+                request,
+                'elts/login.html',
+                {'form': form}
+            )
 
         # Everything checks out. Let 'em in.
         auth.login(request, user)
@@ -1130,6 +2199,424 @@ def _http_405():
     """Return an ``HttpResponse`` with a 405 status code."""
     return http.HttpResponse(status = 405)
 
+def _invalid_form_response(request, template, context):
+    """Show the user a form which failed validation.
+
+    ``template`` is the name of the template which shows the form, and
+    ``context`` is the context for that template. The form in ``context``
+    should be bound to the data that the user submitted, so that the user sees
+    both that data and the errors in it.
+
+    A ``TemplateResponse`` with a 422 status code is returned, or with a 409
+    status code if the form was not saved because someone else changed the
+    object first. See ``forms.VersionedForm``. A ``TemplateResponse`` is
+    rendered after the view returns, so a view which is running in the write
+    queue does not hold up other writes while the response is being rendered.
+    See ``elts.writes``.
+
+    """
+    if getattr(context.get('form'), 'stale', False):
+        return TemplateResponse(request, template, context, status = 409)
+    return TemplateResponse(request, template, context, status = 422)
+
+def _text_response(message, status):
+    """Return a plain text response holding ``message``.
+
+    ``message`` may be an exception, in which case its message is used.
+
+    """
+    return http.HttpResponse(
+        force_text(message) + u'\n',
+        content_type = 'text/plain; charset=utf-8',
+        status = status,
+    )
+
+def _current_events(today):
+    """Find the lends that need attention on ``today``.
+
+    ``today`` is a ``datetime.date`` object.
+
+    A dict is returned. Each value is a list of ``Lend`` objects whose item and
+    user have been fetched. The keys are:
+
+    ``out``
+        Lends whose items are out and have not come back.
+    ``due_out``
+        Lends whose items are due out on ``today`` and have not gone out.
+    ``due_back``
+        Lends whose items are due back on ``today`` and have not come back.
+    ``overdue``
+        Lends whose items are out and were due back before ``today``.
+
+    Every lend listed has ``back`` unset, so all of them are found with a single
+    query. The result is cached for a minute, and it is recomputed as soon as
+    any lend changes.
+
+    """
+    key = 'elts:current-events:{}:{}'.format(
+        today,
+        caching.get_version(signals.LENDS_VERSION)
+    )
+    events = cache.get(key)
+    if events is not None:
+        return events
+
+    events = {'out': [], 'due_out': [], 'due_back': [], 'overdue': []}
+    for lend in models.Lend.objects.filter(
+        Q(out__isnull = False) | Q(due_out = today),
+        back__isnull = True,
+    ).select_related('item_id', 'user_id').order_by('due_back', 'id'):
+        if lend.out is not None:
+            events['out'].append(lend)
+            if lend.due_back is not None and lend.due_back < today:
+                events['overdue'].append(lend)
+        elif lend.due_out == today:
+            events['due_out'].append(lend)
+        if lend.due_back == today:
+            events['due_back'].append(lend)
+    cache.set(key, events, 60)
+    return events
+
+def _may_read_feed(request, feed):
+    """Tell whether ``request`` may read the iCalendar feed named ``feed``.
+
+    The user must be logged in, or the ``token`` query string argument must be
+    a valid token for ``feed``. See ``elts.ical``.
+
+    """
+    if request.user.is_authenticated():
+        return True
+    return ical.check_token(request.GET.get('token', ''), feed) is not None
+
+def _feed_denied(request):
+    """Refuse ``request`` for an iCalendar feed.
+
+    A request that carries a token is forbidden, as the token is not valid.
+    Otherwise, the user is sent to the login page, as for ``login_required``.
+
+    """
+    if 'token' in request.GET:
+        return http.HttpResponseForbidden('invalid token')
+    return redirect_to_login(request.get_full_path())
+
+def _feed_response(request, name, filename, show_user, **filters):
+    """Return the lends matching ``filters`` as an iCalendar feed.
+
+    ``name`` is shown to the user by their calendar client, and ``filename``
+    is offered as the name of the file. If ``show_user`` is true, each event
+    names the borrower.
+
+    The ETag and Last-Modified headers are derived from the lends version, so a
+    client which already has the feed gets a 304 response without the database
+    being touched. Otherwise, the feed is streamed as it is read from the
+    database.
+
+    """
+    today = date.today()
+    modified = datetime.fromtimestamp(
+        caching.get_modified(signals.LENDS_VERSION),
+        timezone.utc
+    )
+    # The feed depends on today, as it covers a window around today.
+    etag = '{}:{}:{}'.format(
+        filename,
+        today,
+        caching.get_version(signals.LENDS_VERSION)
+    )
+
+    @condition(
+        etag_func = lambda request: etag,
+        last_modified_func = lambda request: modified
+    )
+    def respond(request):
+        """Stream the feed."""
+        response = http.StreamingHttpResponse(
+            ical.feed(name, ical.lends(today, **filters), modified, show_user),
+            content_type = 'text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'inline; filename="{}"'.format(
+            filename
+        )
+        return response
+
+    return respond(request)
+
+def _parse_date(value, default):
+    """Convert ``value``, a date such as ``2014-03-31``, to a date.
+
+    If ``value`` is missing or is not a valid date, ``default`` is returned.
+
+    >>> _parse_date('2014-03-31', None)
+    datetime.date(2014, 3, 31)
+    >>> _parse_date('2014-02-31', None) is None
+    True
+    >>> _parse_date('yesterday', None) is None
+    True
+    >>> _parse_date(None, None) is None
+    True
+
+    """
+    try:
+        return dateparse.parse_date(value or '') or default
+    except ValueError:
+        return default
+
+def _percent(numerator, denominator):
+    """Return ``numerator`` as a percentage of ``denominator``.
+
+    >>> _percent(1, 4)
+    25.0
+    >>> _percent(1, 0)
+    0.0
+
+    """
+    if not denominator:
+        return 0.0
+    return 100.0 * numerator / denominator
+
+def _utilization_csv(report, kind, start, end):
+    """Return utilization ``report`` as a CSV document.
+
+    ``report`` is a dict like the one that ``utilization()`` renders. ``kind``,
+    ``start`` and ``end`` describe the report, and are used to name the file.
+
+    """
+    response = http.HttpResponse(content_type = 'text/csv')
+    response['Content-Disposition'] = (
+        'attachment; filename="utilization-{}-{}-{}.csv"'.format(
+            kind,
+            start,
+            end
+        )
+    )
+    writer = csv.writer(response)
+    writer.writerow(['scope', 'id', 'name', 'hours', 'capacity', 'percent'])
+    for scope, label in (
+        ('items', 'item'),
+        ('tags', 'tag'),
+        ('categories', 'category'),
+    ):
+        for obj, used, available, percent in report[scope]:
+            writer.writerow([
+                label,
+                obj.id,
+                obj.name.encode('utf-8'),
+                '{:.2f}'.format(used),
+                '{:.2f}'.format(available),
+                '{:.1f}'.format(percent),
+            ])
+    return response
+
+def _calendar_window(view, start, end):
+    """Return the first and last days shown by a calendar view.
+
+    ``view`` is one of ``_CALENDAR_VIEWS``. A month or week view shows the month
+    or week containing ``start``, and a range view shows the days from
+    ``start`` to ``end``. Weeks start on Monday.
+
+    >>> _calendar_window('month', date(2014, 2, 12), None)
+    (datetime.date(2014, 2, 1), datetime.date(2014, 2, 28))
+    >>> _calendar_window('week', date(2014, 2, 12), None)
+    (datetime.date(2014, 2, 10), datetime.date(2014, 2, 16))
+    >>> _calendar_window('range', date(2014, 2, 12), date(2014, 5, 1))
+    (datetime.date(2014, 2, 12), datetime.date(2014, 5, 1))
+    >>> _calendar_window('range', date(2014, 2, 12), date(2014, 1, 1))
+    (datetime.date(2014, 2, 12), datetime.date(2014, 2, 12))
+
+    """
+    if view == 'month':
+        first = _increment_month(start, 0)
+        return first, _increment_month(first, 1) - timedelta(days = 1)
+    if view == 'week':
+        first = start - timedelta(days = start.weekday())
+        return first, first + timedelta(days = 6)
+    return start, max(start, end)
+
+def _calendar_shift(view, first, last, delta):
+    """Return the window ``delta`` windows before or after ``first``-``last``.
+
+    >>> _calendar_shift('month', date(2014, 1, 1), date(2014, 1, 31), 1)
+    (datetime.date(2014, 2, 1), datetime.date(2014, 2, 28))
+    >>> _calendar_shift('week', date(2014, 2, 10), date(2014, 2, 16), -1)
+    (datetime.date(2014, 2, 3), datetime.date(2014, 2, 9))
+    >>> _calendar_shift('range', date(2014, 2, 1), date(2014, 2, 10), 1)
+    (datetime.date(2014, 2, 11), datetime.date(2014, 2, 20))
+
+    """
+    if view == 'month':
+        return _calendar_window(view, _increment_month(first, delta), None)
+    length = (last - first).days + 1
+    shift = timedelta(days = length * delta)
+    return first + shift, last + shift
+
+def _calendar_events(first, last):
+    """Find the lends due out or due back from ``first`` to ``last``.
+
+    A list of dicts is returned, one per lend due out or due back in the
+    window, sorted by date. The keys are ``lend``, a lend ID, ``kit_lend``,
+    the ID of the kit lend the lend belongs to or ``None``, ``date``,
+    ``kind``, which is ``due_out`` or ``due_back``, and the names of the
+    ``item`` and ``user``.
+
+    The lends of a kit all fall on the same days, so only one event is
+    returned for each kit lend and kind, named after the kit rather than any
+    one item.
+
+    The lends are found with a single query over the ``due_out`` and
+    ``due_back`` indexes. The result is cached until any lend changes.
+
+    """
+    key = 'elts:calendar:{}:{}:{}'.format(
+        first,
+        last,
+        caching.get_version(signals.LENDS_VERSION)
+    )
+    events = cache.get(key)
+    if events is not None:
+        return events
+
+    events = []
+    kit_lends = set()
+    for lend in models.Lend.objects.filter(
+        Q(due_out__range = (first, last)) | Q(due_back__range = (first, last))
+    ).values(
+        'id',
+        'due_out',
+        'due_back',
+        'item_id__name',
+        'user_id__username',
+        'kit_lend_id',
+        'kit_lend_id__kit_id__name',
+    ).order_by('id'):
+        item = lend['item_id__name']
+        if lend['kit_lend_id'] is not None:
+            if lend['kit_lend_id'] in kit_lends:
+                continue
+            kit_lends.add(lend['kit_lend_id'])
+            item = u'{} (kit)'.format(lend['kit_lend_id__kit_id__name'])
+        for kind in ('due_out', 'due_back'):
+            if lend[kind] is not None and first <= lend[kind] <= last:
+                events.append({
+                    'lend': lend['id'],
+                    'kit_lend': lend['kit_lend_id'],
+                    'date': lend[kind],
+                    'kind': kind,
+                    'item': item,
+                    'user': lend['user_id__username'],
+                })
+    events.sort(key = lambda event: (
+        event['date'],
+        event['kind'] != 'due_out',
+        event['lend'],
+    ))
+    cache.set(key, events, 60 * 60)
+    return events
+
+def _calendar_json(events, start = None, end = None):
+    """Return ``events``, as returned by ``_calendar_events``, as JSON.
+
+    The URL of each lend is added. If ``start`` and ``end`` are given, they
+    are included. Otherwise, only the list of events is returned. ``</`` is
+    escaped, so that the JSON may be placed in a ``script`` element.
+
+    """
+    events = [dict(event, url = _calendar_url(event)) for event in events]
+    if start is not None:
+        events = {'start': start, 'end': end, 'events': events}
+    return json.dumps(events, cls = DjangoJSONEncoder).replace('</', '<\\/')
+
+def _calendar_url(event):
+    """Return the URL of the lend, or kit lend, ``event`` is for."""
+    if event['kit_lend'] is not None:
+        return reverse('elts.views.kit_lend_id', args = [event['kit_lend']])
+    return reverse('elts.views.lend_id', args = [event['lend']])
+
+def _timeline_rows(items, start, end):
+    """Yield each of ``items`` with the bars to draw for it.
+
+    The bars cover the days from ``start`` to ``end``. Each bar is a dict with
+    these keys:
+
+    ``lend``
+        The ID of the lend the bar is for.
+    ``kind``
+        ``reserved`` for the days from ``due_out`` to ``due_back``, or ``lent``
+        for the time from ``out`` to ``back``, or to now if the item has not
+        come back.
+    ``start``, ``end``
+        Aware datetimes, clipped to the window.
+    ``user``
+        The borrower.
+    ``left``, ``width``
+        Where the bar starts and how long it is, as percentages of the window.
+
+    The lends of all of ``items`` are found with a single query, ordered by
+    item and then by ``due_out``, and are grouped by item as they are read.
+
+    """
+    lower = _local_midnight(start)
+    upper = _local_midnight(end + timedelta(days = 1))
+    window = (upper - lower).total_seconds()
+    now = timezone.now()
+    lends = models.Lend.objects.filter(
+        Q(due_out__lte = end, due_back__gte = start)
+        | Q(due_out__range = (start, end))
+        | Q(due_back__range = (start, end))
+        | Q(out__lt = upper, back__gte = lower)
+        | Q(out__lt = upper, back__isnull = True),
+        item_id__in = [item.id for item in items],
+    ).select_related('user_id').order_by('item_id', 'due_out', 'out')
+
+    bars_by_item = {}
+    for item_id_, item_lends in groupby(
+        lends.iterator(),
+        lambda lend: lend.item_id_id
+    ):
+        bars = bars_by_item[item_id_] = []
+        for lend in item_lends:
+            spans = []
+            if lend.due_out is not None or lend.due_back is not None:
+                first = lend.due_out or lend.due_back
+                last = max(lend.due_back or first, first)
+                spans.append((
+                    'reserved',
+                    _local_midnight(first),
+                    _local_midnight(last + timedelta(days = 1)),
+                ))
+            if lend.out is not None:
+                spans.append(
+                    ('lent', lend.out, lend.back or max(now, lend.out))
+                )
+            for kind, bar_start, bar_end in spans:
+                bar_start = max(bar_start, lower)
+                bar_end = min(bar_end, upper)
+                if bar_start >= bar_end:
+                    continue
+                bars.append({
+                    'lend': lend.id,
+                    'kind': kind,
+                    'start': bar_start,
+                    'end': bar_end,
+                    'user': lend.user_id,
+                    'left': _percent(
+                        (bar_start - lower).total_seconds(),
+                        window
+                    ),
+                    'width': _percent(
+                        (bar_end - bar_start).total_seconds(),
+                        window
+                    ),
+                })
+    for item in items:
+        yield item, bars_by_item.get(item.id, [])
+
+def _local_midnight(day):
+    """Return the start of ``day`` in the current time zone."""
+    return timezone.make_aware(
+        datetime.combine(day, time()),
+        timezone.get_current_timezone()
+    )
+
 def _increment_month(original, delta):
     """Return a new `datetime.date` object `delta` months before or after
     `original`.
@@ -1168,6 +2655,36 @@ def _increment_month(original, delta):
     year = ((original.month - 1 + delta) / 12) + original.year
     return date(year, month, 1)
 
+def _posted_item_id(request):
+    """Return the ``item_id`` that ``request`` posted, or 0 if there is none.
+
+    This is the item whose lends must be locked while the form is checked and
+    saved. See ``writes.items_locked``.
+
+    """
+    return _convert_to_int(request.POST.get('item_id', ''))
+
+def _posted_user_id(request):
+    """Return the ``user_id`` that ``request`` posted, or 0 if there is none.
+
+    This is the borrower who must be locked while their quota is checked and
+    the lend saved. See ``elts.quotas``.
+
+    """
+    return _convert_to_int(request.POST.get('user_id', ''))
+
+def _posted_ids(request, name):
+    """Return the IDs that ``request`` posted as ``name``.
+
+    Values which are not positive integers are left out.
+
+    """
+    return [
+        id_ for id_ in (
+            _convert_to_int(value) for value in request.POST.getlist(name)
+        ) if id_ > 0
+    ]
+
 def _convert_to_int(value):
     """Convert `value` to an integer.
 
@@ -0,0 +1,153 @@
+"""Reserve items for the users waiting for them.
+
+A user who cannot reserve an item, because someone else already has, can wait
+for it instead. See ``models.WaitlistEntry``. When a reservation of the item is
+deleted or shortened, ``promote`` is called with the days it used to cover.
+Only the entries for that item which overlap those days can have become
+satisfiable, so only they are looked at.
+
+Those entries are checked against the item's reservations all at once: the
+reservations are loaded with a single query, and every entry is compared with
+every reservation as NumPy arrays, much as ``recurrence.conflicts`` does. Then
+the entries are walked in the order they were created. Each one which clashes
+with neither an existing reservation nor an entry promoted before it becomes a
+``Lend``. The item and the entries are locked while this happens, and the new
+lends are created and the entries deleted in one transaction.
+
+See: http://docs.scipy.org/doc/numpy/reference/
+
+"""
+from datetime import date
+from django.db.models import Q
+from elts import writes
+from elts.models import Lend, WaitlistEntry
+import numpy as np
+
+# pylint: disable=E1101
+# Class 'Lend' has no 'objects' member (no-member)
+# Module 'numpy' has no 'int64' member (no-member)
+
+# Stands in for the ``due_back`` of a reservation which never ends.
+_FOREVER = date.max.toordinal()
+
+def freed(old, new):
+    """Tell whether a reservation may have made room for someone else.
+
+    ``old`` and ``new`` are ``(item_id, due_out, due_back)`` tuples describing
+    a reservation before and after it was changed. Room is made if the
+    reservation moved to another item or now covers fewer days.
+
+    >>> freed((1, date(2014, 1, 1), None), (1, date(2014, 1, 1), None))
+    False
+    >>> freed((1, date(2014, 1, 1), None), (1, date(2014, 1, 2), None))
+    True
+    >>> freed((1, date(2014, 1, 1), None), (1, date(2013, 1, 1), None))
+    False
+    >>> freed((1, date(2014, 1, 1), None), (1, None, None))
+    True
+    >>> freed((1, None, None), (2, None, None))
+    False
+
+    """
+    old_item, old_start, old_end = old
+    new_item, new_start, new_end = new
+    if old_start is None:
+        return False
+    if new_start is None or new_item != old_item:
+        return True
+    return (
+        new_start > old_start
+        or _end(new_end) < _end(old_end)
+    )
+
+def promote(item_id, due_out, due_back):
+    """Reserve item ``item_id`` for whoever is waiting for it, if they fit.
+
+    ``due_out`` and ``due_back`` are the first and last days which may have
+    become free. If ``due_back`` is ``None``, every day from ``due_out`` on may
+    have become free. Return a dict mapping the ID of each promoted
+    ``WaitlistEntry`` to its new ``Lend``.
+
+    """
+    with writes.items_locked([item_id]):
+        # Entries which ended before today are of no use to anyone.
+        entries = WaitlistEntry.objects.filter(
+            Q(due_back__isnull = True)
+            | Q(due_back__gte = max(due_out, date.today())),
+            item_id = item_id,
+        )
+        if due_back is not None:
+            entries = entries.filter(due_out__lte = due_back)
+        entries = list(entries.select_for_update().order_by('created', 'id'))
+        if not entries:
+            return {}
+
+        starts = np.array(
+            [entry.due_out.toordinal() for entry in entries],
+            dtype = np.int64
+        )
+        ends = np.array(
+            [_end(entry.due_back) for entry in entries],
+            dtype = np.int64
+        )
+        blocked = _blocked(item_id, starts, ends)
+
+        promoted = {}
+        taken = []
+        for entry, start, end, blocked_ in zip(entries, starts, ends, blocked):
+            if blocked_ or any(
+                start <= taken_end and end >= taken_start
+                for taken_start, taken_end in taken
+            ):
+                continue
+            promoted[entry.id] = Lend.objects.create(
+                item_id_id = item_id,
+                user_id_id = entry.user_id_id,
+                due_out = entry.due_out,
+                due_back = entry.due_back,
+            )
+            taken.append((start, end))
+        WaitlistEntry.objects.filter(id__in = list(promoted)).delete()
+    return promoted
+
+def _blocked(item_id, starts, ends):
+    """Tell which entries clash with reservations of item ``item_id``.
+
+    ``starts`` and ``ends`` are arrays of date ordinals, giving the days each
+    entry covers. An array of booleans, one per entry, is returned.
+
+    """
+    existing = Lend.objects.filter(
+        Q(due_back__isnull = True)
+        | Q(due_back__gte = date.fromordinal(int(starts.min()))),
+        item_id = item_id,
+        due_out__isnull = False,
+    )
+    if ends.max() != _FOREVER:
+        existing = existing.filter(
+            due_out__lte = date.fromordinal(int(ends.max()))
+        )
+    existing = list(existing.values_list('due_out', 'due_back'))
+    existing_starts = np.array(
+        [due_out.toordinal() for due_out, _ in existing],
+        dtype = np.int64
+    )
+    existing_ends = np.array(
+        [_end(due_back) for _, due_back in existing],
+        dtype = np.int64
+    )
+    return (
+        (starts[:, None] <= existing_ends[None, :])
+        & (ends[:, None] >= existing_starts[None, :])
+    ).any(axis = 1)
+
+def _end(due_back):
+    """Return ``due_back`` as an ordinal, standing in for "never" if ``None``.
+
+    >>> _end(None) == _FOREVER
+    True
+    >>> _end(date(1, 1, 2))
+    2
+
+    """
+    return _FOREVER if due_back is None else due_back.toordinal()
@@ -0,0 +1,354 @@
+"""Serialize the database writes made by ELTS.
+
+SQLite allows only one writer at a time. When several app server processes
+write to a single SQLite database file, they fight over that lock, and the
+losers either wait or fail with "database is locked". This module provides an
+optional write queue which avoids that fight.
+
+If the ``ELTS_WRITE_QUEUE`` setting is true, functions decorated with
+``serialized`` are not called directly. Instead, they are handed to a single
+writer. The writer collects whichever writes are waiting, takes a lock file
+shared by all app server processes, and runs the whole batch in one
+transaction. Each write gets its own savepoint, so a write which raises an
+exception is rolled back without affecting the rest of the batch. If the
+database reports that it is busy, the whole batch is retried.
+
+No write is delayed on purpose. A batch consists of whatever writes queued up
+while the previous batch was being committed, so batches are only large when
+the server is busy. Callers see the same return values and exceptions that they
+would have seen without the write queue.
+
+The following settings are understood:
+
+``ELTS_WRITE_QUEUE``
+    Whether the write queue is enabled. Defaults to ``False``.
+``ELTS_WRITE_QUEUE_MAX_BATCH``
+    The maximum number of writes committed in one transaction. Defaults to 16.
+``ELTS_WRITE_QUEUE_RETRIES``
+    How many times a batch is retried if the database is busy. Defaults to 5.
+``ELTS_WRITE_QUEUE_LOCK_FILE``
+    The lock file shared by all app server processes. Defaults to the name of
+    the default database with ``.write-lock`` appended.
+``ELTS_ITEM_LOCK_FILE``
+    The file holding the per-item and per-user locks taken by
+    ``items_locked``, if the database cannot lock rows itself. Defaults to the
+    name of the default database with ``.item-locks`` appended.
+
+Checking that an item is free and then reserving it are two steps, and two
+requests could both find an item free before either reserves it. Whatever
+checks and saves an item's lends should do both inside ``items_locked``. Only
+callers locking the same item wait for each other. Likewise, a borrower's quota
+is checked and their lend saved while the borrower is locked. See
+``elts.quotas``.
+
+Without ``SELECT ... FOR UPDATE``, an item's lock is released as soon as
+``items_locked`` returns, even if an outer transaction has not yet committed.
+So items must be locked before any transaction is started. For example, a
+deleted reservation makes room for whoever is waiting for the item, inside the
+transaction which deletes it, so the item should be locked around the delete.
+Writes made by the write queue are already serialized until their batch
+commits, so items are not locked separately within a batch, and whatever
+locks items must be ``serialized``.
+
+"""
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, transaction
+from django.utils import six
+from elts import caching
+from elts.models import Item
+from functools import wraps
+import fcntl
+import os
+import sys
+import threading
+import time
+
+# pylint: disable=E1101
+# Class 'Item' has no 'objects' member (no-member)
+
+def serialized(function):
+    """Decorate ``function`` so that it is run by the writer.
+
+    If the write queue is disabled, ``function`` is called directly.
+
+    >>> @serialized
+    ... def double(number):
+    ...     return number * 2
+    >>> double(4)
+    8
+
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        """Call ``function``, perhaps by way of the writer."""
+        if not getattr(settings, 'ELTS_WRITE_QUEUE', False):
+            return function(*args, **kwargs)
+        return _get_writer().submit(lambda: function(*args, **kwargs))
+    return wrapper
+
+@contextmanager
+def items_locked(item_ids, user_ids = ()):
+    """Lock the items ``item_ids`` and the users ``user_ids``, and start a
+    transaction.
+
+    The locks are held until the transaction is committed. They are taken in
+    order, so that two callers cannot deadlock. A thread may lock an item or
+    user it has already locked, in which case it stays locked until the outer
+    call is done. ``None`` and 0 in ``item_ids`` and ``user_ids`` are ignored,
+    so that an ID taken straight from a form can be passed in.
+
+    If the database supports ``SELECT ... FOR UPDATE``, the rows of the items
+    and users are locked. Otherwise, as with SQLite, each item and user has a
+    lock shared by the threads of this process and a byte of
+    ``ELTS_ITEM_LOCK_FILE`` locked with ``fcntl.lockf`` that is shared by all
+    processes. Those locks are released when this call returns, so it should
+    not be made inside a transaction. In a batch of the write queue, nothing is
+    locked.
+
+    >>> with items_locked([None, 0], [None]):
+    ...     pass
+
+    """
+    held = _held_keys()
+    # Items and users share one set of keys, and so one lock file: item ``n``
+    # has key ``2n``, and user ``n`` has key ``2n + 1``.
+    keys = sorted(set(
+        [2 * int(item_id) for item_id in item_ids if item_id]
+        + [2 * int(user_id) + 1 for user_id in user_ids if user_id]
+    ).difference(held))
+    if getattr(_item_state, 'in_batch', False):
+        # The batch holds ``_process_lock`` until it commits.
+        keys = []
+    held.update(keys)
+    try:
+        if connection.features.has_select_for_update:
+            with transaction.atomic():
+                list(Item.objects.select_for_update().filter(
+                    id__in = [key // 2 for key in keys if not key % 2]
+                ).values_list('id', flat = True))
+                list(User.objects.select_for_update().filter(
+                    id__in = [key // 2 for key in keys if key % 2]
+                ).values_list('id', flat = True))
+                yield
+        else:
+            with _local_locks(keys):
+                with transaction.atomic():
+                    yield
+    finally:
+        held.difference_update(keys)
+        if not connection.in_atomic_block:
+            caching.bump_pending()
+
+_item_state = threading.local() # pylint: disable=C0103
+_item_locks = {} # pylint: disable=C0103
+_item_locks_lock = threading.Lock() # pylint: disable=C0103
+_item_lock_file = None # pylint: disable=C0103
+
+def _held_keys():
+    """Return the keys of the items and users this thread has locked."""
+    if not hasattr(_item_state, 'held'):
+        _item_state.held = set()
+    return _item_state.held
+
+@contextmanager
+def _local_locks(keys):
+    """Lock ``keys`` against other threads and processes, in order."""
+    thread_locked = []
+    file_locked = []
+    try:
+        for key in keys:
+            with _item_locks_lock:
+                lock = _item_locks.setdefault(key, threading.Lock())
+            lock.acquire()
+            thread_locked.append(lock)
+            fcntl.lockf(_get_item_lock_file(), fcntl.LOCK_EX, 1, key)
+            file_locked.append(key)
+        yield
+    finally:
+        for key in reversed(file_locked):
+            fcntl.lockf(_get_item_lock_file(), fcntl.LOCK_UN, 1, key)
+        for lock in reversed(thread_locked):
+            lock.release()
+
+def _get_item_lock_file():
+    """Return the file descriptor of ``ELTS_ITEM_LOCK_FILE``.
+
+    The file is opened once and never closed, as closing any descriptor of a
+    file releases every ``fcntl`` lock that this process holds on it.
+
+    """
+    global _item_lock_file # pylint: disable=W0603
+    with _item_locks_lock:
+        if _item_lock_file is None:
+            path = getattr(
+                settings,
+                'ELTS_ITEM_LOCK_FILE',
+                settings.DATABASES['default']['NAME'] + '.item-locks'
+            )
+            _item_lock_file = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    return _item_lock_file
+
+class _Write(object):
+    """A single call waiting to be made by the writer."""
+    def __init__(self, function):
+        self.function = function
+        self.done = False
+        self.result = None
+        self.exc_info = None
+
+    def outcome(self):
+        """Return the result of the call or re-raise its exception."""
+        if self.exc_info is not None:
+            six.reraise(*self.exc_info)
+        return self.result
+
+class _Writer(object):
+    """Commit queued writes in batches.
+
+    Any thread may submit a write. The first thread to find no leader becomes
+    the leader, and it commits batches of queued writes until its own write is
+    done. The other threads wait. This means that no dedicated writer thread is
+    needed, and that the writes of a single process never compete with each
+    other for the database.
+
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = []
+        self._leading = False
+
+    def submit(self, function):
+        """Queue a call to ``function``, wait for it, and return its result."""
+        write = _Write(function)
+        self._condition.acquire()
+        try:
+            self._pending.append(write)
+            while not write.done:
+                if self._leading:
+                    self._condition.wait()
+                    continue
+                self._leading = True
+                self._condition.release()
+                try:
+                    self._commit(self._take_batch())
+                finally:
+                    self._condition.acquire()
+                    self._leading = False
+                    self._condition.notify_all()
+        finally:
+            self._condition.release()
+        return write.outcome()
+
+    def _take_batch(self):
+        """Remove a batch of writes from the front of the queue."""
+        max_batch = getattr(settings, 'ELTS_WRITE_QUEUE_MAX_BATCH', 16)
+        with self._condition:
+            batch = self._pending[:max_batch]
+            del self._pending[:max_batch]
+        return batch
+
+    def _commit(self, batch):
+        """Run each write in ``batch`` in a single transaction.
+
+        If the batch cannot be committed, for whatever reason, each write in it
+        is given the exception. Every write is marked as done, even if this
+        method is interrupted, so that no caller waits forever.
+
+        """
+        retries = getattr(settings, 'ELTS_WRITE_QUEUE_RETRIES', 5)
+        attempt = 0
+        exc_info = None
+        try:
+            while True:
+                try:
+                    with _process_lock():
+                        with transaction.atomic():
+                            _item_state.in_batch = True
+                            try:
+                                for write in batch:
+                                    _run(write)
+                            finally:
+                                _item_state.in_batch = False
+                    return
+                except Exception: # pylint: disable=W0703
+                    error = sys.exc_info()[1]
+                    if (
+                        not isinstance(error, OperationalError)
+                        or not _is_busy(error)
+                        or attempt >= retries
+                    ):
+                        exc_info = sys.exc_info()
+                        return
+                # Back off a little longer each time, starting at 10ms.
+                time.sleep(0.01 * 2 ** attempt)
+                attempt += 1
+        except BaseException:
+            exc_info = sys.exc_info()
+            raise
+        finally:
+            try:
+                caching.bump_pending()
+            finally:
+                for write in batch:
+                    if exc_info is not None:
+                        write.result, write.exc_info = None, exc_info
+                    write.done = True
+
+_writer = None # pylint: disable=C0103
+_writer_lock = threading.Lock() # pylint: disable=C0103
+
+def _get_writer():
+    """Return this process' writer, creating it if necessary."""
+    global _writer # pylint: disable=W0603
+    with _writer_lock:
+        if _writer is None:
+            _writer = _Writer()
+    return _writer
+
+def _run(write):
+    """Run ``write`` in a savepoint and record its outcome.
+
+    An exception raised by ``write.function`` is recorded instead of being
+    propagated, unless it shows that the database is busy. In that case the
+    whole batch must be retried.
+
+    """
+    write.result, write.exc_info = None, None
+    try:
+        with transaction.atomic():
+            write.result = write.function()
+    except OperationalError:
+        if _is_busy(sys.exc_info()[1]):
+            raise
+        write.exc_info = sys.exc_info()
+    except Exception: # pylint: disable=W0703
+        write.exc_info = sys.exc_info()
+
+def _is_busy(error):
+    """Tell whether ``error`` says that the database is locked or busy.
+
+    >>> _is_busy(OperationalError('database is locked'))
+    True
+    >>> _is_busy(OperationalError('no such table: elts_item'))
+    False
+
+    """
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+@contextmanager
+def _process_lock():
+    """Hold a lock shared by every process using this database."""
+    path = getattr(
+        settings,
+        'ELTS_WRITE_QUEUE_LOCK_FILE',
+        settings.DATABASES['default']['NAME'] + '.write-lock'
+    )
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
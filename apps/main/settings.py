@@ -34,6 +34,14 @@ DATABASES = {
             'sqlite',
             'db.db',
         )),
+        # Threads cannot share an in-memory database, which some tests need.
+        'TEST_NAME': os.path.abspath(os.path.join(
+            os.path.dirname(__file__),
+            '..',
+            '..',
+            'sqlite',
+            'test.db',
+        )),
         'USER': '',
         'PASSWORD': '',
         'HOST': '',
@@ -41,6 +49,26 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    # See: https://docs.djangoproject.com/en/1.6/topics/cache/
+    #
+    # LocMemCache is private to each process. If several app server processes
+    # are used, switch to a shared cache such as memcached. See the readme.
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'elts',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Sessions live in the cache and are written through to the database. See
+# module ``elts.sessions``.
+SESSION_ENGINE = 'elts.sessions'
+
+# Read replicas are listed in ``ELTS_READ_REPLICAS``, and they are only used if
+# ``ReplicaMiddleware`` is installed. See module ``elts.routers``.
+DATABASE_ROUTERS = ['elts.routers.ReplicaRouter']
+
 # Local time zone for this installation. Choices can be found here:
 # http://en.wikipedia.org/wiki/List_of_tz_zones_by_name
 # although not all choices may be available on all operating systems.
@@ -76,6 +104,17 @@ STATIC_URL = '/static/'
 # Make this unique, and don't share it with anybody.
 SECRET_KEY = ''
 
+MIDDLEWARE_CLASSES = (
+    # ReplicaMiddleware must come before anything that reads from the database.
+    'elts.middleware.ReplicaMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'elts.middleware.VersionMiddleware',
+)
+
 ROOT_URLCONF = 'main.urls'
 
 # Python dotted path to the WSGI application used by Django's runserver.